@@ -0,0 +1,217 @@
+"""Measures throughput, latency, memory and API calls of the main client operations against the local stub.
+
+Every operation runs on the sync client and, if aiohttp is installed, on the
+async client. The results are printed and written as JSON, pass an earlier
+result file with --baseline to print the change of every measurement.
+
+Usage: python -m benchmarks.harness [--iterations N] [--concurrency N] [--latency S] [--error-rate F]
+                                    [--throttle N] [--servers N] [--products N] [--padding N]
+                                    [--output FILE] [--baseline FILE]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_server import MockLeaderGPUAPI
+from leadergpu import LeaderGPUClient
+from leadergpu.__version__ import VERSION
+from leadergpu.http_client.instrumentation import LatencyHistogram
+
+OPERATIONS = ('servers.get', 'products.get', 'servers.action', 'servers.order')
+"""Measured operations, servers.order runs last because every order adds a server"""
+
+
+def sync_operation(client: LeaderGPUClient, name: str, server_ids: list):
+    """Get a callable running one operation on the sync client"""
+    if name == 'servers.get':
+        return lambda: client.servers.get(force_refresh=True)
+    if name == 'products.get':
+        return lambda: client.products.get(force_refresh=True)
+    if name == 'servers.action':
+        return lambda: client.servers.action(server_ids, 'start')
+    return lambda: client.servers.order(909, 'ubuntu', 60)
+
+
+def async_operation(client, name: str, server_ids: list):
+    """Get a coroutine function running one operation on the async client"""
+    if name == 'servers.get':
+        return lambda: client.servers.get(force_refresh=True)
+    if name == 'products.get':
+        return lambda: client.products.get(force_refresh=True)
+    if name == 'servers.action':
+        return lambda: client.servers.action(server_ids, 'start')
+    return lambda: client.servers.order(909, 'ubuntu', 60)
+
+
+def summarize(path: str, name: str, histogram: LatencyHistogram, elapsed: float, failures: int, memory: int,
+              api: MockLeaderGPUAPI, iterations: int, concurrency: int) -> dict:
+    """Build the result of one measured operation"""
+    return {
+        'path': path,
+        'operation': name,
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'throughput_per_s': histogram.count / elapsed if elapsed else None,
+        'p50_ms': _ms(histogram.quantile(0.5)),
+        'p99_ms': _ms(histogram.quantile(0.99)),
+        'max_ms': _ms(histogram.max),
+        'failures': failures,
+        'memory_peak_bytes': memory,
+        'api_calls': dict(api.calls),
+        'api_errors': api.errors,
+        'api_throttled': api.throttled,
+    }
+
+
+def _ms(seconds: float) -> float:
+    return seconds * 1000 if seconds is not None else None
+
+
+def run_sync(api: MockLeaderGPUAPI, name: str, iterations: int, concurrency: int) -> dict:
+    """Measure one operation on the sync client, shared by concurrency threads"""
+    with LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=max(10, concurrency)) as client:
+        server_ids = list(api.servers)
+        operation = sync_operation(client, name, server_ids)
+        client.products.get()  # sign in and open the connection pool outside the measurement
+
+        tracemalloc.start()
+        operation()
+        _, memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        api.reset_counters()
+        histogram = LatencyHistogram()
+        failures = 0
+
+        def timed(_):
+            start = time.perf_counter()
+            try:
+                operation()
+            except Exception:
+                return None
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for latency in executor.map(timed, range(iterations)):
+                if latency is None:
+                    failures += 1
+                else:
+                    histogram.record(latency)
+        elapsed = time.perf_counter() - start
+    return summarize('sync', name, histogram, elapsed, failures, memory, api, iterations, concurrency)
+
+
+def run_async(api: MockLeaderGPUAPI, name: str, iterations: int, concurrency: int) -> dict:
+    """Measure one operation on the async client, with concurrency operations in flight"""
+    from leadergpu import AsyncLeaderGPUClient
+
+    async def measure() -> dict:
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url) as client:
+            server_ids = list(api.servers)
+            operation = async_operation(client, name, server_ids)
+            await client.products.get()
+
+            tracemalloc.start()
+            await operation()
+            _, memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            api.reset_counters()
+            histogram = LatencyHistogram()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed():
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await operation()
+                    except Exception:
+                        return None
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(timed() for _ in range(iterations)))
+            elapsed = time.perf_counter() - start
+            for latency in latencies:
+                if latency is not None:
+                    histogram.record(latency)
+            failures = latencies.count(None)
+        return summarize('async', name, histogram, elapsed, failures, memory, api, iterations, concurrency)
+
+    return asyncio.run(measure())
+
+
+def compare(results: list, baseline: dict) -> None:
+    """Print the relative change of every measurement against a baseline result file"""
+    previous = {(result['path'], result['operation']): result for result in baseline['results']}
+    for result in results:
+        before = previous.get((result['path'], result['operation']))
+        if before is None:
+            continue
+        changes = []
+        for key in ('throughput_per_s', 'p50_ms', 'p99_ms', 'memory_peak_bytes'):
+            if before.get(key) and result.get(key) is not None:
+                changes.append(f'{key} {(result[key] - before[key]) / before[key]:+.1%}')
+        print(f"{result['path']:5} {result['operation']:15} " + ', '.join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200, help='operations per measurement')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads or coroutines running the operations')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the stub waits before answering')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--throttle', type=int, default=None, help='requests per second before the stub sends 429')
+    parser.add_argument('--servers', type=int, default=10, help='servers returned by /servers')
+    parser.add_argument('--products', type=int, default=100, help='products returned by /servers/products')
+    parser.add_argument('--padding', type=int, default=0, help='characters added to every record')
+    parser.add_argument('--output', default='benchmark-results.json', help='result file')
+    parser.add_argument('--baseline', default=None, help='earlier result file to compare with')
+    args = parser.parse_args()
+
+    try:
+        import aiohttp  # noqa: F401
+        paths = (('sync', run_sync), ('async', run_async))
+    except ImportError:
+        paths = (('sync', run_sync),)
+
+    results = []
+    for name in OPERATIONS:
+        for path, run in paths:
+            with MockLeaderGPUAPI(servers=args.servers, products=args.products, latency=args.latency,
+                                  jitter=args.jitter, error_rate=args.error_rate, throttle=args.throttle,
+                                  payload_padding=args.padding) as api:
+                result = run(api, name, args.iterations, args.concurrency)
+            results.append(result)
+            print(f"{path:5} {name:15} {result['throughput_per_s']:9.1f}/s  p50 {result['p50_ms'] or 0:8.2f} ms  "
+                  f"p99 {result['p99_ms'] or 0:8.2f} ms  peak {result['memory_peak_bytes'] / 1024:8.1f} KiB  "
+                  f"failures {result['failures']}  calls {result['api_calls']}")
+
+    report = {
+        'meta': {
+            'version': VERSION,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'options': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
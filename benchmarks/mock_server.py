@@ -0,0 +1,298 @@
+"""A local stub of the LeaderGPU public API for benchmarks."""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+USER_ID = 1
+AUTH_TOKEN = 'mock-token'
+
+SERVER_ACTION_PATTERN = re.compile(r'^/api/v1/users/\d+/servers/(\d+)/(start|stop|suspend|resume)$')
+
+
+def make_server(id: int) -> dict:
+    """Build a server record as returned by /servers
+
+    :param id: server id
+    :type id: int
+    :return: server record
+    :rtype: dict
+    """
+    return {
+        'id': id, 'ip': f'10.0.{id // 256 % 256}.{id % 256}', 'name': f'server-{id}', 'config': '4x GTX1080',
+        'start_at': '2023-01-01 00:00:00', 'end_at': None, 'valid_to': '2023-02-01 00:00:00', 'status': 'UP',
+        'username': 'user', 'os_type': 'ubuntu', 'token': 'token', 'resume_available': False,
+        'suspend_available': True, 'uptime': 3600, 'remaining': 7200, 'progress': 100, 'boot_status': {},
+        'code': 'GPU:Nvidia:GTX1080:4:Minute', 'os': 'ubuntu', 'server_alias': f'alias-{id}', 'description': '',
+        'nomenclature_id': 909, 'period_count': 60, 'nomenclature_ids': [909], 'free_time': 0
+    }
+
+
+def make_product(id: int) -> dict:
+    """Build a product record as returned by /servers/products
+
+    :param id: product id
+    :type id: int
+    :return: product record
+    :rtype: dict
+    """
+    models = ('GTX1080', 'RTX3090', 'A100', 'V100')
+    periods = ('Minute', 'Hour', 'Day')
+    return {
+        'id': str(id), 'code': f'GPU:Nvidia:{models[id % 4]}:{1 << (id % 4)}:{periods[id % 3]}',
+        'name': f'product-{id}', 'period_type': periods[id % 3], 'period_count': '1',
+        'price': str(0.5 + (id * 37 % 100) / 10), 'currency': ('EUR', 'USD', 'RUB')[id % 3], 'free_time': None,
+        'server_configuration_id': id % 50, 'os': ['ubuntu', 'windows', 'centos'][:1 + id % 3], 'weight': str(id % 10)
+    }
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockLeaderGPUAPI:
+    """A threaded local LeaderGPU API stub
+
+    Serves /signin, /servers, /servers/products, /servers/order and the server
+    actions and counts the calls per endpoint. Latency, random errors and
+    throttling can be added to see how the client behaves under them, and ETags
+    to exercise conditional requests.
+    """
+
+    def __init__(self,
+                 servers: int = 10,
+                 products: int = 100,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 throttle: int = None,
+                 payload_padding: int = 0,
+                 etags: bool = False,
+                 seed: int = 0) -> None:
+        """Initialize the stub
+
+        :param servers: number of servers returned by /servers, defaults to 10
+        :type servers: int, optional
+        :param products: number of products returned by /servers/products, defaults to 100
+        :type products: int, optional
+        :param latency: seconds added to every response, defaults to 0
+        :type latency: float, optional
+        :param jitter: maximum random seconds added on top of the latency, defaults to 0
+        :type jitter: float, optional
+        :param error_rate: fraction of API requests (all but the sign in) answered with 503, defaults to 0
+        :type error_rate: float, optional
+        :param throttle: maximum API requests per second, the rest are answered with 429, defaults to None
+        :type throttle: int, optional
+        :param payload_padding: characters added to the description of every record, defaults to 0
+        :type payload_padding: int, optional
+        :param etags: send an ETag with the lists and answer a matching If-None-Match with 304, defaults to False
+        :type etags: bool, optional
+        :param seed: seed of the jitter and error randomness, defaults to 0
+        :type seed: int, optional
+        """
+        self.servers = {id: make_server(id) for id in range(1, servers + 1)}
+        self.products = [make_product(id) for id in range(1, products + 1)]
+        if payload_padding:
+            for record in (*self.servers.values(), *self.products):
+                record['description'] = 'x' * payload_padding
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle = throttle
+        self.etags = etags
+        self.auth_token = AUTH_TOKEN
+        self.calls = {}
+        self.errors = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.not_modified = 0
+        self._random = random.Random(seed)
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def base_url(self) -> str:
+        """Get the base url to pass to the client
+
+        :return: base url
+        :rtype: str
+        """
+        return f'http://127.0.0.1:{self._httpd.server_address[1]}/api/v1/users'
+
+    def start(self) -> 'MockLeaderGPUAPI':
+        """Start serving in a background thread
+
+        :return: the running stub
+        :rtype: MockLeaderGPUAPI
+        """
+        self._httpd = _ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockLeaderGPUAPI':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def rotate_token(self) -> str:
+        """Expire the current token, the next requests are answered with 401 until the client signs in again
+
+        :return: the new token
+        :rtype: str
+        """
+        with self._lock:
+            self.auth_token = f'{AUTH_TOKEN}-{self.calls.get("/signin", 0)}-{self._random.random()}'
+            return self.auth_token
+
+    def reset_counters(self) -> None:
+        """Reset the call, error, throttle, rejected token and not modified counters"""
+        with self._lock:
+            self.calls = {}
+            self.errors = 0
+            self.throttled = 0
+            self.rejected = 0
+            self.not_modified = 0
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def delay(self) -> float:
+        """Pick the latency of a response
+
+        :return: seconds to wait before answering
+        :rtype: float
+        """
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _disturb(self) -> int:
+        """Decide whether an API request is throttled or fails
+
+        :return: the status to answer with instead of the real response, or None
+        :rtype: int
+        """
+        with self._lock:
+            if self.throttle is not None:
+                second = int(time.monotonic())
+                start, count = self._window
+                count = count + 1 if start == second else 1
+                self._window = (second, count)
+                if count > self.throttle:
+                    self.throttled += 1
+                    return 429
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 503
+        return None
+
+    def _conditional(self, headers, body) -> tuple:
+        """Answer a GET of a list, with 304 if the client already has it
+
+        :param headers: request headers
+        :param body: the list to answer with
+        :return: status code, decoded body and extra headers
+        :rtype: tuple
+        """
+        if not self.etags:
+            return 200, body, {}
+        etag = '"%08x"' % zlib.crc32(json.dumps(body, sort_keys=True).encode('utf-8'))
+        if headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            return 304, None, {'ETag': etag}
+        return 200, body, {'ETag': etag}
+
+    def route(self, method: str, path: str, headers) -> tuple:
+        """Answer a request
+
+        :param method: HTTP method
+        :type method: str
+        :param path: request path without the query string
+        :type path: str
+        :param headers: request headers
+        :return: status code, decoded body and extra headers
+        :rtype: tuple
+        """
+        if method == 'POST' and path == '/api/v1/users/signin':
+            self._count('/signin')
+            return 200, {'id': USER_ID, 'auth_token': self.auth_token}, {}
+        if headers.get('X-Auth-Token') != self.auth_token:
+            with self._lock:
+                self.rejected += 1
+            return 401, {'code': 401, 'message': 'Unauthorized'}, {}
+        if self.throttle is not None or self.error_rate:
+            status = self._disturb()
+            if status == 429:
+                return 429, {'code': 429, 'message': 'Too many requests'}, {'Retry-After': '1'}
+            if status is not None:
+                return status, {'code': status, 'message': 'Service unavailable'}, {}
+
+        prefix = f'/api/v1/users/{USER_ID}'
+        if method == 'GET' and path == prefix + '/servers':
+            self._count('/servers')
+            return self._conditional(headers, list(self.servers.values()))
+        if method == 'GET' and path == prefix + '/servers/products':
+            self._count('/servers/products')
+            return self._conditional(headers, self.products)
+        if method == 'POST' and path == prefix + '/servers/order':
+            self._count('/servers/order')
+            with self._lock:
+                id = max(self.servers, default=0) + 1
+                self.servers[id] = make_server(id)
+            return 200, {'success': True}, {}
+        match = SERVER_ACTION_PATTERN.match(path)
+        if method == 'POST' and match:
+            self._count('/servers/{id}/' + match.group(2))
+            if int(match.group(1)) not in self.servers:
+                return 404, {'code': 404, 'message': 'Server not found'}, {}
+            return 200, {'success': True}, {}
+        return 404, {'code': 404, 'message': 'Not found'}, {}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # headers and body are written separately
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                delay = api.delay()
+                if delay:
+                    time.sleep(delay)
+                status, body, headers = api.route(method, self.path.split('?')[0], self.headers)
+                data = json.dumps(body).encode('utf-8') if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,77 @@
+"""Compares memory use and decode time of the slotted models with the previous dict based models.
+
+Usage: python -m benchmarks.models [--sizes 10000 100000]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.mock_server import make_product, make_server
+from leadergpu.products.products import PRODUCT_FIELDS, decode_products
+from leadergpu.servers.servers import SERVER_FIELDS, decode_servers
+
+
+class LegacyModel:
+    """A model storing its attributes in a per-instance __dict__, like the models before __slots__"""
+
+    def __init__(self, **kwargs):
+        for name, value in kwargs.items():
+            setattr(self, '_' + name, value)
+
+
+def decode_legacy_servers(servers_dict, http_client):
+    """Decode servers the way ServersService.get used to: map with a keyword argument lambda"""
+    return list(map(lambda server: LegacyModel(http_client=http_client,
+                                               **{field: server[field] for field in SERVER_FIELDS}), servers_dict))
+
+
+def decode_legacy_products(products):
+    """Decode products the way ProductsService.get used to: map with a keyword argument lambda"""
+    return list(map(lambda product: LegacyModel(
+        id=product['id'], code=product['code'], name=product['name'], period_type=product['period_type'],
+        period_count=int(product['period_count']), price=float(product['price']), currency=product['currency'],
+        free_time=product['free_time'], server_configuration_id=product['server_configuration_id'],
+        os=product['os'], weight=int(product['weight'])), products))
+
+
+def measure(decode, records) -> dict:
+    """Measure the decode time and the memory held by the decoded objects"""
+    gc.collect()
+    start = time.perf_counter()
+    decode(records)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    objects = decode(records)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return {'decode_s': elapsed, 'memory_bytes': memory}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='number of records')
+    args = parser.parse_args()
+
+    http_client = object()
+    results = []
+    for size in args.sizes:
+        servers = [make_server(id) for id in range(size)]
+        products = [make_product(id) for id in range(size)]
+        assert set(PRODUCT_FIELDS) == set(products[0])
+        results.append({
+            'records': size,
+            'servers_legacy': measure(lambda records: decode_legacy_servers(records, http_client), servers),
+            'servers_slots': measure(lambda records: decode_servers(records, http_client), servers),
+            'products_legacy': measure(decode_legacy_products, products),
+            'products_slots': measure(decode_products, products),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
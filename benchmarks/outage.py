@@ -0,0 +1,102 @@
+"""Runs one shared client with a circuit breaker through an outage of the local stub.
+
+The stub first answers normally, then fails every request, then answers slowly
+(the circuit is reset before), and finally recovers. Reports the outcomes, the
+requests that reached the stub and the circuit state of every phase.
+tests/test_circuit_breaker.py runs the same phases and checks that the circuit
+opens and fails fast during the outage and the slow phase, and closes again
+once the stub recovered.
+
+Usage: python -m benchmarks.outage [--threads 8] [--open-timeout 0.5]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_server import MockLeaderGPUAPI
+from leadergpu import LeaderGPUClient
+from leadergpu.exceptions import APIException, CircuitOpenException
+from leadergpu.http_client.circuit_breaker import CircuitBreaker
+from leadergpu.http_client.retry import RetryPolicy
+
+
+def hammer(client: LeaderGPUClient, threads: int, seconds: float) -> dict:
+    """List the servers from many threads for a while and count the outcomes"""
+    outcomes = {'ok': 0, 'failed': 0, 'rejected': 0}
+    lock = threading.Lock()
+    end = time.monotonic() + seconds
+
+    def run(_) -> None:
+        while time.monotonic() < end:
+            try:
+                client.servers.get(force_refresh=True)
+                outcome = 'ok'
+            except CircuitOpenException:
+                outcome = 'rejected'
+                time.sleep(0.01)
+            except APIException:
+                outcome = 'failed'
+            with lock:
+                outcomes[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(run, range(threads)))
+    return outcomes
+
+
+def reached(api: MockLeaderGPUAPI) -> int:
+    """Count the API requests that reached the stub, sign ins excluded"""
+    return api.errors + sum(count for endpoint, count in api.calls.items() if endpoint != '/signin')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='threads sharing the client')
+    parser.add_argument('--open-timeout', type=float, default=0.5, help='seconds an open circuit fails fast')
+    args = parser.parse_args()
+
+    breaker = CircuitBreaker(window=10, minimum_calls=5, open_timeout=args.open_timeout,
+                             slow_call_duration=0.1, slow_call_rate=0.5)
+    transitions = []
+    breaker.add_listener(lambda group, before, after: transitions.append(f'{group}: {before} -> {after}'))
+    phases = {}
+    with MockLeaderGPUAPI(servers=10) as api:
+        client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=args.threads,
+                                 retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=breaker)
+
+        def phase(name: str, seconds: float) -> None:
+            api.reset_counters()
+            result = hammer(client, args.threads, seconds)
+            result['reached_api'] = reached(api)
+            result['state'] = breaker.state('list')
+            phases[name] = result
+
+        phase('healthy', 0.5)
+
+        api.error_rate = 1.0
+        phase('outage', args.open_timeout * 4)
+
+        api.error_rate = 0.0
+        api.latency = 0.2
+        breaker.reset()
+        phase('slow', args.open_timeout * 4)
+
+        api.latency = 0.0
+        time.sleep(args.open_timeout)
+        phase('recovered', 0.5)
+        client.close()
+
+    report = {
+        'threads': args.threads,
+        'open_timeout_s': args.open_timeout,
+        'phases': phases,
+        'transitions': transitions,
+        'circuits': breaker.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
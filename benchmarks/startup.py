@@ -0,0 +1,52 @@
+"""Measures the package import time and the time to the first request.
+
+Usage: python -m benchmarks.startup [--runs N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks.mock_server import MockLeaderGPUAPI
+
+IMPORT_SNIPPET = 'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+
+
+def measure_import(module: str, runs: int) -> float:
+    """Import a module in fresh interpreters and return the fastest import time in seconds"""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET.format(module=module)])
+        timings.append(float(output))
+    return min(timings)
+
+
+def measure_first_request(base_url: str, runs: int) -> dict:
+    """Time the client construction and the first request in fresh interpreters"""
+    snippet = (
+        'import time, json; t0 = time.perf_counter(); from leadergpu import LeaderGPUClient; '
+        f'c = LeaderGPUClient("user@mail.org", "secret", "{base_url}"); t1 = time.perf_counter(); '
+        'c.products.get(); t2 = time.perf_counter(); print(json.dumps([t1 - t0, t2 - t0]))'
+    )
+    construct, first_request = [], []
+    for _ in range(runs):
+        timings = json.loads(subprocess.check_output([sys.executable, '-c', snippet]))
+        construct.append(timings[0])
+        first_request.append(timings[1])
+    return {'construct_client_s': min(construct), 'first_request_s': min(first_request)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10, help='number of fresh interpreters per measurement')
+    args = parser.parse_args()
+
+    results = {'import_leadergpu_s': measure_import('leadergpu', args.runs),
+               'import_client_s': measure_import('leadergpu.leadergpu', args.runs)}
+    with MockLeaderGPUAPI() as api:
+        results.update(measure_first_request(api.base_url, args.runs))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
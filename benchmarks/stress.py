@@ -0,0 +1,90 @@
+"""Hammers one shared client from many threads while the API keeps expiring the token.
+
+Reports the throughput, the failed calls and the sign ins per expired token.
+tests/test_stress.py runs the same load and checks that no call fails and that
+the concurrent token refreshes collapse into one sign in per expired token.
+
+Usage: python -m benchmarks.stress [--threads 64] [--iterations 50] [--rotations 5]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from benchmarks.mock_server import MockLeaderGPUAPI
+from leadergpu import LeaderGPUClient
+
+
+def worker(client: LeaderGPUClient, api: MockLeaderGPUAPI, iterations: int, seed: int, errors: list) -> int:
+    """Run random operations on the shared client and return how many ran"""
+    rng = random.Random(seed)
+    server_ids = list(api.servers)
+    for _ in range(iterations):
+        operation = rng.randrange(4)
+        try:
+            if operation == 0:
+                assert len(client.servers.get(force_refresh=True)) == len(server_ids)
+            elif operation == 1:
+                assert len(client.products.get(force_refresh=True)) == len(api.products)
+            elif operation == 2:
+                id = rng.choice(server_ids)
+                assert client.servers.action(id, 'start') == {id: True}
+            else:
+                ids = rng.sample(server_ids, 3)
+                results = client.servers.map_concurrent(lambda id: client.servers.action(id, 'stop')[id], ids, 3)
+                assert results == [True] * 3, results
+        except Exception as e:
+            errors.append(repr(e))
+    return iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=64, help='threads sharing the client')
+    parser.add_argument('--iterations', type=int, default=50, help='operations per thread')
+    parser.add_argument('--rotations', type=int, default=5, help='times the API expires the token during the run')
+    args = parser.parse_args()
+
+    errors = []
+    with MockLeaderGPUAPI(servers=20, products=100) as api:
+        client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=args.threads)
+        done = threading.Event()
+
+        def rotate() -> None:
+            for _ in range(args.rotations):
+                if done.wait(1.0):
+                    return
+                api.rotate_token()
+
+        threads = [threading.Thread(target=worker, args=(client, api, args.iterations, seed, errors))
+                   for seed in range(args.threads)]
+        rotator = threading.Thread(target=rotate)
+        start = time.perf_counter()
+        rotator.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        rotator.join()
+        client.close()
+
+        sign_ins = api.calls.get('/signin', 0)
+        report = {
+            'threads': args.threads,
+            'operations': args.threads * args.iterations,
+            'elapsed_s': elapsed,
+            'operations_per_s': args.threads * args.iterations / elapsed,
+            'sign_ins': sign_ins,
+            'rejected_tokens': api.rejected,
+            'errors': len(errors),
+            'first_errors': errors[:5],
+            'api_calls': api.calls,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import asyncio
+import os
+from leadergpu import AsyncLeaderGPUClient
+
+CLIENT_ID = os.environ['LEADERGPU_CLIENT_ID']
+CLIENT_SECRET = os.environ['LEADERGPU_AUTH_TOKEN']
+
+
+async def main():
+    # Create the asyncio LeaderGPU client, at most 10 requests run at the same time
+    async with AsyncLeaderGPUClient(CLIENT_ID, CLIENT_SECRET, max_concurrency=10) as leadergpu:
+        # Get all servers
+        servers = await leadergpu.servers.get()
+
+        # Suspend all servers concurrently
+        print(await asyncio.gather(*[server.suspend() for server in servers]))
+
+asyncio.run(main())
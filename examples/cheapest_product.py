@@ -0,0 +1,19 @@
+import os
+from leadergpu import LeaderGPUClient
+
+CLIENT_ID = os.environ['LEADERGPU_CLIENT_ID']
+CLIENT_SECRET = os.environ['LEADERGPU_AUTH_TOKEN']
+
+leadergpu = LeaderGPUClient(CLIENT_ID, CLIENT_SECRET)
+
+# Get the product catalog as columns (requires numpy)
+table = leadergpu.products.table()
+
+# Pick the cheapest available product billed in Euro that supports ubuntu, in a single array operation
+product = table.cheapest(currency='EUR', os='ubuntu', available=True)
+print(product)
+
+# Print the five cheapest available products
+cheapest = table.filter(available=True).sort('price')
+for product in cheapest.take(range(min(5, len(cheapest)))):
+    print(product)
@@ -1 +1,32 @@
-from leadergpu.leadergpu import LeaderGPUClient
+import sys
+
+__all__ = ['LeaderGPUClient', 'AsyncLeaderGPUClient', 'FileTokenStore', 'deadline']
+
+# The clients are imported on first access, so importing the package stays cheap.
+_LAZY_ATTRIBUTES = {
+    'LeaderGPUClient': 'leadergpu.leadergpu',
+    'AsyncLeaderGPUClient': 'leadergpu.async_leadergpu',
+    'FileTokenStore': 'leadergpu.authentication.token_store',
+    'deadline': 'leadergpu.deadlines',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module 'leadergpu' has no attribute '{name}'")
+    import importlib
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+if sys.version_info < (3, 7):  # pragma: no cover - module __getattr__ needs PEP 562
+    from leadergpu.leadergpu import LeaderGPUClient  # noqa: F401
+    from leadergpu.async_leadergpu import AsyncLeaderGPUClient  # noqa: F401
+    from leadergpu.authentication.token_store import FileTokenStore  # noqa: F401
+    from leadergpu.deadlines import deadline  # noqa: F401
@@ -0,0 +1,136 @@
+from typing import Dict
+
+from leadergpu.authentication.authentication import AuthenticationService
+from leadergpu.authentication.token_store import FileTokenStore
+from leadergpu.http_client.async_http_client import AsyncHTTPClient
+from leadergpu.http_client.cache import ResponseCache
+from leadergpu.http_client.circuit_breaker import CircuitBreaker
+from leadergpu.http_client.instrumentation import Instrumentation
+from leadergpu.http_client.single_flight import AsyncSingleFlight
+from leadergpu.http_client.json_codec import JSONCodec
+from leadergpu.http_client.rate_limit import RateLimiter
+from leadergpu.http_client.retry import RetryPolicy
+from leadergpu.products.async_products import AsyncProductsService
+from leadergpu.servers.async_servers import AsyncServersService
+from leadergpu.constants import Constants
+from leadergpu.__version__ import VERSION
+
+
+class AsyncLeaderGPUClient:
+    """Asyncio client for interacting with LeaderGPU's public API"""
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 base_url: str = "https://api.leaderssl.com/api/v1/users",
+                 limit: int = 100,
+                 limit_per_host: int = 10,
+                 max_concurrency: int = None,
+                 keepalive_timeout: float = 15,
+                 cache_ttl: Dict[str, float] = None,
+                 cache_maxsize: int = 128,
+                 token_store: FileTokenStore = None,
+                 retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 json_codec: JSONCodec = None,
+                 instrumentation: Instrumentation = None,
+                 coalesce: bool = True,
+                 connect_timeout: float = 10.0,
+                 read_timeout: float = 60.0,
+                 circuit_breaker: CircuitBreaker = None) -> None:
+        """The asyncio LeaderGPU client
+
+        The client authenticates on the first request. Every service shares one
+        connection pool and concurrency limit, so many operations can be gathered.
+
+        :param client_id: client id
+        :type client_id: str
+        :param client_secret: client secret
+        :type client_secret: str
+        :param base_url: base url for all the endpoints, optional, defaults to "https://api.leaderssl.com/api/v1/users"
+        :type base_url: str, optional
+        :param limit: maximum number of open connections, defaults to 100
+        :type limit: int, optional
+        :param limit_per_host: maximum number of open connections per host, defaults to 10
+        :type limit_per_host: int, optional
+        :param max_concurrency: maximum number of requests in flight, defaults to None
+        :type max_concurrency: int, optional
+        :param keepalive_timeout: seconds an idle connection is kept open, defaults to 15
+        :type keepalive_timeout: float, optional
+        :param cache_ttl: opt-in response cache, time to live in seconds per endpoint,
+                          e.g. {'/servers/products': 300, '/servers': 5}, defaults to None (no caching)
+        :type cache_ttl: Dict[str, float], optional
+        :param cache_maxsize: maximum number of cached responses, defaults to 128
+        :type cache_maxsize: int, optional
+        :param token_store: store to reuse tokens across processes instead of signing in, defaults to None
+        :type token_store: FileTokenStore, optional
+        :param retry_policy: retries with exponential backoff for failed requests, defaults to RetryPolicy(),
+                             pass RetryPolicy(max_attempts=1) to disable retries
+        :type retry_policy: RetryPolicy, optional
+        :param rate_limiter: client side token bucket rate limiter per endpoint class, defaults to None
+        :type rate_limiter: RateLimiter, optional
+        :param json_codec: codec for request and response bodies, defaults to the standard library json module,
+                           best_available_codec() picks orjson if it is installed
+        :type json_codec: JSONCodec, optional
+        :param instrumentation: request tracing and per endpoint latency histograms, defaults to None (off)
+        :type instrumentation: Instrumentation, optional
+        :param coalesce: share one request between identical concurrent GET calls, defaults to True
+        :type coalesce: bool, optional
+        :param connect_timeout: seconds to wait for a connection to the API, defaults to 10
+        :type connect_timeout: float, optional
+        :param read_timeout: seconds to wait for the API to answer, defaults to 60. A timeout
+                             passed to a call overrides both, and a deadline() block shrinks them
+        :type read_timeout: float, optional
+        :param circuit_breaker: fails requests fast per endpoint group while the API keeps failing,
+                                defaults to None (off)
+        :type circuit_breaker: CircuitBreaker, optional
+        """
+
+        self.constants: Constants = Constants(base_url, VERSION)
+
+        self.cache: ResponseCache = ResponseCache(cache_ttl, cache_maxsize) if cache_ttl else None
+        """Response cache with hit and miss counters, None if caching is disabled"""
+
+        self.instrumentation: Instrumentation = instrumentation
+        """Request statistics, None if instrumentation is disabled"""
+
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+        """Circuit states per endpoint group, None if the circuit breaker is disabled"""
+
+        self._authentication: AuthenticationService = AuthenticationService(client_id,
+                                                                            client_secret,
+                                                                            self.constants.base_url,
+                                                                            token_store=token_store,
+                                                                            instrumentation=instrumentation,
+                                                                            timeout=(connect_timeout, read_timeout))
+
+        self._http_client: AsyncHTTPClient = AsyncHTTPClient(self._authentication,
+                                                             self.constants.base_url,
+                                                             limit=limit,
+                                                             limit_per_host=limit_per_host,
+                                                             max_concurrency=max_concurrency,
+                                                             keepalive_timeout=keepalive_timeout,
+                                                             cache=self.cache,
+                                                             retry_policy=retry_policy,
+                                                             rate_limiter=rate_limiter,
+                                                             json_codec=json_codec,
+                                                             instrumentation=instrumentation,
+                                                             coalesce=coalesce,
+                                                             timeout=(connect_timeout, read_timeout),
+                                                             circuit_breaker=circuit_breaker)
+
+        self.single_flight: AsyncSingleFlight = self._http_client.single_flight
+        """Counters of coalesced GET requests, None if coalescing is disabled"""
+
+        self.products: AsyncProductsService = AsyncProductsService(self._http_client)
+        self.servers: AsyncServersService = AsyncServersService(self._http_client)
+
+    async def close(self) -> None:
+        """Close the client and release all pooled connections"""
+        await self._http_client.close()
+
+    async def __aenter__(self) -> 'AsyncLeaderGPUClient':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
@@ -1,14 +1,35 @@
-import requests
+import threading
+from typing import TYPE_CHECKING, NamedTuple
 
+from leadergpu.deadlines import Timeout, request_timeout
 from leadergpu.http_client.http_client import handle_error
 
+if TYPE_CHECKING:
+    import requests
+
 TOKEN_ENDPOINT = '/signin'
 
 
+class AuthState(NamedTuple):
+    """An authentication token with the id of the user it belongs to"""
+
+    auth_token: str
+    user_id: int
+
+
+SIGNED_OUT = AuthState(None, None)
+
+
 class AuthenticationService:
-    """A service for client authentication"""
+    """A service for client authentication
 
-    def __init__(self, client_id: str, client_secret: str, base_url: str) -> None:
+    The token and the user id are kept in one immutable AuthState that is
+    replaced in a single assignment, so a request never combines the token of
+    one sign in with the user id of another. Sign ins are serialized by a lock.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, base_url: str, token_store=None,
+                 instrumentation=None, timeout: Timeout = None) -> None:
         """Initialize a authentication service object
 
         :param client_id: client id
@@ -17,12 +38,24 @@ class AuthenticationService:
         :type client_secret: str
         :param base_url: base url
         :type base_url: str
+        :param token_store: store to reuse and persist tokens across processes, defaults to None
+        :type token_store: FileTokenStore, optional
+        :param instrumentation: records timing of the sign in requests, defaults to None
+        :type instrumentation: Instrumentation, optional
+        :param timeout: timeout of the sign in request, seconds or a (connect, read) tuple, defaults to None
+        :type timeout: Timeout, optional
         """
         self._client_id = client_id
         self._client_secret = client_secret
         self._base_url = base_url
+        self._token_store = token_store
+        self.instrumentation = instrumentation
+        self.timeout = timeout
+        self.state: AuthState = SIGNED_OUT
+        """The current authentication state, read it once per request"""
+        self._lock = threading.Lock()
 
-    def authenticate(self) -> dict:
+    def authenticate(self, session: 'requests.Session' = None) -> dict:
         """Authenticate the client and store the authentication token
 
         returns an authentication data dictionary with the following schema:
@@ -31,6 +64,8 @@ class AuthenticationService:
             "auth_token": authentication token
         }
 
+        :param session: pooled session to send the sign in request with, defaults to None
+        :type session: requests.Session, optional
         :return: authentication data (id, auth_token)
         :rtype: dict
         """
@@ -40,16 +75,133 @@ class AuthenticationService:
             "password": self._client_secret
         }
 
-        response = requests.post(url, data=payload, headers=self._generate_headers())
-        handle_error(response)
+        if session is None:
+            import requests
+            session = requests
+
+        record = self.instrumentation.start('POST', TOKEN_ENDPOINT) if self.instrumentation is not None else None
+        try:
+            response = session.post(url, data=payload, headers=self._generate_headers(),
+                                    timeout=request_timeout(self.timeout))
+            handle_error(response)
+        except Exception as error:
+            if record is not None:
+                self.instrumentation.finish(record, error=error)
+            raise
+        if record is not None:
+            record.attempts = 1
+            record.response_bytes = len(response.content)
+            self.instrumentation.finish(record, response.status_code)
 
         auth_data = response.json()
+        self._store(auth_data)
+
+        return auth_data
+
+    def restore(self) -> bool:
+        """Reuse the token from the token store instead of signing in
+
+        If the API rejects the stored token, the client signs in again and the
+        new token replaces the stored one.
+
+        :return: True if a stored token was found
+        :rtype: bool
+        """
+        if self._token_store is None:
+            return False
+        auth_data = self._token_store.load(self._client_id, self._base_url)
+        if auth_data is None:
+            return False
+        self.state = AuthState(auth_data['auth_token'], auth_data['id'])
+        return True
+
+    def ensure_authenticated(self, session: 'requests.Session' = None) -> dict:
+        """Restore the stored token or sign in, unless the client is already authenticated
+
+        Only one sign in runs at a time, concurrent first requests wait for it.
+
+        :param session: pooled session to send the sign in request with, defaults to None
+        :type session: requests.Session, optional
+        :return: authentication data (id, auth_token)
+        :rtype: dict
+        """
+        with self._lock:
+            if self.state.auth_token is None and not self.restore():
+                self.authenticate(session)
+            return self._auth_data()
+
+    def refresh(self, stale_token: str, session: 'requests.Session' = None) -> dict:
+        """Sign in again after the API rejected stale_token
 
-        self._auth_token = auth_data['auth_token']
-        self._user_id = auth_data['id']
+        Only one sign in runs at a time. Callers that waited for it find the token
+        already replaced and return without signing in again.
+
+        :param stale_token: the token the API rejected
+        :type stale_token: str
+        :param session: pooled session to send the sign in request with, defaults to None
+        :type session: requests.Session, optional
+        :return: authentication data (id, auth_token)
+        :rtype: dict
+        """
+        with self._lock:
+            if self.state.auth_token == stale_token:
+                self.authenticate(session)
+            return self._auth_data()
+
+    async def authenticate_async(self, session) -> dict:
+        """Authenticate the client through an aiohttp session and store the authentication token
+
+        :param session: pooled aiohttp session to send the sign in request with
+        :type session: aiohttp.ClientSession
+        :return: authentication data (id, auth_token)
+        :rtype: dict
+        """
+        from leadergpu.http_client.async_http_client import client_timeout, handle_async_error
+
+        url = self._base_url + TOKEN_ENDPOINT
+        payload = {
+            "login": self._client_id,
+            "password": self._client_secret
+        }
+
+        record = self.instrumentation.start('POST', TOKEN_ENDPOINT) if self.instrumentation is not None else None
+        try:
+            kwargs = {'trace_request_ctx': record} if record is not None else {}
+            timeout = client_timeout(self.timeout)
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            async with session.post(url, data=payload, headers=self._generate_headers(), **kwargs) as response:
+                body = await response.read()
+            await handle_async_error(response)
+        except Exception as error:
+            if record is not None:
+                self.instrumentation.finish(record, error=error)
+            raise
+        if record is not None:
+            record.attempts = 1
+            record.response_bytes = len(body)
+            self.instrumentation.finish(record, response.status)
+
+        auth_data = await response.json()
+        self._store(auth_data)
 
         return auth_data
 
+    def _store(self, auth_data: dict) -> None:
+        """Keep the authentication data and persist it in the token store
+
+        :param auth_data: authentication data (id, auth_token)
+        :type auth_data: dict
+        """
+        self.state = AuthState(auth_data['auth_token'], auth_data['id'])
+        if self._token_store is not None:
+            self._token_store.save(self._client_id, self._base_url, auth_data)
+
+    def _auth_data(self) -> dict:
+        """Get the current authentication data (id, auth_token)"""
+        state = self.state
+        return {'id': state.user_id, 'auth_token': state.auth_token}
+
     def _generate_headers(self):
         # get the first 10 chars of the client id
         client_id_truncated = self._client_id[:10]
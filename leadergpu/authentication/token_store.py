@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+def default_token_path() -> str:
+    """Get the default token store location, inside the user's cache directory
+
+    :return: path of the token file
+    :rtype: str
+    """
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'leadergpu', 'tokens.json')
+
+
+class FileTokenStore:
+    """A file backed store for authentication tokens.
+
+    Tokens are keyed by client id and base url, so short lived processes can
+    reuse a token instead of signing in on every start. The file is only
+    readable by the owner (0600) and every access holds an exclusive file lock,
+    so concurrent processes do not corrupt it.
+    """
+
+    def __init__(self, path: str = None) -> None:
+        """Initialize the token store
+
+        :param path: path of the token file, defaults to ~/.cache/leadergpu/tokens.json
+        :type path: str, optional
+        """
+        self._path = path or default_token_path()
+        self._lock_path = self._path + '.lock'
+        self._thread_lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        """Get the path of the token file
+
+        :return: path of the token file
+        :rtype: str
+        """
+        return self._path
+
+    def load(self, client_id: str, base_url: str) -> dict:
+        """Load the stored authentication data
+
+        :param client_id: client id
+        :type client_id: str
+        :param base_url: base url
+        :type base_url: str
+        :return: authentication data (id, auth_token) or None if nothing is stored
+        :rtype: dict
+        """
+        with self._locked():
+            entry = self._read().get(self._key(client_id, base_url))
+        if not entry or 'auth_token' not in entry or 'id' not in entry:
+            return None
+        return {'id': entry['id'], 'auth_token': entry['auth_token']}
+
+    def save(self, client_id: str, base_url: str, auth_data: dict) -> None:
+        """Store authentication data
+
+        :param client_id: client id
+        :type client_id: str
+        :param base_url: base url
+        :type base_url: str
+        :param auth_data: authentication data (id, auth_token)
+        :type auth_data: dict
+        """
+        with self._locked():
+            tokens = self._read()
+            tokens[self._key(client_id, base_url)] = {
+                'id': auth_data['id'],
+                'auth_token': auth_data['auth_token'],
+                'saved_at': time.time()
+            }
+            self._write(tokens)
+
+    def delete(self, client_id: str, base_url: str) -> None:
+        """Remove the stored authentication data
+
+        :param client_id: client id
+        :type client_id: str
+        :param base_url: base url
+        :type base_url: str
+        """
+        with self._locked():
+            tokens = self._read()
+            if tokens.pop(self._key(client_id, base_url), None) is not None:
+                self._write(tokens)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and an exclusive lock on the lock file"""
+        os.makedirs(os.path.dirname(self._path) or '.', mode=0o700, exist_ok=True)
+        with self._thread_lock:
+            fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _read(self) -> dict:
+        try:
+            with open(self._path, 'r', encoding='utf-8') as fp:
+                tokens = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        return tokens if isinstance(tokens, dict) else {}
+
+    def _write(self, tokens: dict) -> None:
+        # Write to a private temporary file and swap it in, readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._path) or '.', prefix='.tokens-')
+        try:
+            os.chmod(tmp_path, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+                json.dump(tokens, fp)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _key(client_id: str, base_url: str) -> str:
+        return hashlib.sha256(f'{base_url}\n{client_id}'.encode('utf-8')).hexdigest()
@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, List, TypeVar, Union
+
+from leadergpu.deadlines import bind
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_concurrent(fn: Callable[[T], R], items: Iterable[T], max_workers: int = 8) -> List[Union[R, Exception]]:
+    """Call fn for every item on a bounded thread pool
+
+    A failing call does not abort the others, its exception takes the place of
+    the result. The calls run under the caller's deadline, once it passed the
+    calls not yet started fail with DeadlineExceeded without sending anything.
+
+    :param fn: function called with every item
+    :type fn: Callable[[T], R]
+    :param items: the items
+    :type items: Iterable[T]
+    :param max_workers: maximum number of concurrent calls, defaults to 8
+    :type max_workers: int, optional
+    :return: the result or the raised exception of every item, in the order of the items
+    :rtype: List[Union[R, Exception]]
+    """
+    items = list(items)
+    if not items:
+        return []
+    fn = bind(fn)
+
+    def call(item: T) -> Union[R, Exception]:
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(call, items))
+
+
+async def gather_concurrent(fn: Callable[[T], Awaitable[R]],
+                            items: Iterable[T],
+                            max_concurrency: int = None) -> List[Union[R, Exception]]:
+    """Await fn for every item concurrently
+
+    A failing call does not abort the others, its exception takes the place of
+    the result.
+
+    :param fn: coroutine function called with every item
+    :type fn: Callable[[T], Awaitable[R]]
+    :param items: the items
+    :type items: Iterable[T]
+    :param max_concurrency: maximum number of calls in flight, defaults to None (only the client's limits apply)
+    :type max_concurrency: int, optional
+    :return: the result or the raised exception of every item, in the order of the items
+    :rtype: List[Union[R, Exception]]
+    """
+    if max_concurrency is None:
+        return await asyncio.gather(*map(fn, items), return_exceptions=True)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def call(item: T) -> Any:
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*map(call, items), return_exceptions=True)
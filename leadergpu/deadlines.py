@@ -0,0 +1,138 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple, TypeVar, Union
+
+from leadergpu.exceptions import DeadlineExceeded
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover - Python 3.6, deadlines are kept per thread
+    ContextVar = None
+
+F = TypeVar('F', bound=Callable)
+
+Timeout = Union[float, Tuple[float, float]]
+"""Seconds for a request, or a (connect, read) tuple"""
+
+
+class _ThreadLocalVar:
+    """The part of the ContextVar interface the deadline uses, kept per thread"""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def get(self) -> Optional[float]:
+        return getattr(self._local, 'value', None)
+
+    def set(self, value: Optional[float]) -> Optional[float]:
+        previous = self.get()
+        self._local.value = value
+        return previous
+
+    def reset(self, token: Optional[float]) -> None:
+        self._local.value = token
+
+
+_deadline = ContextVar('leadergpu_deadline', default=None) if ContextVar is not None else _ThreadLocalVar()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Bound the time of every request made inside the block
+
+    The deadline carries through nested calls and coroutines: every request
+    made in the block, directly or by a service, gets its timeout shrunk to
+    the time left, and a request started after the deadline passed raises
+    DeadlineExceeded without being sent. A nested deadline never extends the
+    outer one.
+
+    :param seconds: time budget of the block
+    :type seconds: float
+    :return: the deadline, in time.monotonic() seconds
+    :rtype: Iterator[float]
+    """
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None and outer < at:
+        at = outer
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Get the seconds left before the current deadline
+
+    :return: seconds left, negative once the deadline passed, None if there is no deadline
+    :rtype: Optional[float]
+    """
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    """Check if the current deadline passed
+
+    :return: True if there is a deadline and it passed
+    :rtype: bool
+    """
+    left = time_left()
+    return left is not None and left <= 0
+
+
+def allows(seconds: float) -> bool:
+    """Check if the current deadline leaves more than seconds
+
+    :param seconds: time needed, like the delay before a retry
+    :type seconds: float
+    :return: True if there is no deadline or it leaves more time
+    :rtype: bool
+    """
+    left = time_left()
+    return left is None or left > seconds
+
+
+def request_timeout(timeout: Timeout) -> Timeout:
+    """Shrink the timeout of a request to the time left before the current deadline
+
+    :param timeout: timeout of the request, None for no timeout
+    :type timeout: Timeout
+    :raises DeadlineExceeded: if the deadline passed
+    :return: the timeout to send the request with
+    :rtype: Timeout
+    """
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return min(timeout, left)
+
+
+def bind(fn: F) -> F:
+    """Wrap fn to run under the deadline of the caller, for handing it to another thread
+
+    :param fn: the function
+    :type fn: Callable
+    :return: fn, or a wrapper setting the caller's deadline around it
+    :rtype: Callable
+    """
+    at = _deadline.get()
+    if at is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _deadline.set(at)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return bound
@@ -5,7 +5,7 @@ class APIException(Exception):
     Raised when an API HTTP call response has a status code >= 400
     """
 
-    def __init__(self, code: str, message: str) -> None:
+    def __init__(self, code: str, message: str, status: int = None) -> None:
         """
         Initialize an APIException object
 
@@ -13,9 +13,12 @@ class APIException(Exception):
         :type code: str
         :param message: error message
         :type message: str
+        :param status: HTTP status code of the response, defaults to None
+        :type status: int, optional
         """
         self.code = code
         self.message = message
+        self.status = status
 
     def __str__(self) -> str:
         msg = ""
@@ -24,3 +27,58 @@ class APIException(Exception):
         msg += f'message: {self.message}'
 
         return msg
+
+
+class ServerNotFoundException(APIException, IndexError):
+    """This exception is raised if no server with the requested id exists.
+
+    Also an IndexError, the error get_by_id raised before it existed.
+    """
+
+    def __init__(self, id: int) -> None:
+        """
+        Initialize a ServerNotFoundException object
+
+        :param id: the requested server id
+        :type id: int
+        """
+        super().__init__('server_not_found', f'No server with id {id}', 404)
+        self.id = id
+
+
+class DeadlineExceeded(APIException, TimeoutError):
+    """This exception is raised if the deadline of an operation passed before a request completed.
+
+    Also a TimeoutError. Requests not yet sent when the deadline passes fail
+    with it right away, without reaching the API.
+    """
+
+    def __init__(self, message: str = 'The deadline passed before the request completed') -> None:
+        """
+        Initialize a DeadlineExceeded object
+
+        :param message: error message
+        :type message: str, optional
+        """
+        super().__init__('deadline_exceeded', message)
+
+
+class CircuitOpenException(APIException):
+    """This exception is raised instead of sending a request while the circuit of its endpoint group is open.
+
+    The request did not reach the API.
+    """
+
+    def __init__(self, group: str, retry_after: float = None) -> None:
+        """
+        Initialize a CircuitOpenException object
+
+        :param group: endpoint group of the open circuit
+        :type group: str
+        :param retry_after: seconds until the circuit lets a probe request through,
+                            defaults to None (a probe is in flight)
+        :type retry_after: float, optional
+        """
+        super().__init__('circuit_open', f'The circuit of the {group} endpoints is open')
+        self.group = group
+        self.retry_after = retry_after
@@ -0,0 +1,614 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Hashable
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+from leadergpu.deadlines import Timeout, allows, expired, request_timeout, time_left
+from leadergpu.exceptions import APIException, DeadlineExceeded
+from leadergpu.http_client.cache import ResponseCache, ValidatorStore, invalidated_path
+from leadergpu.http_client.circuit_breaker import CircuitBreaker, Permit
+from leadergpu.http_client.instrumentation import Instrumentation, RequestRecord, aiohttp_trace_config
+from leadergpu.http_client.json_codec import JSONArrayParser, JSONCodec
+from leadergpu.http_client.rate_limit import RateLimiter
+from leadergpu.http_client.retry import RetryAttempt, RetryPolicy
+from leadergpu.http_client.single_flight import AsyncSingleFlight
+from leadergpu.__version__ import VERSION
+
+
+async def handle_async_error(response) -> None:
+    """checks for the response status code and raises an exception if it's 400 or higher.
+
+    :param response: the API call response
+    :type response: aiohttp.ClientResponse
+    :raises APIException: an api exception with message and error type code
+    """
+    if not response.ok:
+        data = json.loads(await response.text())
+        code = data['code'] if 'code' in data else None
+        message = data['message'] if 'message' in data else None
+        raise APIException(code, message, response.status)
+
+
+def client_timeout(timeout):
+    """Convert a requests style timeout to an aiohttp timeout, bounded by the current deadline
+
+    :param timeout: seconds for the whole request, a (connect, read) tuple, or an aiohttp.ClientTimeout
+    :type timeout: Union[float, Tuple[float, float], aiohttp.ClientTimeout]
+    :raises DeadlineExceeded: if the current deadline passed
+    :return: the aiohttp timeout, None if there is neither a timeout nor a deadline
+    :rtype: aiohttp.ClientTimeout
+    """
+    if isinstance(timeout, aiohttp.ClientTimeout):
+        left = request_timeout(None)
+        if left is None:
+            return timeout
+        return aiohttp.ClientTimeout(total=left if timeout.total is None else min(timeout.total, left),
+                                     connect=timeout.connect,
+                                     sock_connect=timeout.sock_connect,
+                                     sock_read=timeout.sock_read)
+    timeout = request_timeout(timeout)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(total=time_left(), sock_connect=connect, sock_read=read)
+    return aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+
+
+class _Slot:
+    """Holds a slot of the concurrency limit, waiting for it only until the current deadline"""
+
+    __slots__ = ('_semaphore',)
+
+    def __init__(self, semaphore: asyncio.Semaphore = None) -> None:
+        self._semaphore = semaphore
+
+    async def __aenter__(self) -> '_Slot':
+        if self._semaphore is None:
+            return self
+        left = time_left()
+        if left is None:
+            await self._semaphore.acquire()
+            return self
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(left, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded() from None
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+class AsyncHTTPClient:
+    """An asyncio http client, a wrapper for the aiohttp library.
+
+    The async twin of HTTPClient. All requests share one aiohttp connection pool
+    and an optional concurrency limit, so callers can gather many operations
+    without opening a connection per call. The client authenticates lazily on the
+    first request.
+    """
+
+    def __init__(self,
+                 auth_service,
+                 base_url: str,
+                 limit: int = 100,
+                 limit_per_host: int = 10,
+                 max_concurrency: int = None,
+                 keepalive_timeout: float = 15,
+                 cache: ResponseCache = None,
+                 retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 json_codec: JSONCodec = None,
+                 instrumentation: Instrumentation = None,
+                 coalesce: bool = True,
+                 timeout: Timeout = None,
+                 circuit_breaker: CircuitBreaker = None) -> None:
+        """Initialize the async http client
+
+        :param auth_service: authentication service
+        :type auth_service: AuthenticationService
+        :param base_url: base url for all the endpoints
+        :type base_url: str
+        :param limit: maximum number of open connections, defaults to 100
+        :type limit: int, optional
+        :param limit_per_host: maximum number of open connections per host, defaults to 10
+        :type limit_per_host: int, optional
+        :param max_concurrency: maximum number of requests in flight, defaults to None (only the pool limits apply)
+        :type max_concurrency: int, optional
+        :param keepalive_timeout: seconds an idle connection is kept open, defaults to 15
+        :type keepalive_timeout: float, optional
+        :param cache: cache for decoded GET responses, defaults to None (no caching)
+        :type cache: ResponseCache, optional
+        :param retry_policy: which failed requests are retried and how, defaults to RetryPolicy()
+        :type retry_policy: RetryPolicy, optional
+        :param rate_limiter: client side rate limiter shared by all services, defaults to None
+        :type rate_limiter: RateLimiter, optional
+        :param json_codec: codec for request and response bodies, defaults to JSONCodec() (standard library)
+        :type json_codec: JSONCodec, optional
+        :param instrumentation: records timing, size and retries of every request, defaults to None
+        :type instrumentation: Instrumentation, optional
+        :param coalesce: merge identical concurrent get_json calls into one request, defaults to True
+        :type coalesce: bool, optional
+        :param timeout: default timeout of every request, seconds or a (connect, read) tuple,
+                        a timeout passed to a call overrides it, defaults to None (no timeout)
+        :type timeout: Timeout, optional
+        :param circuit_breaker: fails requests fast while the API keeps failing, defaults to None
+        :type circuit_breaker: CircuitBreaker, optional
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncHTTPClient requires aiohttp, install it with 'pip install leadergpu-python[async]'")
+        self._version = VERSION
+        self._base_url = base_url
+        self._auth_service = auth_service
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._json_codec = json_codec if json_codec is not None else JSONCodec()
+        self.instrumentation = instrumentation
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+        self._validators = ValidatorStore()
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._session = None
+        self._auth_lock = None
+
+    async def post(self, url: str, json: dict = None, params: dict = None, **kwargs):
+        """Sends a POST request.
+
+        A wrapper for the aiohttp.ClientSession.post method.
+
+        Builds the url, uses custom headers, authenticates if needed.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param json: A JSON serializable Python object to send in the body of the Request, defaults to None
+        :type json: dict, optional
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: Response object, the body is already read
+        :rtype: aiohttp.ClientResponse
+        """
+        if json is not None:
+            kwargs['data'] = self._json_codec.dumps(json)
+        response = await self._request('POST', url, params=params, **kwargs)
+        if self.cache is not None:
+            path = invalidated_path(url)
+            if path is not None:
+                self.cache.invalidate(path)
+        return response
+
+    async def get(self, url: str, params: dict = None, **kwargs):
+        """Sends a GET request.
+
+        A wrapper for the aiohttp.ClientSession.get method.
+
+        Builds the url, uses custom headers, authenticates if needed.
+        Sends the stored ETag / Last-Modified validators of the url, if the API
+        answers with 304 Not Modified the stored response is returned.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+        :param kwargs: other arguments of aiohttp.ClientSession.request, like timeout
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: Response object, the body is already read
+        :rtype: aiohttp.ClientResponse
+        """
+        return await self._request('GET', url, params=params, **kwargs)
+
+    async def get_json(self, url: str, params: dict = None, force_refresh: bool = False, **kwargs):
+        """Sends a GET request and returns the decoded body.
+
+        Served from the response cache if the endpoint is cached and the entry
+        did not expire. If the API answers with 304 Not Modified the previously
+        decoded body is returned as is, without decoding it again. Identical
+        calls made while one is in flight wait for it and share its decoded body.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+        :param force_refresh: bypass the cache and fetch a fresh response, defaults to False
+        :type force_refresh: bool, optional
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: decoded response body
+        :rtype: Any
+        """
+        cacheable = self.cache is not None and self.cache.is_cacheable(url)
+        if cacheable and not force_refresh:
+            data = self.cache.get(url, params)
+            if data is not None:
+                return data
+
+        key = self._flight_key(url, params, kwargs)
+        if key is None:
+            data = await self._fetch_json(url, params, **kwargs)
+        else:
+            data = await self.single_flight.do(key, lambda: self._fetch_json(url, params, **kwargs))
+        if cacheable:
+            self.cache.set(url, params, data)
+        return data
+
+    async def _fetch_json(self, url: str, params: dict = None, **kwargs) -> Any:
+        """Send a GET request and decode the body, reusing the stored decoded body on 304 Not Modified"""
+        response = await self.get(url, params=params, **kwargs)
+        full_url = self._add_base_url(url)
+        data = self._validators.payload(full_url, params, response)
+        if data is None:
+            data = self._json_codec.loads(await response.read())
+            self._validators.set_payload(full_url, params, response, data)
+        return data
+
+    def _flight_key(self, url: str, params: dict, kwargs: dict) -> Hashable:
+        """Get the identity of a get_json call, None if it is not coalesced"""
+        if self.single_flight is None:
+            return None
+        key = (self._auth_service.state.user_id, ResponseCache._key(url, params), tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    async def iter_json(self, url: str, params: dict = None, chunk_size: int = 65536,
+                        **kwargs) -> AsyncIterator[Any]:
+        """Sends a GET request and yields the elements of the JSON array it returns.
+
+        The body is streamed and parsed incrementally, neither the full body nor
+        the full list of elements is held in memory. The request holds a slot of
+        the concurrency limit until the iteration ends. It is retried, rate limited
+        and instrumented like any other request, only no conditional request is made.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+        :param chunk_size: number of bytes read at once, defaults to 65536
+        :type chunk_size: int, optional
+        :param kwargs: other arguments of aiohttp.ClientSession.request, like timeout
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: async iterator over the decoded array elements
+        :rtype: AsyncIterator[Any]
+        """
+        async with _Slot(self._get_semaphore()):
+            response = await self._request('GET', url, params=params, stream=True, **kwargs)
+            try:
+                parser = JSONArrayParser()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for item in parser.feed(chunk):
+                        yield item
+                for item in parser.close():
+                    yield item
+            finally:
+                # A no-op once the body was read to the end, else the connection is not reusable.
+                response.close()
+
+    async def authenticate(self, stale_token: str = None) -> dict:
+        """Authenticate the client, only one sign in runs at a time
+
+        Coroutines that waited for a running sign in find the token already
+        replaced and return without signing in again.
+
+        :param stale_token: the token the API rejected, defaults to None (not signed in yet)
+        :type stale_token: str, optional
+        :return: authentication data (id, auth_token)
+        :rtype: dict
+        """
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if self._auth_service.state.auth_token == stale_token:
+                if stale_token is not None or not self._auth_service.restore():
+                    await self._auth_service.authenticate_async(self._get_session())
+        return self._auth_service._auth_data()
+
+    async def close(self) -> None:
+        """Close the session and release all pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        # Created again inside the loop that uses the client next.
+        self._semaphore = None
+        self._auth_lock = None
+
+    async def __aenter__(self) -> 'AsyncHTTPClient':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def _request(self, method: str, url: str, stream: bool = False, **kwargs):
+        """Send a request, signing in again and retrying once if the token was rejected
+
+        Failed attempts are retried as the retry policy allows.
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param stream: leave the body of a successful response unread, defaults to False
+        :type stream: bool, optional
+        :raises APIException: an api exception with message and error type code
+        :return: Response object, the body is already read unless streamed
+        :rtype: aiohttp.ClientResponse
+        """
+        if self._auth_service.state.auth_token is None:
+            await self.authenticate()
+
+        if kwargs.get('params') is None:
+            kwargs.pop('params', None)
+
+        record = self.instrumentation.start(method, url) if self.instrumentation is not None else None
+        try:
+            response = await self._send_with_retries(method, url, record, stream=stream, **kwargs)
+            status = response.status
+            response = await self._validated(response, url, kwargs.get('params'), method == 'GET' and not stream)
+        except Exception as error:
+            if record is not None:
+                self.instrumentation.finish(record, error=error)
+            raise
+
+        if record is not None:
+            self.instrumentation.finish(record, status)
+        return response
+
+    async def _validated(self, response, url: str, params: dict, conditional: bool):
+        """Check the status of a response, a 304 Not Modified is answered with the stored response
+
+        :param response: the API call response
+        :type response: aiohttp.ClientResponse
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: query parameters
+        :type params: dict
+        :param conditional: the request was a conditional GET whose validators are stored
+        :type conditional: bool
+        :raises APIException: an api exception with message and error type code
+        :return: the response, or the stored one on 304 Not Modified
+        :rtype: aiohttp.ClientResponse
+        """
+        full_url = self._add_base_url(url)
+        if conditional and response.status == 304:
+            stored = self._validators.response(full_url, params)
+            if stored is not None:
+                return stored
+        await handle_async_error(response)
+        if conditional:
+            self._validators.store(full_url, params, response)
+        return response
+
+    async def _send_with_retries(self, method: str, url: str, record: RequestRecord = None, **kwargs):
+        """Send a request until it succeeds, fails for good or runs out of attempts
+
+        No retry is made that the current deadline leaves no time for.
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request, defaults to None
+        :type record: RequestRecord, optional
+        :return: Response object of the last attempt, the body is already read
+        :rtype: aiohttp.ClientResponse
+        """
+        policy = self._retry_policy
+        attempt = 0
+        refreshed = False
+        while True:
+            attempt += 1
+            token = self._auth_service.state.auth_token
+            try:
+                response = await self._send(method, url, record, **kwargs)
+            except DeadlineExceeded:
+                raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                await asyncio.sleep(self._error_backoff(method, url, attempt, error))
+                continue
+
+            if response.status == 401 and not refreshed:
+                # A rejected token does not count as an attempt, sign in and send it again.
+                refreshed = True
+                attempt -= 1
+                await self.authenticate(token)
+                continue
+
+            if not response.ok and policy.should_retry(method, url, attempt, status=response.status):
+                delay = policy.backoff(attempt, response.headers.get('Retry-After'))
+                if allows(delay):
+                    policy.notify(RetryAttempt(method, url, attempt, status=response.status, delay=delay))
+                    await asyncio.sleep(delay)
+                    continue
+
+            policy.notify(RetryAttempt(method, url, attempt, status=response.status))
+            return response
+
+    def _error_backoff(self, method: str, url: str, attempt: int, error: Exception) -> float:
+        """Get the seconds to wait before retrying a request that raised
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param attempt: number of the failed attempt
+        :type attempt: int
+        :param error: the raised exception
+        :type error: Exception
+        :raises DeadlineExceeded: if the current deadline leaves no time for a retry
+        :return: the delay before the next attempt, error is raised again if there is none
+        :rtype: float
+        """
+        policy = self._retry_policy
+        connected = not isinstance(error, aiohttp.ClientConnectorError)
+        if not policy.should_retry(method, url, attempt, connected=connected):
+            policy.notify(RetryAttempt(method, url, attempt, error=error))
+            if expired():
+                raise DeadlineExceeded() from error
+            raise error
+        delay = policy.backoff(attempt)
+        if not allows(delay):
+            policy.notify(RetryAttempt(method, url, attempt, error=error))
+            raise DeadlineExceeded() from error
+        policy.notify(RetryAttempt(method, url, attempt, error=error, delay=delay))
+        return delay
+
+    async def _send(self, method: str, url: str, record: RequestRecord = None, **kwargs):
+        """Send a single request through the circuit breaker
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request, defaults to None
+        :type record: RequestRecord, optional
+        :raises CircuitOpenException: if the circuit of the endpoint group is open
+        :return: Response object, the body is already read
+        :rtype: aiohttp.ClientResponse
+        """
+        if self.circuit_breaker is None:
+            return await self._transmit(method, url, record, None, **kwargs)
+        permit = self.circuit_breaker.acquire(method, url)
+        try:
+            return await self._transmit(method, url, record, permit, **kwargs)
+        finally:
+            permit.cancel()
+
+    async def _transmit(self, method: str, url: str, record: RequestRecord, permit: Permit, stream: bool = False,
+                        **kwargs):
+        """Send a single request through the shared pool and concurrency limit, bounded by the current deadline
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request
+        :type record: RequestRecord
+        :param permit: circuit breaker permit the outcome is recorded on, None without a circuit breaker
+        :type permit: Permit
+        :param stream: leave the body of a successful response unread, the caller holds the concurrency slot,
+                       defaults to False
+        :type stream: bool, optional
+        :return: Response object, the body is already read unless streamed
+        :rtype: aiohttp.ClientResponse
+        """
+        if self._rate_limiter is not None:
+            delay = self._rate_limiter.reserve_before_deadline(method, url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        headers = self._generate_headers()
+        headers.update(kwargs.pop('headers', None) or {})
+        url = self._add_base_url(url)
+        if method == 'GET' and not stream:
+            headers.update(self._validators.headers(url, kwargs.get('params')))
+
+        kwargs.setdefault('timeout', self.timeout)
+        if record is not None:
+            record.attempts += 1
+            record.request_bytes = len(kwargs.get('data') or b'')
+            kwargs['trace_request_ctx'] = record
+
+        if stream:
+            return await self._read(method, url, headers, permit=permit, stream=True, **kwargs)
+        async with _Slot(self._get_semaphore()):
+            return await self._read(method, url, headers, permit=permit, **kwargs)
+
+    async def _read(self, method: str, url: str, headers: dict, timeout=None, permit: Permit = None,
+                    stream: bool = False, **kwargs):
+        # The deadline is applied once a slot of the concurrency limit is held,
+        # so the time spent waiting for it is not granted again.
+        timeout = client_timeout(timeout)
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if permit is not None:
+            permit.start()
+        try:
+            response = await self._get_session().request(method, url, headers=headers, **kwargs)
+            # Reading the whole body hands the connection back to the pool and keeps
+            # the body readable afterwards, unlike an explicit release. Error bodies
+            # of streamed requests are read too, they are small and may be retried.
+            body = await response.read() if not stream or not response.ok else None
+        except Exception:
+            if permit is not None:
+                permit.finish(failed=True)
+            raise
+        if permit is not None:
+            permit.finish(failed=response.status >= 500)
+        if body is not None and kwargs.get('trace_request_ctx') is not None:
+            kwargs['trace_request_ctx'].response_bytes = len(body)
+        return response
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency limit, created on first use inside the running loop
+
+        :return: the semaphore, None if the concurrency is not limited
+        :rtype: asyncio.Semaphore
+        """
+        if self._semaphore is None and self._max_concurrency:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    def _get_session(self):
+        """Get the shared session, created on first use inside the running loop
+
+        :return: the pooled session
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._limit,
+                                             limit_per_host=self._limit_per_host,
+                                             keepalive_timeout=self._keepalive_timeout)
+            trace_configs = [aiohttp_trace_config()] if self.instrumentation is not None else None
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+        return self._session
+
+    def _generate_headers(self) -> dict:
+        """Generate the default headers for every request
+
+        :return: dict with request headers
+        :rtype: dict
+        """
+        headers = {
+            'User-Agent': self._generate_user_agent(),
+            'Content-Type': 'application/json',
+            'X-Auth-Token': self._auth_service.state.auth_token
+        }
+        return headers
+
+    def _generate_user_agent(self) -> str:
+        """Generate the user agent string.
+
+        :return: user agent string
+        :rtype: str
+        """
+        client_id_truncated = self._auth_service._client_id[:10]
+
+        return f'leadergpu-python-v{self._version}-{client_id_truncated}'
+
+    def _add_base_url(self, url: str) -> str:
+        """Adds the base url to the relative url
+
+        :param url: a relative url path
+        :type url: str
+        :return: the full url path
+        :rtype: str
+        """
+        return self._base_url + "/" + str(self._auth_service.state.user_id) + url
@@ -0,0 +1,229 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class ResponseCache:
+    """A bounded, thread-safe TTL cache for decoded GET responses.
+
+    Only endpoints with a configured TTL are cached. Entries are keyed by the
+    relative endpoint path and the query parameters, the least recently used
+    entry is evicted once the cache is full.
+    """
+
+    def __init__(self, ttl: Dict[str, float], maxsize: int = 128) -> None:
+        """Initialize the response cache
+
+        :param ttl: time to live in seconds per relative endpoint path, e.g. {'/servers/products': 300}
+        :type ttl: Dict[str, float]
+        :param maxsize: maximum number of cached responses, defaults to 128
+        :type maxsize: int, optional
+        """
+        self._ttl = dict(ttl)
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        """Number of lookups answered from the cache"""
+        self.misses = 0
+        """Number of lookups for cacheable endpoints that were not cached or expired"""
+
+    def is_cacheable(self, path: str) -> bool:
+        """Check if responses of an endpoint are cached
+
+        :param path: relative endpoint path
+        :type path: str
+        :return: True if the endpoint has a TTL
+        :rtype: bool
+        """
+        return path in self._ttl
+
+    def get(self, path: str, params: dict = None) -> Any:
+        """Get a cached response
+
+        :param path: relative endpoint path
+        :type path: str
+        :param params: query parameters, defaults to None
+        :type params: dict, optional
+        :return: the cached response or None
+        :rtype: Any
+        """
+        key = self._key(path, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, path: str, params: dict, value: Any) -> None:
+        """Cache a response
+
+        :param path: relative endpoint path
+        :type path: str
+        :param params: query parameters
+        :type params: dict
+        :param value: decoded response
+        :type value: Any
+        """
+        if path not in self._ttl:
+            return
+        key = self._key(path, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl[path], value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str) -> None:
+        """Drop all cached responses of an endpoint, regardless of the query parameters
+
+        :param path: relative endpoint path
+        :type path: str
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get the cache counters
+
+        :return: dict with hits, misses and the current number of entries
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    @staticmethod
+    def _key(path: str, params: dict) -> Hashable:
+        return (path, tuple(sorted(params.items())) if params else ())
+
+
+def invalidated_path(url: str) -> str:
+    """Get the cached endpoint a state changing request to url invalidates
+
+    Ordering a server or running a server action changes the /servers listing.
+
+    :param url: relative url of the state changing request
+    :type url: str
+    :return: relative endpoint path to invalidate, or None
+    :rtype: str
+    """
+    if url.startswith('/servers/') and not url.startswith('/servers/products'):
+        return '/servers'
+    return None
+
+
+class ValidatorStore:
+    """Stores the ETag / Last-Modified validators of GET responses per url.
+
+    The stored response and its decoded body are returned when the API answers
+    a conditional request with 304 Not Modified.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        """Initialize the validator store
+
+        :param maxsize: maximum number of urls to keep validators for, defaults to 64
+        :type maxsize: int, optional
+        """
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def headers(self, url: str, params: dict = None) -> dict:
+        """Get the conditional request headers for a url
+
+        :param url: full url
+        :type url: str
+        :param params: query parameters, defaults to None
+        :type params: dict, optional
+        :return: If-None-Match / If-Modified-Since headers, empty if nothing is stored
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(ResponseCache._key(url, params))
+        if entry is None:
+            return {}
+        headers = {}
+        if entry[0]:
+            headers['If-None-Match'] = entry[0]
+        if entry[1]:
+            headers['If-Modified-Since'] = entry[1]
+        return headers
+
+    def response(self, url: str, params: dict = None):
+        """Get the stored response for a url
+
+        :param url: full url
+        :type url: str
+        :param params: query parameters, defaults to None
+        :type params: dict, optional
+        :return: the stored response or None
+        """
+        with self._lock:
+            entry = self._entries.get(ResponseCache._key(url, params))
+        return entry[2] if entry is not None else None
+
+    def store(self, url: str, params: dict, response) -> None:
+        """Store the validators of a successful response, if it has any
+
+        :param url: full url
+        :type url: str
+        :param params: query parameters
+        :type params: dict
+        :param response: the API call response
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        key = ResponseCache._key(url, params)
+        with self._lock:
+            self._entries[key] = [etag, last_modified, response, None]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def payload(self, url: str, params: dict, response) -> Any:
+        """Get the decoded body stored for a response
+
+        :param url: full url
+        :type url: str
+        :param params: query parameters
+        :type params: dict
+        :param response: the API call response
+        :return: the decoded body if response is the stored one and was decoded before, else None
+        :rtype: Any
+        """
+        with self._lock:
+            entry = self._entries.get(ResponseCache._key(url, params))
+        if entry is not None and entry[2] is response:
+            return entry[3]
+        return None
+
+    def set_payload(self, url: str, params: dict, response, payload: Any) -> None:
+        """Store the decoded body of a stored response
+
+        :param url: full url
+        :type url: str
+        :param params: query parameters
+        :type params: dict
+        :param response: the API call response
+        :param payload: decoded body
+        :type payload: Any
+        """
+        with self._lock:
+            entry = self._entries.get(ResponseCache._key(url, params))
+            if entry is not None and entry[2] is response:
+                entry[3] = payload
@@ -0,0 +1,326 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+from leadergpu.exceptions import CircuitOpenException
+from leadergpu.http_client.rate_limit import endpoint_class
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class Circuit:
+    """The circuit of one endpoint group.
+
+    Closed, requests pass and their outcomes fill a sliding window of the last
+    calls. Once the window holds enough calls and the share of failed or slow
+    calls reaches its threshold the circuit opens, and requests fail with
+    CircuitOpenException without reaching the API. After open_timeout seconds
+    the circuit is half open and lets a few probe requests through: if they
+    succeed it closes, if one fails or is slow it opens for another
+    open_timeout.
+    """
+
+    def __init__(self, group: str, breaker: 'CircuitBreaker') -> None:
+        """Initialize a closed circuit
+
+        :param group: endpoint group of the circuit
+        :type group: str
+        :param breaker: circuit breaker holding the thresholds
+        :type breaker: CircuitBreaker
+        """
+        self.group = group
+        self._breaker = breaker
+        self._state = CLOSED
+        self._outcomes = deque(maxlen=breaker.window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._phase = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        """Number of requests that failed fast while the circuit was open"""
+
+    @property
+    def state(self) -> str:
+        """Get the state of the circuit, an open circuit whose timeout elapsed is reported half open
+
+        :return: 'closed', 'open' or 'half_open'
+        :rtype: str
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._breaker.open_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def acquire(self) -> 'Permit':
+        """Take a permit to send a request
+
+        :raises CircuitOpenException: if the circuit is open, or half open with all probes in flight
+        :return: the permit, finish or cancel it once the request is done
+        :rtype: Permit
+        """
+        with self._lock:
+            changed = None
+            if self._state == OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self._breaker.open_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenException(self.group, self._breaker.open_timeout - elapsed)
+                changed = self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes >= self._breaker.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenException(self.group)
+                self._probes += 1
+            permit = Permit(self, self._phase if self._state == HALF_OPEN else None)
+        self._notify(changed)
+        return permit
+
+    def _record(self, permit: 'Permit', duration: float, failed: bool) -> None:
+        breaker = self._breaker
+        slow = duration >= breaker.slow_call_duration
+        with self._lock:
+            changed = None
+            if permit.phase is not None:
+                if permit.phase == self._phase:
+                    self._probes -= 1
+                    if failed or slow:
+                        changed = self._set_state(OPEN)
+                    else:
+                        self._probe_successes += 1
+                        if self._probe_successes >= breaker.half_open_calls:
+                            changed = self._set_state(CLOSED)
+            elif self._state == CLOSED:
+                self._outcomes.append((failed, slow))
+                if self._tripped():
+                    changed = self._set_state(OPEN)
+        self._notify(changed)
+
+    def _release(self, permit: 'Permit') -> None:
+        with self._lock:
+            if permit.phase == self._phase:
+                self._probes -= 1
+
+    def reset(self) -> None:
+        """Close the circuit and forget the recorded calls"""
+        with self._lock:
+            changed = self._set_state(CLOSED)
+        self._notify(changed)
+
+    def stats(self) -> dict:
+        """Get the state and the counters of the circuit
+
+        :return: state, failure and slow call rates of the window, calls in the window and rejected requests
+        :rtype: dict
+        """
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(failed for failed, _ in self._outcomes)
+            slow = sum(slow for _, slow in self._outcomes)
+            return {
+                'state': state,
+                'calls': calls,
+                'failure_rate': failures / calls if calls else 0.0,
+                'slow_call_rate': slow / calls if calls else 0.0,
+                'rejected': self.rejected,
+            }
+
+    def _tripped(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self._breaker.minimum_calls:
+            return False
+        failures = sum(failed for failed, _ in self._outcomes)
+        slow = sum(slow for _, slow in self._outcomes)
+        return failures >= self._breaker.failure_rate * calls or slow >= self._breaker.slow_call_rate * calls
+
+    def _set_state(self, state: str) -> tuple:
+        """Switch the state, the lock must be held
+
+        :return: the (group, old state, new state) to notify the listeners of
+        :rtype: tuple
+        """
+        previous = self._state
+        self._state = state
+        self._outcomes.clear()
+        self._probes = 0
+        self._probe_successes = 0
+        self._phase += 1
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        return (self.group, previous, state) if previous != state else None
+
+    def _notify(self, changed: tuple) -> None:
+        if changed is not None:
+            for listener in self._breaker._listeners:
+                listener(*changed)
+
+
+class Permit:
+    """Permission to send one request through a circuit"""
+
+    __slots__ = ('circuit', 'phase', 'started', 'done')
+
+    def __init__(self, circuit: Circuit, phase: int = None) -> None:
+        self.circuit = circuit
+        self.phase = phase
+        """The half open phase the permit probes, None for a permit taken while closed"""
+        self.started: float = None
+        self.done = False
+
+    def start(self) -> None:
+        """Mark the moment the request is sent, the call duration is measured from here"""
+        self.started = time.monotonic()
+
+    def finish(self, failed: bool) -> None:
+        """Record the outcome of the request, a request that was never started is cancelled instead
+
+        :param failed: True if the request raised or the API answered with a 5xx status
+        :type failed: bool
+        """
+        if self.started is None:
+            self.cancel()
+        elif not self.done:
+            self.done = True
+            self.circuit._record(self, time.monotonic() - self.started, failed)
+
+    def cancel(self) -> None:
+        """Give the permit back without an outcome, for a request that was not sent or was already finished"""
+        if not self.done:
+            self.done = True
+            self.circuit._release(self)
+
+
+class CircuitBreaker:
+    """A circuit breaker with a circuit per endpoint group.
+
+    The groups are the endpoint classes of the rate limiter: 'list' (GET
+    requests), 'action' (server actions) and 'order' (placing orders), so a
+    failing order endpoint does not block reading the server list. A request
+    fails when it raises, or when the API answers with a 5xx status; other
+    statuses count as successes. All services of a client share its breaker.
+    """
+
+    def __init__(self,
+                 failure_rate: float = 0.5,
+                 slow_call_rate: float = 1.0,
+                 slow_call_duration: float = 10.0,
+                 window: int = 20,
+                 minimum_calls: int = 10,
+                 open_timeout: float = 30.0,
+                 half_open_calls: int = 1) -> None:
+        """Initialize the circuit breaker
+
+        :param failure_rate: share of failed calls in the window that opens a circuit, defaults to 0.5
+        :type failure_rate: float, optional
+        :param slow_call_rate: share of slow calls in the window that opens a circuit, defaults to 1.0
+        :type slow_call_rate: float, optional
+        :param slow_call_duration: seconds after which a call counts as slow, defaults to 10
+        :type slow_call_duration: float, optional
+        :param window: number of recent calls the rates are computed over, defaults to 20
+        :type window: int, optional
+        :param minimum_calls: calls needed in the window before a circuit can open, defaults to 10
+        :type minimum_calls: int, optional
+        :param open_timeout: seconds an open circuit fails fast before it lets a probe through, defaults to 30
+        :type open_timeout: float, optional
+        :param half_open_calls: probe requests that must succeed to close a circuit, defaults to 1
+        :type half_open_calls: int, optional
+        """
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.window = max(1, window)
+        self.minimum_calls = max(1, min(minimum_calls, self.window))
+        self.open_timeout = open_timeout
+        self.half_open_calls = max(1, half_open_calls)
+        self._circuits: Dict[str, Circuit] = {}
+        self._listeners: List[Callable[[str, str, str], None]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, method: str, url: str) -> Permit:
+        """Take a permit to send a request
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :raises CircuitOpenException: if the circuit of the request's endpoint group is open
+        :return: the permit, finish or cancel it once the request is done
+        :rtype: Permit
+        """
+        return self.circuit(method, url).acquire()
+
+    def circuit(self, method: str, url: str) -> Circuit:
+        """Get the circuit of a request
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :return: the circuit of the request's endpoint group
+        :rtype: Circuit
+        """
+        return self.group(endpoint_class(method, url))
+
+    def group(self, name: str) -> Circuit:
+        """Get the circuit of an endpoint group
+
+        :param name: 'list', 'action' or 'order'
+        :type name: str
+        :return: the circuit of the group
+        :rtype: Circuit
+        """
+        circuit = self._circuits.get(name)
+        if circuit is None:
+            with self._lock:
+                circuit = self._circuits.setdefault(name, Circuit(name, self))
+        return circuit
+
+    def state(self, group: str) -> str:
+        """Get the state of an endpoint group's circuit
+
+        :param group: 'list', 'action' or 'order'
+        :type group: str
+        :return: 'closed', 'open' or 'half_open'
+        :rtype: str
+        """
+        return self.group(group).state
+
+    def allows(self, method: str, url: str) -> bool:
+        """Check if a request would be sent, without taking a permit
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :return: True unless the circuit of the request is open
+        :rtype: bool
+        """
+        return self.circuit(method, url).state != OPEN
+
+    def add_listener(self, listener: Callable[[str, str, str], None]) -> None:
+        """Register a function called with the group, the old and the new state when a circuit changes state
+
+        The listener runs on the thread whose request changed the state and
+        must not block.
+
+        :param listener: the listener
+        :type listener: Callable[[str, str, str], None]
+        """
+        self._listeners.append(listener)
+
+    def reset(self) -> None:
+        """Close all circuits"""
+        for circuit in list(self._circuits.values()):
+            circuit.reset()
+
+    def stats(self) -> Dict[str, dict]:
+        """Get the state and the counters of every circuit
+
+        :return: stats keyed by endpoint group
+        :rtype: Dict[str, dict]
+        """
+        return {name: circuit.stats() for name, circuit in list(self._circuits.items())}
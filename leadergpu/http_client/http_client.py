@@ -1,11 +1,27 @@
-import requests
+import threading
+import time
 import json
-
-from leadergpu.exceptions import APIException
+from typing import TYPE_CHECKING, Any, Hashable, Iterator
+
+from leadergpu.deadlines import Timeout, allows, expired, request_timeout
+from leadergpu.exceptions import APIException, DeadlineExceeded
+from leadergpu.http_client.cache import ResponseCache, ValidatorStore, invalidated_path
+from leadergpu.http_client.circuit_breaker import CircuitBreaker, Permit
+from leadergpu.http_client.instrumentation import Instrumentation, RequestRecord
+from leadergpu.http_client.json_codec import JSONArrayParser, JSONCodec
+from leadergpu.http_client.rate_limit import RateLimiter
+from leadergpu.http_client.retry import RetryAttempt, RetryPolicy
+from leadergpu.http_client.single_flight import SingleFlight
 from leadergpu.__version__ import VERSION
 
+if TYPE_CHECKING:  # requests is imported on the first request, keeping the package import fast
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    from leadergpu.authentication.authentication import AuthState
+
 
-def handle_error(response: requests.Response) -> None:
+def handle_error(response: 'requests.Response') -> None:
     """checks for the response status code and raises an exception if it's 400 or higher.
 
     :param response: the API call response
@@ -15,7 +31,24 @@ def handle_error(response: requests.Response) -> None:
         data = json.loads(response.text)
         code = data['code'] if 'code' in data else None
         message = data['message'] if 'message' in data else None
-        raise APIException(code, message)
+        raise APIException(code, message, response.status_code)
+
+
+def _connect_failed(error: Exception) -> bool:
+    """Check if a requests exception means the connection was never established
+
+    :param error: connection error or timeout raised by requests
+    :type error: Exception
+    :return: True if nothing was sent to the API
+    :rtype: bool
+    """
+    from requests.exceptions import ConnectTimeout
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+    if isinstance(error, ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (ConnectTimeoutError, NewConnectionError))
 
 
 class HTTPClient:
@@ -24,15 +57,95 @@ class HTTPClient:
     For each request, it adds the authentication header with an access token.
     If the access token is expired it refreshes it before calling the specified API endpoint.
     Also checks the response status code and raises an exception if needed.
+
+    All requests, including the sign in, go through a single connection pool, so
+    TCP and TLS connections to the API are reused between calls.
+
+    The client is safe to share between threads. Every thread gets its own
+    requests session, all sessions share the same connection pool. Each request
+    reads the authentication state once, and concurrent token refreshes are
+    collapsed into one sign in. Set pool_maxsize to the number of threads to
+    keep a connection per thread.
     """
 
-    def __init__(self, auth_service, base_url: str) -> None:
+    def __init__(self,
+                 auth_service,
+                 base_url: str,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 pool_block: bool = False,
+                 keep_alive: bool = True,
+                 idle_timeout: float = None,
+                 cache: ResponseCache = None,
+                 retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 json_codec: JSONCodec = None,
+                 instrumentation: Instrumentation = None,
+                 coalesce: bool = True,
+                 timeout: Timeout = None,
+                 circuit_breaker: CircuitBreaker = None) -> None:
+        """Initialize the http client
+
+        Nothing is sent until the first request, the client signs in lazily and
+        the connection pool is created on first use.
+
+        :param auth_service: authentication service
+        :type auth_service: AuthenticationService
+        :param base_url: base url for all the endpoints
+        :type base_url: str
+        :param pool_connections: number of per host connection pools to keep, defaults to 10
+        :type pool_connections: int, optional
+        :param pool_maxsize: maximum number of connections kept per host, defaults to 10
+        :type pool_maxsize: int, optional
+        :param pool_block: wait for a free connection instead of opening a throwaway one
+                           when the pool is exhausted, defaults to False
+        :type pool_block: bool, optional
+        :param keep_alive: keep connections open between requests, defaults to True
+        :type keep_alive: bool, optional
+        :param idle_timeout: close pooled connections that were idle for longer than this
+                             many seconds, defaults to None (never)
+        :type idle_timeout: float, optional
+        :param cache: cache for decoded GET responses, defaults to None (no caching)
+        :type cache: ResponseCache, optional
+        :param retry_policy: which failed requests are retried and how, defaults to RetryPolicy()
+        :type retry_policy: RetryPolicy, optional
+        :param rate_limiter: client side rate limiter shared by all services, defaults to None
+        :type rate_limiter: RateLimiter, optional
+        :param json_codec: codec for request and response bodies, defaults to JSONCodec() (standard library)
+        :type json_codec: JSONCodec, optional
+        :param instrumentation: records timing, size and retries of every request, defaults to None
+        :type instrumentation: Instrumentation, optional
+        :param coalesce: merge identical concurrent get_json calls into one request, defaults to True
+        :type coalesce: bool, optional
+        :param timeout: default timeout of every request, seconds or a (connect, read) tuple,
+                        a timeout passed to a call overrides it, defaults to None (no timeout)
+        :type timeout: Timeout, optional
+        :param circuit_breaker: fails requests fast while the API keeps failing, defaults to None
+        :type circuit_breaker: CircuitBreaker, optional
+        """
         self._version = VERSION
         self._base_url = base_url
         self._auth_service = auth_service
-        self._auth_service.authenticate()
-
-    def post(self, url: str, json: dict = None, params: dict = None, **kwargs) -> requests.Response:
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._idle_timeout = idle_timeout
+        self.cache = cache
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._json_codec = json_codec if json_codec is not None else JSONCodec()
+        self.instrumentation = instrumentation
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = SingleFlight() if coalesce else None
+        self._validators = ValidatorStore()
+        self._last_used = time.monotonic()
+        self._adapter = None
+        self._local = threading.local()
+        self._adapter_lock = threading.Lock()
+
+    def post(self, url: str, json: dict = None, params: dict = None, **kwargs) -> 'requests.Response':
         """Sends a POST request.
 
         A wrapper for the requests.post method.
@@ -52,49 +165,377 @@ class HTTPClient:
         :rtype: requests.Response
         """
 
-        url = self._add_base_url(url)
-        headers = self._generate_headers()
-
-        response = requests.post(url, json=json, headers=headers, params=params, **kwargs)
-        handle_error(response)
+        if json is not None:
+            kwargs['data'] = self._json_codec.dumps(json)
+        response = self._request('POST', url, params=params, **kwargs)
+        self._invalidate(url)
 
         return response
 
-    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+    def get(self, url: str, params: dict = None, **kwargs) -> 'requests.Response':
         """Sends a GET request.
 
         A wrapper for the requests.get method.
 
         Builds the url, uses custom headers, refresh tokens if needed.
+        Sends the stored ETag / Last-Modified validators of the url, if the API
+        answers with 304 Not Modified the stored response is returned.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+        :param kwargs: other arguments of requests.Session.request, like timeout
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: Response object
+        :rtype: requests.Response
+        """
+        response = self._request('GET', url, params=params, **kwargs)
+
+        return response
+
+    def get_json(self, url: str, params: dict = None, force_refresh: bool = False, **kwargs):
+        """Sends a GET request and returns the decoded body.
+
+        Served from the response cache if the endpoint is cached and the entry
+        did not expire. If the API answers with 304 Not Modified the previously
+        decoded body is returned as is, without decoding it again. Identical
+        calls made while one is in flight wait for it and share its decoded body.
+
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param params: Dictionary of querystring data to attach to the Request, defaults to None
+        :type params: dict, optional
+        :param force_refresh: bypass the cache and fetch a fresh response, defaults to False
+        :type force_refresh: bool, optional
+
+        :raises APIException: an api exception with message and error type code
+
+        :return: decoded response body
+        :rtype: Any
+        """
+        cacheable = self.cache is not None and self.cache.is_cacheable(url)
+        if cacheable and not force_refresh:
+            data = self.cache.get(url, params)
+            if data is not None:
+                return data
+
+        key = self._flight_key(url, params, kwargs)
+        if key is None:
+            data = self._fetch_json(url, params, **kwargs)
+        else:
+            data = self.single_flight.do(key, lambda: self._fetch_json(url, params, **kwargs))
+        if cacheable:
+            self.cache.set(url, params, data)
+        return data
+
+    def _fetch_json(self, url: str, params: dict = None, **kwargs) -> Any:
+        """Send a GET request and decode the body, reusing the stored decoded body on 304 Not Modified"""
+        response = self.get(url, params=params, **kwargs)
+        full_url = self._add_base_url(url)
+        data = self._validators.payload(full_url, params, response)
+        if data is None:
+            data = self._json_codec.loads(response.content)
+            self._validators.set_payload(full_url, params, response, data)
+        return data
+
+    def _flight_key(self, url: str, params: dict, kwargs: dict) -> Hashable:
+        """Get the identity of a get_json call, None if it is not coalesced"""
+        if self.single_flight is None:
+            return None
+        key = (self._auth_service.state.user_id, ResponseCache._key(url, params), tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def iter_json(self, url: str, params: dict = None, chunk_size: int = 65536, **kwargs) -> Iterator[Any]:
+        """Sends a GET request and yields the elements of the JSON array it returns.
+
+        The body is streamed and parsed incrementally, neither the full body nor
+        the full list of elements is held in memory.
 
         :param url: relative url of the API endpoint
         :type url: str
         :param params: Dictionary of querystring data to attach to the Request, defaults to None
         :type params: dict, optional
+        :param chunk_size: number of bytes read at once, defaults to 65536
+        :type chunk_size: int, optional
+        :param kwargs: other arguments of requests.Session.request, like timeout
 
         :raises APIException: an api exception with message and error type code
 
+        :return: iterator over the decoded array elements
+        :rtype: Iterator[Any]
+        """
+        response = self._request('GET', url, params=params, stream=True, **kwargs)
+        parser = JSONArrayParser()
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            response.close()
+
+    def close(self) -> None:
+        """Release all pooled connections, the client stays usable and reconnects on the next request"""
+        with self._adapter_lock:
+            if self._adapter is not None:
+                self._adapter.close()
+
+    def __enter__(self) -> 'HTTPClient':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _request(self, method: str, url: str, **kwargs) -> 'requests.Response':
+        """Send a request, signing in again and retrying once if the token was rejected
+
+        Failed attempts are retried as the retry policy allows.
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :raises APIException: an api exception with message and error type code
         :return: Response object
         :rtype: requests.Response
         """
-        headers = self._generate_headers()
-        url = self._add_base_url(url)
+        if self._auth_service.state.auth_token is None:
+            self._auth_service.ensure_authenticated(self._get_session())
+
+        record = self.instrumentation.start(method, url) if self.instrumentation is not None else None
+        try:
+            response = self._send_with_retries(method, url, record, **kwargs)
+
+            full_url = self._add_base_url(url)
+            conditional = method == 'GET' and not kwargs.get('stream')
+            if conditional and response.status_code == 304:
+                stored = self._validators.response(full_url, kwargs.get('params'))
+                if stored is not None:
+                    if record is not None:
+                        self.instrumentation.finish(record, response.status_code)
+                    return stored
+            handle_error(response)
+            if conditional:
+                self._validators.store(full_url, kwargs.get('params'), response)
+        except Exception as error:
+            if record is not None:
+                self.instrumentation.finish(record, error=error)
+            raise
+
+        if record is not None:
+            self.instrumentation.finish(record, response.status_code)
+        return response
 
-        response = requests.get(url, headers=headers)
-        handle_error(response)
+    def _send_with_retries(self, method: str, url: str, record: RequestRecord = None,
+                           **kwargs) -> 'requests.Response':
+        """Send a request until it succeeds, fails for good or runs out of attempts
 
+        No retry is made that the current deadline leaves no time for.
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request, defaults to None
+        :type record: RequestRecord, optional
+        :return: Response object of the last attempt
+        :rtype: requests.Response
+        """
+        from requests.exceptions import ConnectionError, Timeout
+
+        policy = self._retry_policy
+        attempt = 0
+        refreshed = False
+        while True:
+            attempt += 1
+            state = self._auth_service.state
+            try:
+                response = self._send(method, url, record, state, **kwargs)
+            except (ConnectionError, Timeout) as error:
+                if not policy.should_retry(method, url, attempt, connected=not _connect_failed(error)):
+                    policy.notify(RetryAttempt(method, url, attempt, error=error))
+                    if expired():
+                        raise DeadlineExceeded() from error
+                    raise
+                delay = policy.backoff(attempt)
+                if not allows(delay):
+                    policy.notify(RetryAttempt(method, url, attempt, error=error))
+                    raise DeadlineExceeded() from error
+                policy.notify(RetryAttempt(method, url, attempt, error=error, delay=delay))
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 401 and not refreshed:
+                # A rejected token does not count as an attempt, sign in and send it again.
+                refreshed = True
+                attempt -= 1
+                response.close()
+                self._auth_service.refresh(state.auth_token, self._get_session())
+                continue
+
+            if not response.ok and policy.should_retry(method, url, attempt, status=response.status_code):
+                delay = policy.backoff(attempt, response.headers.get('Retry-After'))
+                if allows(delay):
+                    policy.notify(RetryAttempt(method, url, attempt, status=response.status_code, delay=delay))
+                    response.close()
+                    time.sleep(delay)
+                    continue
+
+            policy.notify(RetryAttempt(method, url, attempt, status=response.status_code))
+            return response
+
+    def _send(self, method: str, url: str, record: RequestRecord = None, state: 'AuthState' = None,
+              **kwargs) -> 'requests.Response':
+        """Send a single request through the pooled session and the circuit breaker
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request, defaults to None
+        :type record: RequestRecord, optional
+        :param state: authentication state to send the request with, defaults to the current one
+        :type state: AuthState, optional
+        :raises CircuitOpenException: if the circuit of the endpoint group is open
+        :return: Response object
+        :rtype: requests.Response
+        """
+        if self.circuit_breaker is None:
+            return self._transmit(method, url, record, state, None, **kwargs)
+        permit = self.circuit_breaker.acquire(method, url)
+        try:
+            return self._transmit(method, url, record, state, permit, **kwargs)
+        finally:
+            permit.cancel()
+
+    def _transmit(self, method: str, url: str, record: RequestRecord, state: 'AuthState', permit: Permit,
+                  **kwargs) -> 'requests.Response':
+        """Send a single request, with its timeout shrunk to the current deadline
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param record: instrumentation record of the request
+        :type record: RequestRecord
+        :param state: authentication state to send the request with, None for the current one
+        :type state: AuthState
+        :param permit: circuit breaker permit the outcome is recorded on, None without a circuit breaker
+        :type permit: Permit
+        :return: Response object
+        :rtype: requests.Response
+        """
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(method, url)
+
+        kwargs['timeout'] = request_timeout(kwargs.get('timeout', self.timeout))
+        state = state if state is not None else self._auth_service.state
+        headers = self._generate_headers(state)
+        headers.update(kwargs.pop('headers', None) or {})
+        url = self._add_base_url(url, state)
+        if method == 'GET' and not kwargs.get('stream'):
+            headers.update(self._validators.headers(url, kwargs.get('params')))
+
+        if record is None and permit is None:
+            return self._get_session().request(method, url, headers=headers, **kwargs)
+
+        if record is not None:
+            record.attempts += 1
+            record.request_bytes = len(kwargs.get('data') or b'')
+        if permit is not None:
+            permit.start()
+        try:
+            response = self._get_session().request(method, url, headers=headers, **kwargs)
+        except Exception:
+            if permit is not None:
+                permit.finish(failed=True)
+            raise
+        if permit is not None:
+            permit.finish(failed=response.status_code >= 500)
+        if record is not None:
+            record.ttfb = response.elapsed.total_seconds()
+            if not kwargs.get('stream'):
+                record.response_bytes = len(response.content)
         return response
 
-    def _generate_headers(self) -> dict:
+    def _create_session(self) -> 'requests.Session':
+        """Create a session of the calling thread, mounted on the shared connection pool
+
+        :return: session with the shared connection pool
+        :rtype: requests.Session
+        """
+        import requests
+
+        session = requests.Session()
+        adapter = self._get_adapter()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self._keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def _get_adapter(self) -> 'HTTPAdapter':
+        """Get the connection pool shared by the sessions of all threads, created on first use
+
+        :return: the shared adapter
+        :rtype: HTTPAdapter
+        """
+        with self._adapter_lock:
+            if self._adapter is None:
+                from requests.adapters import HTTPAdapter
+
+                self._adapter = HTTPAdapter(pool_connections=self._pool_connections,
+                                            pool_maxsize=self._pool_maxsize,
+                                            pool_block=self._pool_block)
+            return self._adapter
+
+    def _get_session(self) -> 'requests.Session':
+        """Get the session of the calling thread, dropping connections that exceeded the idle timeout
+
+        :return: the pooled session
+        :rtype: requests.Session
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._create_session()
+        now = time.monotonic()
+        if self._idle_timeout is not None and now - self._last_used > self._idle_timeout:
+            # Closing the adapter only clears the pool, the sessions stay usable
+            # and open fresh connections on the next request.
+            self._adapter.close()
+        self._last_used = now
+        return session
+
+    def _invalidate(self, url: str) -> None:
+        """Drop cached responses a state changing request made stale
+
+        :param url: relative url of the state changing request
+        :type url: str
+        """
+        if self.cache is not None:
+            path = invalidated_path(url)
+            if path is not None:
+                self.cache.invalidate(path)
+
+    def _generate_headers(self, state: 'AuthState' = None) -> dict:
         """Generate the default headers for every request
 
+        :param state: authentication state to send, defaults to the current one
+        :type state: AuthState, optional
         :return: dict with request headers
         :rtype: dict
         """
+        state = state if state is not None else self._auth_service.state
         headers = {
             'User-Agent': self._generate_user_agent(),
             'Content-Type': 'application/json',
-            'X-Auth-Token': self._auth_service._auth_token
+            'X-Auth-Token': state.auth_token
         }
         return headers
 
@@ -108,12 +549,15 @@ class HTTPClient:
 
         return f'leadergpu-python-v{self._version}-{client_id_truncated}'
 
-    def _add_base_url(self, url: str) -> str:
+    def _add_base_url(self, url: str, state: 'AuthState' = None) -> str:
         """Adds the base url to the relative url
 
         :param url: a relative url path
         :type url: str
+        :param state: authentication state whose user id is used, defaults to the current one
+        :type state: AuthState, optional
         :return: the full url path
         :rtype: str
         """
-        return self._base_url + "/" + str(self._auth_service._user_id) + url
+        state = state if state is not None else self._auth_service.state
+        return self._base_url + "/" + str(state.user_id) + url
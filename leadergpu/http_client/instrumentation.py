@@ -0,0 +1,405 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+"""Quantiles reported by to_dict and to_prometheus"""
+
+
+@lru_cache(maxsize=256)
+def endpoint_template(url: str) -> str:
+    """Replace the ids in a relative url with a placeholder, e.g. '/servers/42/start' becomes '/servers/{id}/start'
+
+    :param url: relative url of the API endpoint
+    :type url: str
+    :return: endpoint template
+    :rtype: str
+    """
+    return _ID_SEGMENT.sub('/{id}', url.split('?', 1)[0])
+
+
+class RequestRecord:
+    """Timing and size of a single API request, including its retries.
+
+    The connection phases dns and connect are only measured by the async
+    client, the sync client leaves them None. The TLS handshake is not
+    reported on its own, it is part of connect.
+    """
+
+    __slots__ = ('method', 'endpoint', 'status', 'error', 'attempts', 'request_bytes', 'response_bytes',
+                 'dns', 'connect', 'ttfb', 'duration', 'start', '_started')
+
+    def __init__(self, method: str, endpoint: str) -> None:
+        """Initialize a record, the clock starts now
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint template
+        :type endpoint: str
+        """
+        self.method = method
+        self.endpoint = endpoint
+        self.status: int = None
+        self.error: Exception = None
+        self.attempts = 0
+        self.request_bytes = 0
+        self.response_bytes: int = None
+        self.dns: float = None
+        """Seconds spent resolving the host name, async client only, None if no new connection was opened"""
+        self.connect: float = None
+        """Seconds spent opening a new connection, including the DNS lookup and the TLS handshake,
+        async client only, None if no new connection was opened"""
+        self.ttfb: float = None
+        """Seconds until the response headers of the last attempt arrived"""
+        self.duration: float = None
+        """Total seconds, including retries, backoff and rate limiting"""
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    @property
+    def retries(self) -> int:
+        """Get the number of attempts after the first one
+
+        :return: number of retries
+        :rtype: int
+        """
+        return max(0, self.attempts - 1)
+
+    def __repr__(self) -> str:
+        return (f'RequestRecord({self.method} {self.endpoint}, status={self.status}, attempts={self.attempts}, '
+                f'duration={self.duration})')
+
+
+class LatencyHistogram:
+    """An HDR style latency histogram.
+
+    Values are counted in log-linear buckets with a fixed relative precision,
+    so the memory use does not grow with the number of values and quantiles
+    are exact up to the precision at every magnitude, from microseconds to minutes.
+    """
+
+    def __init__(self, significant_figures: int = 2) -> None:
+        """Initialize an empty histogram
+
+        :param significant_figures: decimal digits kept of every value, defaults to 2 (about 1% precision)
+        :type significant_figures: int, optional
+        """
+        self._sub_bucket_bits = (2 * 10 ** significant_figures - 1).bit_length()
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min: float = None
+        self.max: float = None
+
+    def record(self, seconds: float) -> None:
+        """Count a value
+
+        :param seconds: latency in seconds
+        :type seconds: float
+        """
+        value = int(seconds * 1e6)
+        shift = max(0, value.bit_length() - self._sub_bucket_bits)
+        bucket = (value >> shift) << shift
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Get the value below which a fraction q of the counted values lie
+
+        :param q: quantile between 0 and 1
+        :type q: float
+        :return: latency in seconds, None if the histogram is empty
+        :rtype: float
+        """
+        if not self.count:
+            return None
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                shift = max(0, bucket.bit_length() - self._sub_bucket_bits)
+                return min(self.max, (bucket + (1 << shift) - 1) / 1e6)
+        return self.max
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """Add the values counted by another histogram of the same precision
+
+        :param other: histogram to add
+        :type other: LatencyHistogram
+        """
+        for bucket, count in other._counts.items():
+            self._counts[bucket] = self._counts.get(bucket, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def to_dict(self) -> dict:
+        """Get the count, sum, extremes and quantiles in seconds
+
+        :return: histogram summary
+        :rtype: dict
+        """
+        summary = {'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max}
+        summary.update((f'p{q * 100:g}', self.quantile(q)) for q in QUANTILES)
+        return summary
+
+
+class _EndpointStats:
+    __slots__ = ('latency', 'statuses', 'errors', 'retries', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, significant_figures: int) -> None:
+        self.latency = LatencyHistogram(significant_figures)
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class Instrumentation:
+    """Request tracing and per endpoint latency histograms.
+
+    Pass an instance to the client to turn it on. Every request, including the
+    sign in, is timed and recorded under its method and endpoint template.
+    Hooks run before and after every request, with the RequestRecord.
+    Without an instance the clients skip all of it.
+    """
+
+    def __init__(self, significant_figures: int = 2) -> None:
+        """Initialize the instrumentation
+
+        :param significant_figures: precision of the latency histograms, defaults to 2 (about 1%)
+        :type significant_figures: int, optional
+        """
+        self._significant_figures = significant_figures
+        self._before: List[Callable[[RequestRecord], None]] = []
+        self._after: List[Callable[[RequestRecord], None]] = []
+        self._stats: Dict[Tuple[str, str], _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self,
+                 before: Callable[[RequestRecord], None] = None,
+                 after: Callable[[RequestRecord], None] = None) -> None:
+        """Add hooks called before a request is sent and after it finished
+
+        :param before: called with the new record before the first attempt, defaults to None
+        :type before: Callable[[RequestRecord], None], optional
+        :param after: called with the completed record, defaults to None
+        :type after: Callable[[RequestRecord], None], optional
+        """
+        if before is not None:
+            self._before.append(before)
+        if after is not None:
+            self._after.append(after)
+
+    def start(self, method: str, url: str) -> RequestRecord:
+        """Start recording a request
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :return: the record, filled in by the http client
+        :rtype: RequestRecord
+        """
+        record = RequestRecord(method, endpoint_template(url))
+        for hook in self._before:
+            hook(record)
+        return record
+
+    def finish(self, record: RequestRecord, status: int = None, error: Exception = None) -> None:
+        """Complete a record and add it to the statistics
+
+        :param record: the record returned by start
+        :type record: RequestRecord
+        :param status: HTTP status of the last attempt, defaults to None
+        :type status: int, optional
+        :param error: the exception the request raised, defaults to None
+        :type error: Exception, optional
+        """
+        record.duration = time.perf_counter() - record._started
+        record.status = status if status is not None else getattr(error, 'status', None)
+        record.error = error
+
+        key = (record.method, record.endpoint)
+        label = str(record.status) if record.status is not None else 'error'
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats(self._significant_figures)
+            stats.latency.record(record.duration)
+            stats.statuses[label] = stats.statuses.get(label, 0) + 1
+            stats.errors += error is not None
+            stats.retries += record.retries
+            stats.bytes_sent += record.request_bytes or 0
+            stats.bytes_received += record.response_bytes or 0
+
+        for hook in self._after:
+            hook(record)
+
+    def histogram(self, method: str, endpoint: str) -> LatencyHistogram:
+        """Get the latency histogram of an endpoint
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint template, e.g. '/servers/{id}/start'
+        :type endpoint: str
+        :return: the histogram, None if the endpoint was not called
+        :rtype: LatencyHistogram
+        """
+        stats = self._stats.get((method, endpoint))
+        return stats.latency if stats is not None else None
+
+    def reset(self) -> None:
+        """Drop all statistics, the hooks are kept"""
+        with self._lock:
+            self._stats = {}
+
+    def to_dict(self) -> Dict[str, dict]:
+        """Get the statistics of every endpoint
+
+        :return: statistics keyed by 'METHOD endpoint'
+        :rtype: Dict[str, dict]
+        """
+        with self._lock:
+            return {f'{method} {endpoint}': {
+                'requests': stats.latency.count,
+                'statuses': dict(stats.statuses),
+                'errors': stats.errors,
+                'retries': stats.retries,
+                'bytes_sent': stats.bytes_sent,
+                'bytes_received': stats.bytes_received,
+                'latency': stats.latency.to_dict(),
+            } for (method, endpoint), stats in sorted(self._stats.items())}
+
+    def to_prometheus(self, prefix: str = 'leadergpu') -> str:
+        """Get the statistics in the Prometheus text exposition format
+
+        :param prefix: metric name prefix, defaults to 'leadergpu'
+        :type prefix: str, optional
+        :return: metrics text
+        :rtype: str
+        """
+        requests, retries, sent, received, latency = [], [], [], [], []
+        with self._lock:
+            for (method, endpoint), stats in sorted(self._stats.items()):
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                for status, count in sorted(stats.statuses.items()):
+                    requests.append(f'{prefix}_requests_total{{{labels},status="{status}"}} {count}')
+                retries.append(f'{prefix}_request_retries_total{{{labels}}} {stats.retries}')
+                sent.append(f'{prefix}_request_bytes_total{{{labels}}} {stats.bytes_sent}')
+                received.append(f'{prefix}_response_bytes_total{{{labels}}} {stats.bytes_received}')
+                for q in QUANTILES:
+                    latency.append(f'{prefix}_request_duration_seconds{{{labels},quantile="{q}"}} '
+                                   f'{stats.latency.quantile(q)}')
+                latency.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {stats.latency.sum}')
+                latency.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {stats.latency.count}')
+
+        lines = []
+        for name, kind, help, samples in (
+                ('requests_total', 'counter', 'API requests by final status', requests),
+                ('request_retries_total', 'counter', 'Retried attempts of API requests', retries),
+                ('request_bytes_total', 'counter', 'Request body bytes sent', sent),
+                ('response_bytes_total', 'counter', 'Response body bytes received', received),
+                ('request_duration_seconds', 'summary', 'API request latency including retries', latency)):
+            lines.append(f'# HELP {prefix}_{name} {help}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryHook:
+    """An after hook exporting every request as an OpenTelemetry client span
+
+    Requires the opentelemetry-api package, e.g.
+    instrumentation.add_hook(after=OpenTelemetryHook())
+    """
+
+    def __init__(self, tracer=None) -> None:
+        """Initialize the hook
+
+        :param tracer: tracer to create the spans with, defaults to the tracer of the global provider
+        :type tracer: opentelemetry.trace.Tracer, optional
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetryHook requires opentelemetry-api, "
+                              "install it with 'pip install leadergpu-python[otel]'") from None
+        self._trace = trace
+        self._tracer = tracer if tracer is not None else trace.get_tracer('leadergpu')
+
+    def __call__(self, record: RequestRecord) -> None:
+        start = int(record.start * 1e9)
+        attributes = {
+            'http.request.method': record.method,
+            'url.template': record.endpoint,
+            'leadergpu.attempts': record.attempts,
+        }
+        if record.status is not None:
+            attributes['http.response.status_code'] = record.status
+        if record.response_bytes is not None:
+            attributes['http.response.body.size'] = record.response_bytes
+
+        span = self._tracer.start_span(f'{record.method} {record.endpoint}',
+                                       kind=self._trace.SpanKind.CLIENT,
+                                       attributes=attributes,
+                                       start_time=start)
+        if record.error is not None:
+            span.record_exception(record.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=start + int(record.duration * 1e9))
+
+
+def aiohttp_trace_config():
+    """Create an aiohttp trace config filling in the DNS, connect and time to first byte of RequestRecords
+
+    The record is passed to the request as trace_request_ctx.
+
+    :return: the trace config
+    :rtype: aiohttp.TraceConfig
+    """
+    import aiohttp
+
+    async def on_dns_start(session, context, params) -> None:
+        context.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, context, params) -> None:
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.dns = time.perf_counter() - context.dns_started
+
+    async def on_connect_start(session, context, params) -> None:
+        context.connect_started = time.perf_counter()
+
+    async def on_connect_end(session, context, params) -> None:
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect = time.perf_counter() - context.connect_started
+
+    async def on_request_start(session, context, params) -> None:
+        context.request_started = time.perf_counter()
+
+    async def on_request_end(session, context, params) -> None:
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.ttfb = time.perf_counter() - context.request_started
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
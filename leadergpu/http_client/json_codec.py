@@ -0,0 +1,148 @@
+import codecs
+import json
+from typing import Any, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class JSONCodec:
+    """Encodes and decodes JSON bodies with the standard library json module"""
+
+    name = 'json'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """Decode a JSON document
+
+        :param data: JSON document
+        :type data: Union[bytes, str]
+        :return: decoded object
+        :rtype: Any
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as a JSON document
+
+        :param obj: JSON serializable object
+        :type obj: Any
+        :return: UTF-8 encoded JSON document
+        :rtype: bytes
+        """
+        return json.dumps(obj).encode('utf-8')
+
+
+class OrjsonCodec(JSONCodec):
+    """Encodes and decodes JSON bodies with orjson, several times faster than the standard library"""
+
+    name = 'orjson'
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson, install it with 'pip install orjson'")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+
+def best_available_codec() -> JSONCodec:
+    """Get the fastest installed JSON codec
+
+    :return: OrjsonCodec if orjson is installed, otherwise JSONCodec
+    :rtype: JSONCodec
+    """
+    return OrjsonCodec() if orjson is not None else JSONCodec()
+
+
+class JSONArrayParser:
+    """Incrementally parses a JSON array fed in chunks.
+
+    Each completed element is returned as soon as its closing bracket arrives,
+    so only the current element and the unparsed rest of the chunk are held in
+    memory, never the full body.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Add a chunk of the body and parse the elements it completes
+
+        :param chunk: next chunk of the response body
+        :type chunk: bytes
+        :raises ValueError: if the body is not a JSON array
+        :return: elements completed by this chunk
+        :rtype: List[Any]
+        """
+        self._buffer = self._buffer[self._position:] + self._text.decode(chunk)
+        self._position = 0
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """Finish parsing after the last chunk
+
+        :raises ValueError: if the body is not a complete JSON array
+        :return: the remaining elements
+        :rtype: List[Any]
+        """
+        self._buffer = self._buffer[self._position:] + self._text.decode(b'', final=True)
+        self._position = 0
+        items = self._parse(final=True)
+        if not self._finished:
+            raise ValueError('Incomplete JSON array')
+        return items
+
+    def _parse(self, final: bool) -> List[Any]:
+        items = []
+        buffer = self._buffer
+        position = self._position
+        while not self._finished:
+            position = _skip_whitespace(buffer, position)
+            if position >= len(buffer):
+                break
+            if not self._started:
+                if buffer[position] != '[':
+                    raise ValueError('Expected a JSON array')
+                self._started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                self._finished = True
+                position += 1
+                break
+            if buffer[position] == ',':
+                position += 1
+                continue
+            try:
+                item, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # A number may continue in the next chunk, only accept an element followed by a delimiter.
+            if not final and (end >= len(buffer) or buffer[end] not in _DELIMITERS):
+                break
+            items.append(item)
+            position = end
+        self._position = position
+        return items
+
+
+_DELIMITERS = frozenset(' \t\n\r,]')
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    length = len(buffer)
+    while position < length and buffer[position] in ' \t\n\r':
+        position += 1
+    return position
@@ -0,0 +1,215 @@
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, Tuple
+
+from leadergpu.deadlines import time_left
+from leadergpu.exceptions import DeadlineExceeded
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+LIST = 'list'
+ACTION = 'action'
+ORDER = 'order'
+
+SERVER_ACTION_PATTERN = re.compile(r'^/servers/[^/]+/[^/]+$')
+
+_STATE = struct.Struct('dd')
+
+
+def endpoint_class(method: str, url: str) -> str:
+    """Get the endpoint class of a request
+
+    :param method: HTTP method
+    :type method: str
+    :param url: relative url of the API endpoint
+    :type url: str
+    :return: 'order' for placing orders, 'action' for server actions, 'list' for everything else
+    :rtype: str
+    """
+    if method.upper() == 'POST':
+        path = url.split('?')[0]
+        if path == '/servers/order':
+            return ORDER
+        if SERVER_ACTION_PATTERN.match(path):
+            return ACTION
+    return LIST
+
+
+class TokenBucket:
+    """An in-process, thread-safe token bucket.
+
+    Requests reserve a token and wait until it becomes available. Reservations
+    may take the bucket below zero, so concurrent callers are spread out evenly
+    at the configured rate instead of waking up all at once and polling.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initialize the token bucket
+
+        :param rate: tokens added per second
+        :type rate: float
+        :param burst: bucket capacity, number of requests that may be sent back to back, defaults to 1
+        :type burst: int, optional
+        """
+        self.rate = float(rate)
+        self.burst = float(max(1, burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_delay: float = None) -> float:
+        """Reserve a token
+
+        :param max_delay: take no token that is not available within this many seconds, defaults to None
+        :type max_delay: float, optional
+        :return: seconds the caller has to wait before sending the request, at least max_delay if no token was taken
+        :rtype: float
+        """
+        with self._lock:
+            self._tokens, self._updated, delay = _take(self._tokens, self._updated, time.monotonic(),
+                                                       self.rate, self.burst, max_delay)
+        return delay
+
+
+class FileTokenBucket:
+    """A token bucket whose state lives in a small file shared between processes.
+
+    Every reservation holds an exclusive lock on the file while it updates the
+    bucket, so all worker processes on one host share a single budget. Needs
+    POSIX file locking (fcntl), it is not available on Windows.
+    """
+
+    def __init__(self, path: str, rate: float, burst: int = 1) -> None:
+        """Initialize the token bucket
+
+        :param path: path of the state file, created if it does not exist
+        :type path: str
+        :param rate: tokens added per second
+        :type rate: float
+        :param burst: bucket capacity, number of requests that may be sent back to back, defaults to 1
+        :type burst: int, optional
+        :raises RuntimeError: if the platform has no POSIX file locking
+        """
+        if fcntl is None or not hasattr(os, 'pread'):
+            raise RuntimeError('FileTokenBucket needs POSIX file locking, use in-process buckets (path=None) here')
+        self.path = path
+        self.rate = float(rate)
+        self.burst = float(max(1, burst))
+        self._lock = threading.Lock()
+
+    def reserve(self, max_delay: float = None) -> float:
+        """Reserve a token
+
+        :param max_delay: take no token that is not available within this many seconds, defaults to None
+        :type max_delay: float, optional
+        :return: seconds the caller has to wait before sending the request, at least max_delay if no token was taken
+        :rtype: float
+        """
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # Wall clock time, monotonic clocks are not comparable between processes.
+                now = time.time()
+                data = os.pread(fd, _STATE.size, 0)
+                tokens, updated = _STATE.unpack(data) if len(data) == _STATE.size else (self.burst, now)
+                tokens, updated, delay = _take(tokens, updated, now, self.rate, self.burst, max_delay)
+                os.pwrite(fd, _STATE.pack(tokens, updated), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        return delay
+
+
+def _take(tokens: float, updated: float, now: float, rate: float, burst: float,
+          max_delay: float = None) -> Tuple[float, float, float]:
+    """Refill the bucket and take one token, unless it is not available within max_delay seconds
+
+    :return: new token count, refill time and seconds to wait for the token
+    :rtype: Tuple[float, float, float]
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    delay = (1 - tokens) / rate if tokens < 1 else 0.0
+    if max_delay is None or delay < max_delay:
+        tokens -= 1
+    return tokens, now, delay
+
+
+class RateLimiter:
+    """A client side rate limiter with a token bucket per endpoint class.
+
+    The endpoint classes are 'list' (GET requests), 'action' (server actions)
+    and 'order' (placing orders). All services of a client share its limiter.
+    With a path the buckets are stored in files, so several processes on one
+    POSIX host share the budget.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], path: str = None) -> None:
+        """Initialize the rate limiter
+
+        :param limits: rate (requests per second) and burst per endpoint class,
+                       e.g. {'list': (5, 10), 'action': (2, 4), 'order': (0.5, 1)},
+                       classes without a limit are not throttled
+        :type limits: Dict[str, Tuple[float, int]]
+        :param path: path prefix of the state files shared between processes, POSIX only,
+                     defaults to None (in-process buckets)
+        :type path: str, optional
+        :raises RuntimeError: if a path is given on a platform without POSIX file locking
+        """
+        self._buckets = {}
+        for name, (rate, burst) in limits.items():
+            if path is None:
+                self._buckets[name] = TokenBucket(rate, burst)
+            else:
+                self._buckets[name] = FileTokenBucket(f'{path}.{name}', rate, burst)
+
+    def reserve(self, method: str, url: str, max_delay: float = None) -> float:
+        """Reserve a token for a request
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param max_delay: take no token that is not available within this many seconds, defaults to None
+        :type max_delay: float, optional
+        :return: seconds the caller has to wait before sending the request, at least max_delay if no token was taken
+        :rtype: float
+        """
+        bucket = self._buckets.get(endpoint_class(method, url))
+        return bucket.reserve(max_delay) if bucket is not None else 0.0
+
+    def reserve_before_deadline(self, method: str, url: str) -> float:
+        """Reserve a token for a request that has to be sent before the current deadline
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :raises DeadlineExceeded: if the deadline passes before a token is available, no token is taken then
+        :return: seconds the caller has to wait before sending the request
+        :rtype: float
+        """
+        left = time_left()
+        delay = self.reserve(method, url, left)
+        if left is not None and delay >= left:
+            raise DeadlineExceeded()
+        return delay
+
+    def acquire(self, method: str, url: str) -> None:
+        """Block until a request may be sent
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :raises DeadlineExceeded: if the current deadline passes before a token is available
+        """
+        delay = self.reserve_before_deadline(method, url)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,170 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable
+
+
+class RetryAttempt:
+    """Describes a single attempt of a request, passed to the on_attempt hook"""
+
+    def __init__(self,
+                 method: str,
+                 url: str,
+                 attempt: int,
+                 status: int = None,
+                 error: Exception = None,
+                 delay: float = None) -> None:
+        """Initialize a retry attempt object
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param attempt: attempt number, starting at 1
+        :type attempt: int
+        :param status: response status code, None if the request failed without a response
+        :type status: int, optional
+        :param error: connection error raised by the attempt, defaults to None
+        :type error: Exception, optional
+        :param delay: seconds until the next attempt, None if the request is not retried
+        :type delay: float, optional
+        """
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.status = status
+        self.error = error
+        self.delay = delay
+
+    @property
+    def will_retry(self) -> bool:
+        """Check if the request is retried after this attempt
+
+        :return: True if another attempt follows
+        :rtype: bool
+        """
+        return self.delay is not None
+
+    def __repr__(self) -> str:
+        return (f'RetryAttempt(method={self.method!r}, url={self.url!r}, attempt={self.attempt}, '
+                f'status={self.status}, error={self.error!r}, delay={self.delay})')
+
+
+def parse_retry_after(value: str) -> float:
+    """Parse a Retry-After header, either delay seconds or an HTTP date
+
+    :param value: Retry-After header value
+    :type value: str
+    :return: seconds to wait, None if the header is missing or invalid
+    :rtype: float
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RetryPolicy:
+    """Decides which failed requests are retried and how long to wait in between.
+
+    Uses exponential backoff with full jitter and honors the Retry-After header.
+    Only idempotent methods are retried after the API may have processed the
+    request. Endpoints in never_retry (by default /servers/order) are only
+    retried when the request certainly had no effect: it was throttled with 429
+    or the connection could not be established.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_cap: float = 30.0,
+                 retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 idempotent_methods: Iterable[str] = ('GET',),
+                 never_retry: Iterable[str] = ('/servers/order',),
+                 respect_retry_after: bool = True,
+                 on_attempt: Callable[[RetryAttempt], None] = None) -> None:
+        """Initialize a retry policy
+
+        :param max_attempts: maximum number of attempts per request, 1 disables retries, defaults to 3
+        :type max_attempts: int, optional
+        :param backoff_base: backoff of the first retry in seconds, doubled on every retry, defaults to 0.5
+        :type backoff_base: float, optional
+        :param backoff_cap: maximum backoff in seconds, also caps Retry-After, defaults to 30
+        :type backoff_cap: float, optional
+        :param retry_statuses: response status codes that are retried, defaults to (429, 500, 502, 503, 504)
+        :type retry_statuses: Iterable[int], optional
+        :param idempotent_methods: HTTP methods that are safe to send again, defaults to ('GET',)
+        :type idempotent_methods: Iterable[str], optional
+        :param never_retry: relative urls that are never retried blindly, defaults to ('/servers/order',)
+        :type never_retry: Iterable[str], optional
+        :param respect_retry_after: wait as long as the Retry-After header asks, defaults to True
+        :type respect_retry_after: bool, optional
+        :param on_attempt: hook called after every attempt, e.g. for metrics, defaults to None
+        :type on_attempt: Callable[[RetryAttempt], None], optional
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(method.upper() for method in idempotent_methods)
+        self.never_retry = tuple(never_retry)
+        self.respect_retry_after = respect_retry_after
+        self.on_attempt = on_attempt
+
+    def should_retry(self, method: str, url: str, attempt: int, status: int = None, connected: bool = True) -> bool:
+        """Check if a failed attempt is retried
+
+        :param method: HTTP method
+        :type method: str
+        :param url: relative url of the API endpoint
+        :type url: str
+        :param attempt: number of the failed attempt, starting at 1
+        :type attempt: int
+        :param status: response status code, None if the request failed without a response
+        :type status: int, optional
+        :param connected: False if the connection could not be established, so nothing was sent
+        :type connected: bool, optional
+        :return: True if the request should be sent again
+        :rtype: bool
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if status is not None and status not in self.retry_statuses:
+            return False
+
+        # A throttled request or a failed connect was never processed by the API.
+        unprocessed = status == 429 or not connected
+        if url.split('?')[0] in self.never_retry:
+            return unprocessed
+        return unprocessed or method.upper() in self.idempotent_methods
+
+    def backoff(self, attempt: int, retry_after: str = None) -> float:
+        """Get the seconds to wait before the next attempt
+
+        :param attempt: number of the failed attempt, starting at 1
+        :type attempt: int
+        :param retry_after: Retry-After header of the failed response, defaults to None
+        :type retry_after: str, optional
+        :return: seconds to wait
+        :rtype: float
+        """
+        if self.respect_retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+    def notify(self, attempt: RetryAttempt) -> None:
+        """Report an attempt to the on_attempt hook
+
+        :param attempt: the finished attempt
+        :type attempt: RetryAttempt
+        """
+        if self.on_attempt is not None:
+            self.on_attempt(attempt)
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from leadergpu.deadlines import time_left
+from leadergpu.exceptions import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Merges identical concurrent calls into one.
+
+    The first caller of a key runs the function, callers arriving with the same
+    key while it runs wait for it and get the same result, or the same
+    exception. Nothing is cached, a call arriving after the first one finished
+    runs the function again.
+
+    A waiting caller only waits as long as its own deadline allows. If the
+    running call fails with DeadlineExceeded, the deadline was the first
+    caller's, so the waiting callers run the function again instead of sharing
+    that failure.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        """Number of times the function ran"""
+        self.deduplicated = 0
+        """Number of calls served by a call that was already running"""
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, unless a call with the same key is running, then wait for its result
+
+        :param key: identity of the call
+        :type key: Hashable
+        :param fn: function to run
+        :type fn: Callable[[], Any]
+        :raises DeadlineExceeded: if the current deadline passed while waiting for the running call
+        :return: the result of fn
+        :rtype: Any
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self.calls += 1
+                    break
+                self.deduplicated += 1
+
+            if not call.done.wait(time_left()):
+                raise DeadlineExceeded()
+            if isinstance(call.error, DeadlineExceeded):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        """Get the call counters
+
+        :return: number of calls that ran and of calls that were deduplicated
+        :rtype: dict
+        """
+        return {'calls': self.calls, 'deduplicated': self.deduplicated}
+
+
+class AsyncSingleFlight:
+    """Merges identical concurrent coroutine calls into one.
+
+    The coroutine of the first caller runs as a separate task, so cancelling one
+    waiter does not cancel the call the other waiters depend on. Deadlines are
+    handled as by SingleFlight.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        """Number of times the coroutine function ran"""
+        self.deduplicated = 0
+        """Number of calls served by a call that was already running"""
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn, unless a call with the same key is running, then wait for its result
+
+        :param key: identity of the call
+        :type key: Hashable
+        :param fn: coroutine function to run
+        :type fn: Callable[[], Awaitable[Any]]
+        :raises DeadlineExceeded: if the current deadline passed while waiting for the call
+        :return: the result of fn
+        :rtype: Any
+        """
+        while True:
+            task = self._calls.get(key)
+            leader = task is None
+            if leader:
+                # The task copies the current context, the deadline of the leader applies to it.
+                task = self._calls[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda done: self._finish(key, done))
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), time_left())
+            except DeadlineExceeded:
+                if leader:
+                    raise
+            except asyncio.TimeoutError as error:
+                if task.done() and not task.cancelled() and task.exception() is error:
+                    raise  # raised by fn, not by waiting
+                raise DeadlineExceeded() from None
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every waiter was cancelled
+
+    def stats(self) -> dict:
+        """Get the call counters
+
+        :return: number of calls that ran and of calls that were deduplicated
+        :rtype: dict
+        """
+        return {'calls': self.calls, 'deduplicated': self.deduplicated}
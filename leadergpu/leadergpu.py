@@ -1,30 +1,173 @@
+import threading
+from typing import TYPE_CHECKING, Dict
+
 from leadergpu.authentication.authentication import AuthenticationService
 from leadergpu.http_client.http_client import HTTPClient
-from leadergpu.products.products import ProductsService
-from leadergpu.servers.servers import ServersService
+from leadergpu.http_client.cache import ResponseCache
+from leadergpu.http_client.circuit_breaker import CircuitBreaker
+from leadergpu.http_client.instrumentation import Instrumentation
+from leadergpu.http_client.single_flight import SingleFlight
+from leadergpu.http_client.json_codec import JSONCodec
+from leadergpu.http_client.rate_limit import RateLimiter
+from leadergpu.http_client.retry import RetryPolicy
 from leadergpu.constants import Constants
 from leadergpu.__version__ import VERSION
 
+if TYPE_CHECKING:  # the services are imported on first access
+    from leadergpu.authentication.token_store import FileTokenStore
+    from leadergpu.products.products import ProductsService
+    from leadergpu.servers.servers import ServersService
+
 
 class LeaderGPUClient:
     """Client for interacting with LeaderGPU's public API"""
 
-    def __init__(self, client_id: str, client_secret: str, base_url: str = "https://api.leaderssl.com/api/v1/users") -> None:
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 base_url: str = "https://api.leaderssl.com/api/v1/users",
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 pool_block: bool = False,
+                 keep_alive: bool = True,
+                 idle_timeout: float = None,
+                 cache_ttl: Dict[str, float] = None,
+                 cache_maxsize: int = 128,
+                 token_store: 'FileTokenStore' = None,
+                 retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 json_codec: JSONCodec = None,
+                 instrumentation: Instrumentation = None,
+                 coalesce: bool = True,
+                 connect_timeout: float = 10.0,
+                 read_timeout: float = 60.0,
+                 circuit_breaker: CircuitBreaker = None) -> None:
         """The LeaderGPU client
 
+        Creating the client does not touch the network, it signs in on the first request.
+
         :param client_id: client id
         :type client_id: str
         :param client_secret: client secret
         :type client_secret: str
         :param base_url: base url for all the endpoints, optional, defaults to "https://api.leaderssl.com/api/v1/users"
         :type base_url: str, optional
+        :param pool_connections: number of per host connection pools to keep, defaults to 10
+        :type pool_connections: int, optional
+        :param pool_maxsize: maximum number of connections kept per host, defaults to 10
+        :type pool_maxsize: int, optional
+        :param pool_block: wait for a free connection when the pool is exhausted, defaults to False
+        :type pool_block: bool, optional
+        :param keep_alive: keep connections open between requests, defaults to True
+        :type keep_alive: bool, optional
+        :param idle_timeout: close connections idle for longer than this many seconds, defaults to None
+        :type idle_timeout: float, optional
+        :param cache_ttl: opt-in response cache, time to live in seconds per endpoint,
+                          e.g. {'/servers/products': 300, '/servers': 5}, defaults to None (no caching)
+        :type cache_ttl: Dict[str, float], optional
+        :param cache_maxsize: maximum number of cached responses, defaults to 128
+        :type cache_maxsize: int, optional
+        :param token_store: store to reuse tokens across processes instead of signing in, defaults to None
+        :type token_store: FileTokenStore, optional
+        :param retry_policy: retries with exponential backoff for failed requests, defaults to RetryPolicy(),
+                             pass RetryPolicy(max_attempts=1) to disable retries
+        :type retry_policy: RetryPolicy, optional
+        :param rate_limiter: client side token bucket rate limiter per endpoint class, defaults to None
+        :type rate_limiter: RateLimiter, optional
+        :param json_codec: codec for request and response bodies, defaults to the standard library json module,
+                           best_available_codec() picks orjson if it is installed
+        :type json_codec: JSONCodec, optional
+        :param instrumentation: request tracing and per endpoint latency histograms, defaults to None (off)
+        :type instrumentation: Instrumentation, optional
+        :param coalesce: share one request between identical concurrent GET calls, defaults to True
+        :type coalesce: bool, optional
+        :param connect_timeout: seconds to wait for a connection to the API, defaults to 10
+        :type connect_timeout: float, optional
+        :param read_timeout: seconds to wait for the API to answer, defaults to 60. A timeout
+                             passed to a call overrides both, and a deadline() block shrinks them
+        :type read_timeout: float, optional
+        :param circuit_breaker: fails requests fast per endpoint group while the API keeps failing,
+                                defaults to None (off)
+        :type circuit_breaker: CircuitBreaker, optional
         """
 
         self.constants: Constants = Constants(base_url, VERSION)
 
-        self._authentication: AuthenticationService = AuthenticationService(client_id, client_secret, self.constants.base_url)
+        self.cache: ResponseCache = ResponseCache(cache_ttl, cache_maxsize) if cache_ttl else None
+        """Response cache with hit and miss counters, None if caching is disabled"""
+
+        self.instrumentation: Instrumentation = instrumentation
+        """Request statistics, None if instrumentation is disabled"""
+
+        self.circuit_breaker: CircuitBreaker = circuit_breaker
+        """Circuit states per endpoint group, None if the circuit breaker is disabled"""
+
+        self._authentication: AuthenticationService = AuthenticationService(client_id,
+                                                                            client_secret,
+                                                                            self.constants.base_url,
+                                                                            token_store=token_store,
+                                                                            instrumentation=instrumentation,
+                                                                            timeout=(connect_timeout, read_timeout))
+
+        self._http_client: HTTPClient = HTTPClient(self._authentication,
+                                                   self.constants.base_url,
+                                                   pool_connections=pool_connections,
+                                                   pool_maxsize=pool_maxsize,
+                                                   pool_block=pool_block,
+                                                   keep_alive=keep_alive,
+                                                   idle_timeout=idle_timeout,
+                                                   cache=self.cache,
+                                                   retry_policy=retry_policy,
+                                                   rate_limiter=rate_limiter,
+                                                   json_codec=json_codec,
+                                                   instrumentation=instrumentation,
+                                                   coalesce=coalesce,
+                                                   timeout=(connect_timeout, read_timeout),
+                                                   circuit_breaker=circuit_breaker)
+
+        self.single_flight: SingleFlight = self._http_client.single_flight
+        """Counters of coalesced GET requests, None if coalescing is disabled"""
+
+        self._products = None
+        self._servers = None
+        self._services_lock = threading.Lock()
+
+    @property
+    def products(self) -> 'ProductsService':
+        """Get the products service
+
+        :return: products service
+        :rtype: ProductsService
+        """
+        if self._products is None:
+            from leadergpu.products.products import ProductsService
+
+            with self._services_lock:
+                if self._products is None:
+                    self._products = ProductsService(self._http_client)
+        return self._products
+
+    @property
+    def servers(self) -> 'ServersService':
+        """Get the servers service
+
+        :return: servers service
+        :rtype: ServersService
+        """
+        if self._servers is None:
+            from leadergpu.servers.servers import ServersService
+
+            with self._services_lock:
+                if self._servers is None:
+                    self._servers = ServersService(self._http_client)
+        return self._servers
+
+    def close(self) -> None:
+        """Close the client and release all pooled connections"""
+        self._http_client.close()
 
-        self._http_client: HTTPClient = HTTPClient(self._authentication, self.constants.base_url)
+    def __enter__(self) -> 'LeaderGPUClient':
+        return self
 
-        self.products: ProductsService = ProductsService(self._http_client)
-        self.servers: ServersService = ServersService(self._http_client)
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,87 @@
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Iterable, List, Union
+
+from leadergpu.concurrency import R, T, gather_concurrent
+from leadergpu.products.products import Products, ProductsService, decode_product
+
+if TYPE_CHECKING:
+    from leadergpu.products.catalog import ProductCatalog
+    from leadergpu.products.columnar import ProductsTable
+
+
+class AsyncProductsService(ProductsService):
+    """An asyncio service for interacting with the products endpoint"""
+
+    async def get(self, force_refresh: bool = False) -> List[Products]:
+        """Returns a list of available products
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: list of available products
+        :rtype: List[Products]
+        """
+        products = await self._http_client.get_json('/servers/products', force_refresh=force_refresh)
+        return self._build_products(products)
+
+    async def catalog(self, force_refresh: bool = False) -> 'ProductCatalog':
+        """Returns an indexed catalog of the available products
+
+        The catalog is kept by the service, later calls refresh only the products
+        that were added, removed or changed since the last call.
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: indexed product catalog
+        :rtype: ProductCatalog
+        """
+        from leadergpu.products.catalog import ProductCatalog
+
+        products = await self.get(force_refresh=force_refresh)
+        if self._catalog is None:
+            self._catalog = ProductCatalog(products)
+        else:
+            self._catalog.refresh(products)
+        return self._catalog
+
+    async def table(self, force_refresh: bool = False) -> 'ProductsTable':
+        """Returns the available products as a columnar table for vectorized analysis
+
+        Requires numpy.
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: columnar view of the available products
+        :rtype: ProductsTable
+        """
+        from leadergpu.products.columnar import ProductsTable
+
+        return ProductsTable(await self.get(force_refresh=force_refresh))
+
+    async def iter(self) -> AsyncIterator[Products]:
+        """Iterate over the available products while the response is still downloading
+
+        The response is parsed incrementally, neither the full body nor the full
+        list of products is held in memory.
+
+        :return: async iterator over available products
+        :rtype: AsyncIterator[Products]
+        """
+        async for product in self._http_client.iter_json('/servers/products'):
+            yield decode_product(product)
+
+    async def map_concurrent(self, fn: Callable[[T], Awaitable[R]], items: Iterable[T],
+                             max_concurrency: int = None) -> List[Union[R, Exception]]:
+        """Await fn for every item concurrently
+
+        A failing call does not abort the others, its exception takes the place of
+        the result.
+
+        :param fn: coroutine function called with every item
+        :type fn: Callable[[T], Awaitable[R]]
+        :param items: the items
+        :type items: Iterable[T]
+        :param max_concurrency: maximum number of calls in flight, defaults to None (only the client's limits apply)
+        :type max_concurrency: int, optional
+        :return: the result or the raised exception of every item, in the order of the items
+        :rtype: List[Union[R, Exception]]
+        """
+        return await gather_concurrent(fn, items, max_concurrency)
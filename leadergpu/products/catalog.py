@@ -0,0 +1,271 @@
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from leadergpu.products.products import Products
+
+
+class ProductCode(NamedTuple):
+    """The dimensions of a product code like 'GPU:Nvidia:GTX1080:4:Minute'"""
+
+    kind: Optional[str]
+    vendor: Optional[str]
+    model: Optional[str]
+    gpu_count: Optional[int]
+    period: Optional[str]
+
+
+def parse_product_code(code: str) -> ProductCode:
+    """Parse a product code into its dimensions
+
+    :param code: product code e.g. 'GPU:Nvidia:GTX1080:4:Minute'
+    :type code: str
+    :return: parsed code, parts that are missing or malformed are None
+    :rtype: ProductCode
+    """
+    parts = (code or '').split(':')
+    parts += [None] * (5 - len(parts))
+    kind, vendor, model, gpu_count, period = parts[:5]
+    try:
+        gpu_count = int(gpu_count)
+    except (TypeError, ValueError):
+        gpu_count = None
+    return ProductCode(kind or None, vendor or None, model or None, gpu_count, period or None)
+
+
+INDEXED_FIELDS = ('kind', 'vendor', 'model', 'gpu_count', 'period', 'currency', 'os', 'available')
+"""Fields with a hash index, string values are matched case-insensitively"""
+
+
+class ProductCatalog:
+    """An indexed product catalog for fast queries.
+
+    Product codes are parsed into vendor, model, GPU count and period. Every
+    indexed field has a hash index from value to product ids, and prices are
+    kept in a sorted index, so a query only looks at the products in the
+    smallest matching index bucket instead of scanning the whole catalog.
+    refresh() updates the indexes only for products that were added, removed
+    or changed.
+    """
+
+    def __init__(self, products: Iterable[Products] = ()) -> None:
+        """Initialize the catalog
+
+        :param products: products returned by ProductsService.get, defaults to ()
+        :type products: Iterable[Products], optional
+        """
+        self._products: Dict[str, Products] = {}
+        self._codes: Dict[str, ProductCode] = {}
+        self._keys: Dict[str, Tuple] = {}
+        self._index: Dict[str, Dict[object, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self._prices: List[Tuple[float, str]] = []
+        self._price_bounds: List[float] = []
+        self._lock = threading.RLock()
+        self.refresh(products)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._products
+
+    def get(self, id: str) -> Products:
+        """Get a product by id
+
+        :param id: product id
+        :type id: str
+        :return: product, None if it is not in the catalog
+        :rtype: Products
+        """
+        return self._products.get(id)
+
+    def code(self, id: str) -> ProductCode:
+        """Get the parsed code of a product
+
+        :param id: product id
+        :type id: str
+        :return: parsed product code, None if the product is not in the catalog
+        :rtype: ProductCode
+        """
+        return self._codes.get(id)
+
+    def refresh(self, products: Iterable[Products]) -> Dict[str, Set[str]]:
+        """Replace the catalog content, updating only the products that changed
+
+        :param products: the current products
+        :type products: Iterable[Products]
+        :return: ids of the 'added', 'removed' and 'changed' products
+        :rtype: Dict[str, Set[str]]
+        """
+        current = {product.id: product for product in products}
+        with self._lock:
+            removed = set(self._products) - set(current)
+            added, changed = set(), set()
+            for id, product in current.items():
+                key = _product_key(product)
+                if id not in self._products:
+                    added.add(id)
+                elif self._keys[id] != key:
+                    changed.add(id)
+                else:
+                    # Unchanged, keep the indexes but hand out the new object.
+                    self._products[id] = product
+                    continue
+                if id in self._products:
+                    self._unindex(id)
+                self._index_product(product, key)
+            for id in removed:
+                self._unindex(id)
+        return {'added': added, 'removed': removed, 'changed': changed}
+
+    def query(self,
+              kind: str = None,
+              vendor: str = None,
+              model: str = None,
+              gpu_count: int = None,
+              period: str = None,
+              currency: str = None,
+              os: str = None,
+              available: bool = None,
+              min_price: float = None,
+              max_price: float = None,
+              limit: int = None) -> List[Products]:
+        """Find products matching all given conditions, cheapest first
+
+        :param kind: product kind e.g. 'GPU', defaults to None
+        :type kind: str, optional
+        :param vendor: GPU vendor e.g. 'Nvidia', defaults to None
+        :type vendor: str, optional
+        :param model: GPU model e.g. 'A100', defaults to None
+        :type model: str, optional
+        :param gpu_count: number of GPUs, defaults to None
+        :type gpu_count: int, optional
+        :param period: billing period e.g. 'Hour', defaults to None
+        :type period: str, optional
+        :param currency: currency e.g. 'EUR', defaults to None
+        :type currency: str, optional
+        :param os: supported operating system e.g. 'ubuntu', defaults to None
+        :type os: str, optional
+        :param available: only products that are (or are not) available right now, defaults to None
+        :type available: bool, optional
+        :param min_price: minimum price, defaults to None
+        :type min_price: float, optional
+        :param max_price: maximum price, defaults to None
+        :type max_price: float, optional
+        :param limit: maximum number of products to return, defaults to None
+        :type limit: int, optional
+        :return: matching products sorted by price
+        :rtype: List[Products]
+        """
+        conditions = {'kind': kind, 'vendor': vendor, 'model': model, 'gpu_count': gpu_count, 'period': period,
+                      'currency': currency, 'os': os, 'available': available}
+        with self._lock:
+            # Bisect the prices alone, a bound never has to compare with an id.
+            low = bisect_left(self._price_bounds, min_price) if min_price is not None else 0
+            high = bisect_right(self._price_bounds, max_price) if max_price is not None else len(self._prices)
+
+            buckets = []
+            for field, value in conditions.items():
+                if value is not None:
+                    buckets.append(self._index[field].get(_normalize(value), _EMPTY))
+            if not buckets:
+                matches = [id for _, id in self._prices[low:high]]
+            else:
+                # Intersect starting with the smallest bucket, it bounds the work.
+                buckets.sort(key=len)
+                candidates = set(buckets[0])
+                for bucket in buckets[1:]:
+                    candidates &= bucket
+                    if not candidates:
+                        break
+                prices = [(_price_order(self._keys[id][0]), id) for id in candidates]
+                if min_price is not None or max_price is not None:
+                    lowest = min_price if min_price is not None else float('-inf')
+                    highest = max_price if max_price is not None else float('inf')
+                    prices = [entry for entry in prices if lowest <= entry[0] <= highest]
+                prices = heapq.nsmallest(limit, prices) if limit is not None else sorted(prices)
+                matches = [id for _, id in prices]
+            if limit is not None:
+                matches = matches[:limit]
+            return [self._products[id] for id in matches]
+
+    def cheapest(self, **conditions) -> Products:
+        """Get the cheapest product matching all conditions
+
+        :param conditions: conditions passed to query()
+        :return: cheapest matching product, None if no product matches
+        :rtype: Products
+        """
+        products = self.query(limit=1, **conditions)
+        return products[0] if products else None
+
+    def values(self, field: str) -> List[object]:
+        """Get the distinct values of an indexed field
+
+        :param field: one of INDEXED_FIELDS
+        :type field: str
+        :return: distinct normalized values
+        :rtype: List[object]
+        """
+        with self._lock:
+            return [value for value, ids in self._index[field].items() if ids]
+
+    def _index_product(self, product: Products, key: Tuple) -> None:
+        id = product.id
+        code = parse_product_code(product.code)
+        self._products[id] = product
+        self._codes[id] = code
+        self._keys[id] = key
+        for field, value in self._field_values(product, code):
+            self._index[field].setdefault(value, set()).add(id)
+        entry = (_price_order(key[0]), id)
+        position = bisect_right(self._prices, entry)
+        self._prices.insert(position, entry)
+        self._price_bounds.insert(position, entry[0])
+
+    def _unindex(self, id: str) -> None:
+        product = self._products.pop(id)
+        code = self._codes.pop(id)
+        key = self._keys.pop(id)
+        for field, value in self._field_values(product, code):
+            bucket = self._index[field].get(value)
+            if bucket is not None:
+                bucket.discard(id)
+                if not bucket:
+                    del self._index[field][value]
+        entry = (_price_order(key[0]), id)
+        position = bisect_left(self._prices, entry)
+        if position < len(self._prices) and self._prices[position] == entry:
+            del self._prices[position]
+            del self._price_bounds[position]
+
+    @staticmethod
+    def _field_values(product: Products, code: ProductCode):
+        for field in ('kind', 'vendor', 'model', 'gpu_count', 'period'):
+            value = getattr(code, field)
+            if value is not None:
+                yield field, _normalize(value)
+        if product.currency is not None:
+            yield 'currency', _normalize(product.currency)
+        for os in set(product.os or ()):
+            yield 'os', _normalize(os)
+        yield 'available', product.free_time is None
+
+
+_EMPTY = frozenset()
+
+
+def _price_order(price: float) -> float:
+    """Get the price to sort by, a product without a price sorts last"""
+    return float('inf') if price is None else price
+
+
+def _normalize(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _product_key(product: Products) -> Tuple:
+    """Get the fields that decide if a product changed, the price comes first for the price index"""
+    return (product.price, product.code, product.currency, tuple(product.os or ()), product.free_time,
+            product.period_type, product.period_count, product.name, product.weight, product.server_configuration_id)
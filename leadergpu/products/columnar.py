@@ -0,0 +1,234 @@
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from leadergpu.products.products import Products
+
+
+def _encode(values: Sequence[str]) -> Tuple['np.ndarray', Tuple[str, ...]]:
+    """Dictionary encode a column of strings
+
+    :return: integer code per value and the labels indexed by code
+    :rtype: Tuple[np.ndarray, Tuple[str, ...]]
+    """
+    labels = {}
+    codes = np.fromiter((labels.setdefault(value, len(labels)) for value in values), dtype=np.int32, count=len(values))
+    return codes, tuple(labels)
+
+
+class ProductsTable:
+    """A columnar view of the product catalog for vectorized filtering and sorting.
+
+    Numeric fields are stored as typed NumPy arrays, string fields are
+    dictionary encoded to integer codes and the supported operating systems of
+    a product are stored as a bit mask, so scans over the catalog run as array
+    operations instead of Python loops.
+    """
+
+    NUMERIC_COLUMNS = ('price', 'period_count', 'weight', 'server_configuration_id')
+    """Columns stored as typed arrays"""
+
+    ENCODED_COLUMNS = ('code', 'currency', 'period_type')
+    """Columns stored as integer codes, the labels are in <column>_labels"""
+
+    def __init__(self, products: List[Products]) -> None:
+        """Build the columns from a list of products
+
+        :param products: products returned by ProductsService.get
+        :type products: List[Products]
+        """
+        if np is None:
+            raise ImportError("ProductsTable requires numpy, install it with 'pip install numpy'")
+        count = len(products)
+        self._products = list(products)
+
+        self.price = np.fromiter((np.inf if product.price is None else product.price for product in products),
+                                 dtype=np.float64, count=count)
+        """Product prices, infinite if missing so they sort last"""
+        self.period_count = np.fromiter(
+            (-1 if product.period_count is None else product.period_count for product in products),
+            dtype=np.int64, count=count)
+        """Product period counts, -1 if missing"""
+        self.weight = np.fromiter((-1 if product.weight is None else product.weight for product in products),
+                                  dtype=np.int64, count=count)
+        """Product weights, -1 if missing"""
+        self.server_configuration_id = np.fromiter(
+            (-1 if product.server_configuration_id is None else product.server_configuration_id for product in products),
+            dtype=np.int64, count=count)
+        """Product server configuration ids, -1 if missing"""
+        self.available = np.fromiter((product.free_time is None for product in products), dtype=np.bool_, count=count)
+        """True for products without a free time, i.e. available right now"""
+
+        self.code, self.code_labels = _encode([product.code for product in products])
+        self.currency, self.currency_labels = _encode([product.currency for product in products])
+        self.period_type, self.period_type_labels = _encode([product.period_type for product in products])
+
+        os_bits = {}
+        for product in products:
+            for os in product.os or ():
+                os_bits.setdefault(os, len(os_bits))
+        if len(os_bits) > 64:
+            raise ValueError('ProductsTable supports at most 64 distinct operating systems')
+        self.os_labels: Tuple[str, ...] = tuple(os_bits)
+        """Operating systems, bit i of the os column is set if the product supports os_labels[i]"""
+        self.os = np.fromiter((sum(1 << os_bits[os] for os in set(product.os or ())) for product in products),
+                              dtype=np.uint64, count=count)
+        """Bit mask of the supported operating systems"""
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __getitem__(self, index: int) -> Products:
+        """Get the product of a row
+
+        :param index: row index
+        :type index: int
+        :return: product object
+        :rtype: Products
+        """
+        return self._products[index]
+
+    def mask(self,
+             code: str = None,
+             currency: str = None,
+             period_type: str = None,
+             os: str = None,
+             available: bool = None,
+             max_price: float = None,
+             min_period_count: int = None) -> 'np.ndarray':
+        """Build a boolean row mask, all given conditions have to match
+
+        :param code: product code e.g. 'GPU:Nvidia:GTX1080:4:Minute', defaults to None
+        :type code: str, optional
+        :param currency: currency e.g. 'EUR', defaults to None
+        :type currency: str, optional
+        :param period_type: period type e.g. 'Minute', defaults to None
+        :type period_type: str, optional
+        :param os: supported operating system e.g. 'ubuntu', defaults to None
+        :type os: str, optional
+        :param available: only products that are (or are not) available right now, defaults to None
+        :type available: bool, optional
+        :param max_price: maximum price, defaults to None
+        :type max_price: float, optional
+        :param min_period_count: minimum period count, defaults to None
+        :type min_period_count: int, optional
+        :return: boolean mask with one entry per row
+        :rtype: np.ndarray
+        """
+        mask = np.ones(len(self), dtype=np.bool_)
+        for column, value in (('code', code), ('currency', currency), ('period_type', period_type)):
+            if value is not None:
+                mask &= getattr(self, column) == self._label_code(column, value)
+        if os is not None:
+            bit = self.os_labels.index(os) if os in self.os_labels else None
+            if bit is None:
+                mask[:] = False
+            else:
+                mask &= (self.os & np.uint64(1 << bit)) != 0
+        if available is not None:
+            mask &= self.available if available else ~self.available
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if min_period_count is not None:
+            mask &= self.period_count >= min_period_count
+        return mask
+
+    def filter(self, mask: 'np.ndarray' = None, **conditions) -> 'ProductsTable':
+        """Get a table with the matching rows
+
+        :param mask: boolean row mask or row indices, defaults to None
+        :type mask: np.ndarray, optional
+        :param conditions: conditions passed to mask()
+        :return: table with the selected rows
+        :rtype: ProductsTable
+        """
+        if mask is None:
+            mask = self.mask(**conditions)
+        elif conditions:
+            mask = mask & self.mask(**conditions)
+        return self.take(np.flatnonzero(mask) if mask.dtype == np.bool_ else mask)
+
+    def sort(self, column: str = 'price', descending: bool = False) -> 'ProductsTable':
+        """Get a table sorted by a column
+
+        :param column: numeric or encoded column name, defaults to 'price'
+        :type column: str, optional
+        :param descending: sort in descending order, defaults to False
+        :type descending: bool, optional
+        :return: sorted table
+        :rtype: ProductsTable
+        """
+        order = np.argsort(self._sort_key(column), kind='stable')
+        return self.take(order[::-1] if descending else order)
+
+    def argmin(self, column: str = 'price', mask: 'np.ndarray' = None) -> int:
+        """Get the row with the smallest value of a column among the masked rows
+
+        :param column: numeric column name, defaults to 'price'
+        :type column: str, optional
+        :param mask: boolean row mask, defaults to None (all rows)
+        :type mask: np.ndarray, optional
+        :return: row index, -1 if no row matches
+        :rtype: int
+        """
+        values = getattr(self, column)
+        if mask is None:
+            return int(np.argmin(values)) if len(values) else -1
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return -1
+        return int(rows[np.argmin(values[rows])])
+
+    def cheapest(self, **conditions) -> Products:
+        """Get the cheapest product matching all conditions
+
+        :param conditions: conditions passed to mask()
+        :return: cheapest matching product, None if no product matches
+        :rtype: Products
+        """
+        index = self.argmin('price', self.mask(**conditions))
+        return self._products[index] if index >= 0 else None
+
+    def take(self, indices: 'np.ndarray') -> 'ProductsTable':
+        """Get a table with the rows at the given indices
+
+        :param indices: row indices
+        :type indices: np.ndarray
+        :return: table with the selected rows
+        :rtype: ProductsTable
+        """
+        table = ProductsTable.__new__(ProductsTable)
+        table._products = [self._products[index] for index in indices]
+        for column in self.NUMERIC_COLUMNS + self.ENCODED_COLUMNS + ('available', 'os'):
+            setattr(table, column, getattr(self, column)[indices])
+        for column in self.ENCODED_COLUMNS + ('os',):
+            setattr(table, column + '_labels', getattr(self, column + '_labels'))
+        return table
+
+    def to_dict(self) -> Dict[str, 'np.ndarray']:
+        """Get the columns, encoded columns are decoded to string arrays
+
+        :return: column name to array
+        :rtype: Dict[str, np.ndarray]
+        """
+        columns = {column: getattr(self, column) for column in self.NUMERIC_COLUMNS + ('available',)}
+        for column in self.ENCODED_COLUMNS:
+            labels = np.array(getattr(self, column + '_labels'), dtype=object)
+            columns[column] = labels[getattr(self, column)] if len(labels) else np.array([], dtype=object)
+        return columns
+
+    def _label_code(self, column: str, value: str) -> int:
+        labels = getattr(self, column + '_labels')
+        return labels.index(value) if value in labels else -1
+
+    def _sort_key(self, column: str) -> 'np.ndarray':
+        if column in self.ENCODED_COLUMNS:
+            # Sort encoded columns by label, not by the order the labels were first seen.
+            labels = getattr(self, column + '_labels')
+            rank = np.empty(len(labels), dtype=np.int32)
+            rank[np.argsort(np.array(labels, dtype=object))] = np.arange(len(labels), dtype=np.int32)
+            return rank[getattr(self, column)]
+        return getattr(self, column)
@@ -1,9 +1,20 @@
-from typing import List
+import threading
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Union
+
+from leadergpu.concurrency import R, T, map_concurrent
+
+if TYPE_CHECKING:
+    from leadergpu.products.catalog import ProductCatalog
+    from leadergpu.products.columnar import ProductsTable
 
 
 class Products:
     """A products class"""
 
+    __slots__ = ('_id', '_code', '_name', '_period_type', '_period_count', '_price', '_currency', '_free_time',
+                 '_server_configuration_id', '_os', '_weight')
+
     def __init__(self,
                  id: str,
                  code: str,
@@ -26,9 +37,9 @@ class Products:
         :type name: str
         :param period_type: product period type
         :type period_type: str
-        :param period_count: product period count
+        :param period_count: product period count, None if unknown
         :type period_count: int
-        :param price: product price
+        :param price: product price, None if unknown
         :type price: float
         :param currency: product currency
         :type currency: str
@@ -38,7 +49,7 @@ class Products:
         :type server_configuration_id: int
         :param os: product os
         :type os: List[str]
-        :param weight: product weight
+        :param weight: product weight, None if unknown
         :type weight: int
         """
         self._id = id
@@ -166,6 +177,60 @@ class Products:
                 )
 
 
+PRODUCT_FIELDS = ('id', 'code', 'name', 'period_type', 'period_count', 'price', 'currency', 'free_time',
+                  'server_configuration_id', 'os', 'weight')
+"""Keys of a /servers/products record, in the positional order of the Products constructor"""
+
+_get_product_fields = itemgetter(*PRODUCT_FIELDS)
+
+
+def _number(convert: Callable[[object], R], value: object) -> R:
+    return None if value is None else convert(value)
+
+
+def decode_product(record: dict) -> Products:
+    """Build a product object from a /servers/products record
+
+    The API sends period_count, price and weight as strings, they are converted
+    to int, float and int. A field the API sends as null stays None.
+
+    :param record: decoded product record
+    :type record: dict
+    :return: product object
+    :rtype: Products
+    """
+    (id, code, name, period_type, period_count, price, currency, free_time,
+     server_configuration_id, os, weight) = _get_product_fields(record)
+    return Products(id, code, name, period_type, _number(int, period_count), _number(float, price), currency,
+                    free_time, server_configuration_id, os, _number(int, weight))
+
+
+def decode_products(products: List[dict]) -> List[Products]:
+    """Decode a /servers/products response into product objects in a single pass
+
+    period_count, price and weight are converted to int, float and int, null values stay None.
+
+    :param products: decoded product list
+    :type products: List[dict]
+    :return: list of available products
+    :rtype: List[Products]
+    """
+    return list(map(decode_product, products))
+
+
+def iter_products(products: Iterable[dict]) -> Iterator[Products]:
+    """Decode /servers/products records one at a time
+
+    period_count, price and weight are converted to int, float and int, null values stay None.
+
+    :param products: decoded product records
+    :type products: Iterable[dict]
+    :return: iterator over available products
+    :rtype: Iterator[Products]
+    """
+    return map(decode_product, products)
+
+
 class ProductsService:
     """A service for interacting with the products endpoint"""
 
@@ -176,25 +241,100 @@ class ProductsService:
         :type http_client: HTTPClient
         """
         self._http_client = http_client
+        self._last_build = (None, [])
+        self._catalog = None
+        self._lock = threading.Lock()
 
-    def get(self) -> List[Products]:
+    def get(self, force_refresh: bool = False) -> List[Products]:
         """Returns a list of available products
 
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: list of available products
+        :rtype: List[Products]
+        """
+        products = self._http_client.get_json('/servers/products', force_refresh=force_refresh)
+        return self._build_products(products)
+
+    def catalog(self, force_refresh: bool = False) -> 'ProductCatalog':
+        """Returns an indexed catalog of the available products
+
+        The catalog is kept by the service, later calls refresh only the products
+        that were added, removed or changed since the last call.
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: indexed product catalog
+        :rtype: ProductCatalog
+        """
+        from leadergpu.products.catalog import ProductCatalog
+
+        products = self.get(force_refresh=force_refresh)
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = ProductCatalog(products)
+                return self._catalog
+        self._catalog.refresh(products)
+        return self._catalog
+
+    def table(self, force_refresh: bool = False) -> 'ProductsTable':
+        """Returns the available products as a columnar table for vectorized analysis
+
+        Requires numpy.
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :return: columnar view of the available products
+        :rtype: ProductsTable
+        """
+        from leadergpu.products.columnar import ProductsTable
+
+        return ProductsTable(self.get(force_refresh=force_refresh))
+
+    def iter(self) -> Iterator[Products]:
+        """Iterate over the available products while the response is still downloading
+
+        The response is parsed incrementally, neither the full body nor the full
+        list of products is held in memory.
+
+        :return: iterator over available products
+        :rtype: Iterator[Products]
+        """
+        return iter_products(self._http_client.iter_json('/servers/products'))
+
+    def map_concurrent(self, fn: Callable[[T], R], items: Iterable[T],
+                       max_workers: int = 8) -> List[Union[R, Exception]]:
+        """Call fn for every item concurrently, sharing this client between the threads
+
+        A failing call does not abort the others, its exception takes the place of
+        the result.
+
+        :param fn: function called with every item
+        :type fn: Callable[[T], R]
+        :param items: the items
+        :type items: Iterable[T]
+        :param max_workers: maximum number of concurrent calls, defaults to 8
+        :type max_workers: int, optional
+        :return: the result or the raised exception of every item, in the order of the items
+        :rtype: List[Union[R, Exception]]
+        """
+        return map_concurrent(fn, items, max_workers)
+
+    def _build_products(self, products: List[dict]) -> List[Products]:
+        """Build product objects from the decoded /servers/products response
+
+        If the http client returned the same decoded list as last time (cached or
+        not modified), the previously built objects are reused.
+
+        :param products: decoded product list
+        :type products: List[dict]
         :return: list of available products
         :rtype: List[Products]
         """
-        products = self._http_client.get('/servers/products').json()
-        product_objects = list(map(lambda product: Products(
-            id=product['id'],
-            code=product['code'],
-            name=product['name'],
-            period_type=product['period_type'],
-            period_count=int(product['period_count']),
-            price=float(product['price']),
-            currency=product['currency'],
-            free_time=product['free_time'],
-            server_configuration_id=product['server_configuration_id'],
-            os=product['os'],
-            weight=int(product['weight'])
-        ), products))
-        return product_objects
+        last_payload, last_products = self._last_build
+        if products is last_payload:
+            return list(last_products)
+
+        product_objects = decode_products(products)
+        self._last_build = (products, product_objects)
+        return list(product_objects)
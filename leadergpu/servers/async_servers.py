@@ -0,0 +1,381 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Union
+
+from leadergpu.concurrency import R, T, gather_concurrent
+from leadergpu.servers.orders import (IDEMPOTENCY_HEADER, OrderResult, OrderSpec, OrderTracker, is_ambiguous,
+                                      order_payload, prepare_specs)
+from leadergpu.servers.servers import (ACTIONS, Server, ServersService, _get_server_fields, filter_params,
+                                       server_matcher)
+
+if TYPE_CHECKING:
+    from leadergpu.servers.async_watcher import AsyncServerWatcher
+
+
+class AsyncServer(Server):
+    """A server instance class whose actions are awaitable"""
+
+    __slots__ = ()
+
+    async def resume(self) -> bool:
+        """Resume the server
+
+        :return: resume server success status
+        :rtype: bool
+        """
+        result = await (await self._http_client.post(f"/servers/{self._id}/resume")).json()
+        return result['success']
+
+    async def suspend(self) -> bool:
+        """Suspend the server
+
+        :return: suspend server success status
+        :rtype: bool
+        """
+        result = await (await self._http_client.post(f"/servers/{self._id}/suspend")).json()
+        return result['success']
+
+    async def stop(self) -> bool:
+        """Stops the server
+
+        :return: stop server success status
+        :rtype: bool
+        """
+        result = await (await self._http_client.post(f"/servers/{self._id}/stop")).json()
+        return result['success']
+
+    async def refresh(self, force_refresh: bool = False) -> 'AsyncServer':
+        """Get the current state of the server
+
+        The state is read from the service's id-indexed server snapshot, this
+        server is left unchanged, as for Server.refresh.
+
+        :param force_refresh: fetch a fresh snapshot even if the current one did not expire, defaults to False
+        :type force_refresh: bool, optional
+        :raises ServerNotFoundException: if the server no longer exists
+        :return: server details object with the current state
+        :rtype: AsyncServer
+        """
+        return await self._get_service().get_by_id(self._id, force_refresh=force_refresh)
+
+    def _get_service(self) -> 'AsyncServersService':
+        if self._service is None:
+            self._service = AsyncServersService(self._http_client)
+        return self._service
+
+    async def start(self) -> bool:
+        """Starts the server
+
+        :return: start server success status
+        :rtype: bool
+        """
+        result = await (await self._http_client.post(f"/servers/{self._id}/start")).json()
+        return result['success']
+
+
+class AsyncServersService(ServersService):
+    """An asyncio service for interacting with the servers endpoint"""
+
+    _server_class = AsyncServer
+
+    def __init__(self, http_client) -> None:
+        """Initialize the servers service object
+
+        :param http_client: async http client to interact with the HTTP API
+        :type http_client: AsyncHTTPClient
+        """
+        super().__init__(http_client)
+        self._async_index_lock = None
+
+    async def get(self, force_refresh: bool = False, status=None, id=None, name=None,
+                  timeout: float = None) -> List[AsyncServer]:
+        """Get all of the client's non-deleted servers, or servers with specific status, id or name
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :param status: a status or a collection of statuses, defaults to None
+        :type status: Union[str, Iterable[str]], optional
+        :param id: a server id or a collection of ids, defaults to None
+        :type id: Union[int, Iterable[int]], optional
+        :param name: server name, defaults to None
+        :type name: str, optional
+        :param timeout: seconds to wait for the API, or a (connect, read) tuple, defaults to None
+        :type timeout: float, optional
+        :return: list of server details objects
+        :rtype: List[AsyncServer]
+        """
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        servers_dict = await self._http_client.get_json("/servers", filter_params(status, id, name) or None,
+                                                        force_refresh=force_refresh, **kwargs)
+        servers = self._build_servers(servers_dict)
+        match = server_matcher(status, id, name)
+        return servers if match is None else list(filter(match, servers))
+
+    async def paginate(self, limit: int = 100, status=None, id=None, name=None, force_refresh: bool = False,
+                       timeout: float = None) -> AsyncIterator[AsyncServer]:
+        """Iterate over the client's servers, fetching limit servers per request
+
+        :param limit: servers per page, defaults to 100
+        :type limit: int, optional
+        :param status: a status or a collection of statuses, defaults to None
+        :type status: Union[str, Iterable[str]], optional
+        :param id: a server id or a collection of ids, defaults to None
+        :type id: Union[int, Iterable[int]], optional
+        :param name: server name, defaults to None
+        :type name: str, optional
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :param timeout: seconds to wait for the API per page, or a (connect, read) tuple, defaults to None
+        :type timeout: float, optional
+        :return: async iterator over server details objects
+        :rtype: AsyncIterator[AsyncServer]
+        """
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        params = filter_params(status, id, name)
+        match = server_matcher(status, id, name)
+        seen = set()
+        page = 1
+        while True:
+            params.update({self.page_param: page, self.limit_param: limit})
+            servers_dict = await self._http_client.get_json("/servers", dict(params), force_refresh=force_refresh,
+                                                            **kwargs)
+            servers = self._unseen(servers_dict, seen)
+            for server in servers:
+                if match is None or match(server):
+                    yield server
+            if len(servers_dict) != limit or not servers:
+                return
+            page += 1
+
+    async def iter(self) -> AsyncIterator[AsyncServer]:
+        """Iterate over the client's non-deleted servers while the response is still downloading
+
+        The response is parsed incrementally, neither the full body nor the full
+        list of servers is held in memory.
+
+        :return: async iterator over server details objects
+        :rtype: AsyncIterator[AsyncServer]
+        """
+        async for server in self._http_client.iter_json("/servers"):
+            yield self._server_class(*_get_server_fields(server), self._http_client, self)
+
+    async def changes(self, force_refresh: bool = True):
+        """Get the servers added, removed and changed since the previous call
+
+        The first call reports every server as added.
+
+        :param force_refresh: bypass the response cache, defaults to True
+        :type force_refresh: bool, optional
+        :return: added and removed servers, and the changed fields of the other servers
+        :rtype: ServersDiff
+        """
+        return self._get_snapshot().update(await self.get(force_refresh=force_refresh))
+
+    def watcher(self, **kwargs) -> 'AsyncServerWatcher':
+        """Get the shared server watcher
+
+        All callers share one watcher and therefore one poller task. The keyword
+        arguments configure the watcher when it is created by the first call.
+
+        :return: the server watcher of this service
+        :rtype: AsyncServerWatcher
+        """
+        with self._lock:
+            if self._watcher is None:
+                from leadergpu.servers.async_watcher import AsyncServerWatcher
+
+                self._watcher = AsyncServerWatcher(self, **kwargs)
+            return self._watcher
+
+    async def wait_until(self, id: int, status, timeout: float = None) -> AsyncServer:
+        """Wait until a server reaches a status, using the shared server watcher
+
+        :param id: server id
+        :type id: int
+        :param status: expected status, a collection of accepted statuses or a predicate
+        :type status: Union[str, Iterable[str], Callable[[AsyncServer], bool]]
+        :param timeout: maximum seconds to wait, defaults to None (wait forever)
+        :type timeout: float, optional
+        :raises asyncio.TimeoutError: if the server did not reach the status in time
+        :return: the server in the expected status
+        :rtype: AsyncServer
+        """
+        return await self.watcher().wait_until(id, status, timeout)
+
+    async def get_by_id(self, id: int, force_refresh: bool = False) -> AsyncServer:
+        """Get a server with specified id
+
+        The API has no single server endpoint, the server is looked up in an
+        id-indexed snapshot of the server list. The snapshot is reused for
+        lookup_ttl seconds, so many lookups in a short time cost one request.
+        Concurrent lookups wait for a single fetch.
+
+        :param id: server id
+        :type id: int
+        :param force_refresh: fetch a fresh snapshot even if the current one did not expire, defaults to False
+        :type force_refresh: bool, optional
+        :raises ServerNotFoundException: if there is no server with the id
+        :return: server details object
+        :rtype: AsyncServer
+        """
+        snapshot = self._index
+        if force_refresh or time.monotonic() >= snapshot[0]:
+            if self._async_index_lock is None:
+                self._async_index_lock = asyncio.Lock()
+            async with self._async_index_lock:
+                if force_refresh or self._index is snapshot:
+                    self._index = self._build_index(await self.get(force_refresh=True))
+                snapshot = self._index
+        return self._find(snapshot[1], id)
+
+    async def order(self, nomenclature_id: int, os: str, period_count: int, idempotency_key: str = None) -> dict:
+        """Creates a new server instance
+
+        :param nomenclature_id: product id returned in products list call
+        :type nomenclature_id: int
+        :param os: os type, can be one of the following: 'centos', 'windows', 'ubuntu'
+        :type os: str
+        :param period_count: order period
+        :type period_count: int
+        :param idempotency_key: client generated token sent in the Idempotency-Key header, defaults to None
+        :type idempotency_key: str, optional
+        """
+        payload = order_payload(OrderSpec(nomenclature_id, os, period_count))
+        headers = {IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None
+        return await (await self._http_client.post("/servers/order", json=payload, headers=headers)).json()
+
+    async def order_many(self,
+                         specs: Iterable[OrderSpec],
+                         max_concurrency: int = 4,
+                         retries: int = 1,
+                         wait: bool = False,
+                         timeout: float = 600,
+                         poll_interval: float = 5.0) -> List[OrderResult]:
+        """Places several orders concurrently
+
+        Every order carries its own idempotency key, which is sent again when the
+        order is retried. An order that failed without a definite answer from the
+        API (a timeout, a dropped connection or a 5xx status) is only retried if
+        the server list shows no new server for it, so an order that went through
+        is not placed twice.
+
+        :param specs: the orders to place, OrderSpec objects or tuples of their fields
+        :type specs: Iterable[OrderSpec]
+        :param max_concurrency: maximum number of concurrent orders, defaults to 4
+        :type max_concurrency: int, optional
+        :param retries: how many times an ambiguous failure is retried, defaults to 1
+        :type retries: int, optional
+        :param wait: wait until the new servers show up in the server list, defaults to False
+        :type wait: bool, optional
+        :param timeout: maximum seconds to wait for the new servers, defaults to 600
+        :type timeout: float, optional
+        :param poll_interval: seconds between server list polls while waiting, defaults to 5
+        :type poll_interval: float, optional
+        :return: a result per spec, in the order of the specs
+        :rtype: List[OrderResult]
+        """
+        results = prepare_specs(specs)
+        if not results:
+            return results
+
+        tracker = OrderTracker(await self.get(force_refresh=True))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def order_one(result: OrderResult) -> None:
+            async with semaphore:
+                await self._order_one(result, tracker, retries)
+
+        await asyncio.gather(*map(order_one, results))
+
+        if wait:
+            deadline = time.monotonic() + timeout
+            while not tracker.assign(results, await self.get(force_refresh=True)) and time.monotonic() < deadline:
+                await asyncio.sleep(min(poll_interval, max(0, deadline - time.monotonic())))
+
+        return results
+
+    async def _order_one(self, result: OrderResult, tracker: OrderTracker, retries: int) -> None:
+        """Places a single order of order_many, checking the server list before retrying
+
+        :param result: the pending order result, updated in place
+        :type result: OrderResult
+        :param tracker: matches new servers to the orders of the batch
+        :type tracker: OrderTracker
+        :param retries: how many times an ambiguous failure is retried
+        :type retries: int
+        """
+        spec = result.spec
+        for _ in range(retries + 1):
+            result.attempts += 1
+            try:
+                result.response = await self.order(spec.nomenclature_id, spec.os, spec.period_count,
+                                                   result.idempotency_key)
+            except Exception as e:
+                result.error = e
+                if not is_ambiguous(e):
+                    return
+                try:
+                    if tracker.recover(result, await self.get(force_refresh=True)):
+                        return
+                except Exception:
+                    return  # the outcome cannot be verified, retrying could order twice
+            else:
+                result.error = None
+                tracker.placed(spec)
+                return
+
+    async def action(self, id_list: Union[List[int], int], action: str) -> Dict[int, Union[bool, Exception]]:
+        """Performs an action on a list of servers / single server
+
+        The action endpoints only need the server id, so no server list is fetched.
+        The requests run concurrently, bounded by the http client's concurrency
+        limit, a failing server does not abort the rest of the batch.
+        Inside a deadline() block, the servers whose request did not start before
+        the deadline get DeadlineExceeded instead of a request.
+
+        :param id_list: list of server ids, or a server id
+        :type id_list: Union[List[int], int]
+        :param action: the action to perform
+        :type action: str
+        :raises ValueError: if the action is unknown
+        :return: action success status or the raised exception, keyed by server id
+        :rtype: Dict[int, Union[bool, Exception]]
+        """
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown server action: {action}')
+
+        if type(id_list) is int:
+            id_list = [id_list]
+
+        return dict(zip(id_list, await gather_concurrent(lambda id: self._action(id, action), id_list)))
+
+    async def map_concurrent(self, fn: Callable[[T], Awaitable[R]], items: Iterable[T],
+                             max_concurrency: int = None) -> List[Union[R, Exception]]:
+        """Await fn for every item concurrently
+
+        A failing call does not abort the others, its exception takes the place of
+        the result.
+
+        :param fn: coroutine function called with every item
+        :type fn: Callable[[T], Awaitable[R]]
+        :param items: the items
+        :type items: Iterable[T]
+        :param max_concurrency: maximum number of calls in flight, defaults to None (only the client's limits apply)
+        :type max_concurrency: int, optional
+        :return: the result or the raised exception of every item, in the order of the items
+        :rtype: List[Union[R, Exception]]
+        """
+        return await gather_concurrent(fn, items, max_concurrency)
+
+    async def _action(self, id: int, action: str) -> bool:
+        """Performs an action on a single server
+
+        :param id: server id
+        :type id: int
+        :param action: the action to perform
+        :type action: str
+        :return: action success status
+        :rtype: bool
+        """
+        result = await (await self._http_client.post(f"/servers/{id}/{action}")).json()
+        return result['success']
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Callable, Iterable, List, Union
+
+from leadergpu.servers.watcher import ServerEvent, ServerWatcher, _matcher, _notify
+
+
+class AsyncServerWatcher(ServerWatcher):
+    """Watches server state transitions with one shared asyncio poller.
+
+    A single task polls /servers and every waiter and subscriber is served from
+    the same snapshot, so adding waiters does not add API calls. The poll
+    interval adapts like the one of ServerWatcher. The poller task runs on the
+    event loop that started it, the watcher must be used from that loop only.
+    """
+
+    def __init__(self, servers_service, **kwargs) -> None:
+        """Initialize the watcher
+
+        :param servers_service: async servers service to poll
+        :type servers_service: AsyncServersService
+        :param kwargs: fast_interval, slow_interval, jitter and fields, as for ServerWatcher
+        """
+        super().__init__(servers_service, **kwargs)
+        self._task: asyncio.Future = None
+        self._changed: asyncio.Event = None
+        self._async_wakeup: asyncio.Event = None
+
+    @property
+    def running(self) -> bool:
+        """Check if the poller is running
+
+        :return: True if the poller task did not finish
+        :rtype: bool
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> 'AsyncServerWatcher':
+        """Start the poller task on the running event loop, if it is not running yet
+
+        :return: the watcher
+        :rtype: AsyncServerWatcher
+        """
+        if not self.running:
+            self._stopped.clear()
+            self._changed = asyncio.Event()
+            self._async_wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        """Cancel the poller task
+
+        :param timeout: unused, the task is cancelled right away, defaults to None
+        :type timeout: float, optional
+        """
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def __aenter__(self) -> 'AsyncServerWatcher':
+        return self.start()
+
+    async def __aexit__(self, *args) -> None:
+        self.stop()
+        task = self._task
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def subscribe(self, callback: Callable[[ServerEvent], None]) -> Callable[[], None]:
+        """Call callback for every change of a watched field, from the poller task
+
+        The callback runs on the event loop and must not block. Exceptions raised
+        by the callback are logged and do not affect other subscribers.
+
+        :param callback: function receiving a ServerEvent
+        :type callback: Callable[[ServerEvent], None]
+        :return: function that removes the subscription
+        :rtype: Callable[[], None]
+        """
+        return super().subscribe(callback)
+
+    async def wait_until(self,
+                         server_id: int,
+                         status: Union[str, Iterable[str], Callable[[object], bool]],
+                         timeout: float = None):
+        """Wait until a server reaches a status
+
+        :param server_id: server id
+        :type server_id: int
+        :param status: expected status, a collection of accepted statuses or a predicate
+                       that receives the server
+        :type status: Union[str, Iterable[str], Callable[[AsyncServer], bool]]
+        :param timeout: maximum seconds to wait, defaults to None (wait forever)
+        :type timeout: float, optional
+        :raises asyncio.TimeoutError: if the server did not reach the status in time
+        :return: the server in the expected status
+        :rtype: AsyncServer
+        """
+        matches = _matcher(status)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self.start()
+        self._waiters += 1
+        self._async_wakeup.set()
+        try:
+            while True:
+                server = self._snapshot.get(server_id)
+                if self._polled and server is not None and matches(server):
+                    return server
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError(f'Server {server_id} did not reach status {status!r} within {timeout}s')
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters -= 1
+
+    async def poll(self) -> List[ServerEvent]:
+        """Poll /servers once, update the snapshot and notify waiters and subscribers
+
+        :return: the observed changes
+        :rtype: List[ServerEvent]
+        """
+        events, subscribers = self._update(await self._servers_service.get(force_refresh=True))
+        if self._changed is not None:
+            # Waiters wait on the current event, the next poll gets a fresh one.
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+        _notify(events, subscribers)
+        return events
+
+    async def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._async_wakeup.clear()
+            polled_at = time.monotonic()
+            try:
+                await self.poll()
+                self.last_error = None
+                self._failures = 0
+            except Exception as error:
+                self.last_error = error
+                self._failures += 1
+            interval = self._next_interval()
+            # A new waiter only shortens the sleep to the fast interval since this poll.
+            while not self._stopped.is_set():
+                try:
+                    await asyncio.wait_for(self._async_wakeup.wait(), max(polled_at + interval - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    break
+                self._async_wakeup.clear()
+                interval = min(interval, self._next_interval())
@@ -0,0 +1,99 @@
+import threading
+from operator import attrgetter
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from leadergpu.servers.servers import SERVER_FIELDS, Server
+
+
+class FieldChange(NamedTuple):
+    """The values of a server field before and after a change"""
+
+    before: object
+    after: object
+
+
+class ServerChange(NamedTuple):
+    """The changed fields of a server that exists in both snapshots"""
+
+    id: int
+    server: Server
+    fields: Dict[str, FieldChange]
+
+
+class ServersDiff(NamedTuple):
+    """Servers added, removed and changed between two snapshots"""
+
+    added: List[Server]
+    removed: List[Server]
+    changed: List[ServerChange]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class ServerSnapshot:
+    """The last seen state of every server, keyed by server id.
+
+    Each server is stored with a tuple of its compared fields, so the servers
+    that did not change are skipped with one tuple comparison and only the
+    rest are compared field by field.
+    """
+
+    def __init__(self, fields: Iterable[str] = SERVER_FIELDS) -> None:
+        """Initialize an empty snapshot
+
+        :param fields: server fields to compare, defaults to all fields of the /servers response
+        :type fields: Iterable[str], optional
+        """
+        self.fields = tuple(field for field in fields if field != 'id')
+        self._get_values = attrgetter(*('_' + field for field in self.fields))
+        if len(self.fields) == 1:
+            get_value = self._get_values
+            self._get_values = lambda server: (get_value(server),)
+        self._servers: Dict[int, Tuple[tuple, Server]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def servers(self) -> List[Server]:
+        """Get the servers of the snapshot
+
+        :return: list of server details objects
+        :rtype: List[Server]
+        """
+        with self._lock:
+            return [server for _, server in self._servers.values()]
+
+    def update(self, servers: Iterable[Server]) -> ServersDiff:
+        """Replace the snapshot with the given servers and get what changed
+
+        :param servers: the current servers
+        :type servers: Iterable[Server]
+        :return: servers added, removed and changed since the last update
+        :rtype: ServersDiff
+        """
+        get_values = self._get_values
+        added, changed = [], []
+        current = {}
+        with self._lock:
+            previous = self._servers
+            for server in servers:
+                values = get_values(server)
+                current[server._id] = (values, server)
+                entry = previous.get(server._id)
+                if entry is None:
+                    added.append(server)
+                elif entry[0] != values:
+                    fields = {field: FieldChange(before, after)
+                              for field, before, after in zip(self.fields, entry[0], values)
+                              if before != after}
+                    changed.append(ServerChange(server._id, server, fields))
+            removed = [entry[1] for id, entry in previous.items() if id not in current]
+            self._servers = current
+        return ServersDiff(added, removed, changed)
+
+    def clear(self) -> None:
+        """Forget all servers, the next update reports every server as added"""
+        with self._lock:
+            self._servers = {}
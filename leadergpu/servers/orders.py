@@ -0,0 +1,169 @@
+import threading
+import uuid
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from leadergpu.exceptions import APIException, CircuitOpenException
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+"""Header carrying the client generated token of an order, the same token is sent again on a retry"""
+
+
+class OrderSpec(NamedTuple):
+    """The parameters of a single server order"""
+
+    nomenclature_id: int
+    os: str
+    period_count: int
+    idempotency_key: Optional[str] = None
+
+
+class OrderResult:
+    """The outcome of a single order placed by order_many"""
+
+    def __init__(self, spec: OrderSpec, idempotency_key: str) -> None:
+        """Initialize a pending order result
+
+        :param spec: the ordered spec
+        :type spec: OrderSpec
+        :param idempotency_key: token sent with every attempt of the order
+        :type idempotency_key: str
+        """
+        self.spec = spec
+        self.idempotency_key = idempotency_key
+        self.response: dict = None
+        """The decoded order response, None if the order failed or was recovered from the server list"""
+        self.error: Exception = None
+        """The exception of the last attempt, None if the order was placed"""
+        self.attempts = 0
+        """Number of POST requests sent for the order"""
+        self.recovered = False
+        """True if an attempt failed ambiguously but the server list showed the order went through"""
+        self.server = None
+        """The new server, set when order_many waited for the new servers to show up"""
+
+    @property
+    def success(self) -> bool:
+        """Check if the order was placed
+
+        :return: True if the order was placed
+        :rtype: bool
+        """
+        return self.error is None and (self.response is not None or self.recovered)
+
+    def __repr__(self) -> str:
+        return (f'OrderResult(spec={self.spec!r}, success={self.success}, attempts={self.attempts}, '
+                f'recovered={self.recovered}, error={self.error!r})')
+
+
+def is_ambiguous(error: Exception) -> bool:
+    """Check if a failed order may still have been placed
+
+    API errors with a 4xx status were rejected by the API, and an open circuit
+    never sent the request. Anything else (a 5xx status, a timeout or a dropped
+    connection) leaves the outcome unknown.
+
+    :param error: the exception raised by the order request
+    :type error: Exception
+    :return: True if the order may have been placed
+    :rtype: bool
+    """
+    if isinstance(error, CircuitOpenException):
+        return False
+    if isinstance(error, APIException):
+        return error.status is None or error.status >= 500
+    return True
+
+
+class OrderTracker:
+    """Matches new servers to the orders of one order_many call.
+
+    Servers are matched by nomenclature id. The servers seen before the batch
+    started are never matched, and each new server is matched at most once, so
+    an ambiguous order is only treated as placed if there are more new servers
+    of its product than confirmed orders of that product.
+    """
+
+    def __init__(self, baseline: Iterable) -> None:
+        """Initialize the tracker
+
+        :param baseline: the servers that existed before the batch
+        :type baseline: Iterable[Server]
+        """
+        self._baseline: Set[int] = {server.id for server in baseline}
+        self._claimed: Set[int] = set()
+        self._placed: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def placed(self, spec: OrderSpec) -> None:
+        """Record a confirmed order"""
+        with self._lock:
+            self._placed[spec.nomenclature_id] = self._placed.get(spec.nomenclature_id, 0) + 1
+
+    def recover(self, result: OrderResult, servers: Iterable) -> bool:
+        """Check the server list for an order whose outcome is unknown
+
+        :param result: the order result
+        :type result: OrderResult
+        :param servers: the current servers
+        :type servers: Iterable[Server]
+        :return: True if the server list shows the order was placed
+        :rtype: bool
+        """
+        nomenclature_id = result.spec.nomenclature_id
+        with self._lock:
+            new = [server for server in self._new(servers) if server._nomenclature_id == nomenclature_id]
+            if len(new) <= self._placed.get(nomenclature_id, 0):
+                return False
+            self._placed[nomenclature_id] = self._placed.get(nomenclature_id, 0) + 1
+            result.recovered = True
+            result.error = None
+            return True
+
+    def assign(self, results: List[OrderResult], servers: Iterable) -> bool:
+        """Attach the new servers to the placed orders of their product
+
+        :param results: the results of the batch
+        :type results: List[OrderResult]
+        :param servers: the current servers
+        :type servers: Iterable[Server]
+        :return: True if every placed order has a server
+        :rtype: bool
+        """
+        with self._lock:
+            new = self._new(servers)
+            for result in results:
+                if not result.success or result.server is not None:
+                    continue
+                for server in new:
+                    if server._nomenclature_id == result.spec.nomenclature_id and server.id not in self._claimed:
+                        self._claimed.add(server.id)
+                        result.server = server
+                        break
+            return all(result.server is not None for result in results if result.success)
+
+    def _new(self, servers: Iterable) -> list:
+        return sorted((server for server in servers if server.id not in self._baseline), key=lambda server: server.id)
+
+
+def order_payload(spec: OrderSpec) -> dict:
+    """Build the body of an order request"""
+    return {
+        "nomenclature_id": spec.nomenclature_id,
+        "os": spec.os,
+        "period_count": spec.period_count
+    }
+
+
+def prepare_specs(specs: Iterable) -> List[OrderResult]:
+    """Turn order specs, or tuples of their fields, into pending results with idempotency keys
+
+    :param specs: order specs
+    :type specs: Iterable[OrderSpec]
+    :return: a pending result per spec
+    :rtype: List[OrderResult]
+    """
+    results = []
+    for spec in specs:
+        spec = spec if isinstance(spec, OrderSpec) else OrderSpec(*spec)
+        results.append(OrderResult(spec, spec.idempotency_key or str(uuid.uuid4())))
+    return results
@@ -1,11 +1,29 @@
-from typing import List, Union
+import threading
+import time
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Union
 
 import leadergpu.constants as Constants
+from leadergpu.concurrency import R, T, map_concurrent
+from leadergpu.exceptions import ServerNotFoundException
+from leadergpu.servers.orders import (IDEMPOTENCY_HEADER, OrderResult, OrderSpec, OrderTracker, is_ambiguous,
+                                      order_payload, prepare_specs)
+
+if TYPE_CHECKING:
+    from leadergpu.servers.diff import ServersDiff, ServerSnapshot
+    from leadergpu.servers.watcher import ServerWatcher
+
+ACTIONS = (Constants.Actions.START, Constants.Actions.STOP, Constants.Actions.SUSPEND, Constants.Actions.RESUME)
 
 
 class Server:
     """A server instance class"""
 
+    __slots__ = ('_id', '_ip', '_name', '_config', '_start_at', '_end_at', '_valid_to', '_status', '_username', '_os_type',
+                 '_token', '_resume_available', '_suspend_available', '_uptime', '_remaining', '_progress', '_boot_status',
+                 '_code', '_os', '_server_alias', '_description', '_nomenclature_id', '_period_count', '_nomenclature_ids',
+                 '_free_time', '_http_client', '_service')
+
     def __init__(self,
                  id: int,
                  ip: str,
@@ -32,7 +50,8 @@ class Server:
                  period_count: int,
                  nomenclature_ids: List[int],
                  free_time: int,
-                 http_client: object
+                 http_client: object,
+                 service: 'ServersService' = None
                  ) -> None:
         """Initialize the instance object
 
@@ -93,6 +112,8 @@ class Server:
         :type free_time: int
         :param http_client: http client to interact with the HTTP API
         :type http_client: HTTPClient
+        :param service: servers service the server was fetched with, used by refresh, defaults to None
+        :type service: ServersService, optional
         """
         self._id = id
         self._ip = ip
@@ -120,6 +141,7 @@ class Server:
         self._nomenclature_ids = nomenclature_ids
         self._free_time = free_time
         self._http_client = http_client
+        self._service = service
 
     @property
     def id(self) -> str:
@@ -148,6 +170,54 @@ class Server:
         """
         return self._status
 
+    @property
+    def remaining(self) -> int:
+        """Get the remaining time of the instance
+
+        :return: remaining time in seconds
+        :rtype: int
+        """
+        return self._remaining
+
+    @property
+    def progress(self) -> int:
+        """Get the instance progress
+
+        :return: progress in percents
+        :rtype: int
+        """
+        return self._progress
+
+    @property
+    def boot_status(self) -> dict:
+        """Get the instance boot status
+
+        :return: boot status
+        :rtype: dict
+        """
+        return self._boot_status
+
+    def refresh(self, force_refresh: bool = False) -> 'Server':
+        """Get the current state of the server
+
+        The state is read from the service's id-indexed server snapshot, which is
+        shared by all lookups and fetched at most once per lookup_ttl seconds.
+        Server objects are shared between lookups and watchers, so this server
+        is left unchanged and the current state is returned as another object.
+
+        :param force_refresh: fetch a fresh snapshot even if the current one did not expire, defaults to False
+        :type force_refresh: bool, optional
+        :raises ServerNotFoundException: if the server no longer exists
+        :return: server details object with the current state
+        :rtype: Server
+        """
+        return self._get_service().get_by_id(self._id, force_refresh=force_refresh)
+
+    def _get_service(self) -> 'ServersService':
+        if self._service is None:
+            self._service = ServersService(self._http_client)
+        return self._service
+
     def resume(self) -> bool:
         """Resume the server
 
@@ -202,9 +272,83 @@ class Server:
                 )
 
 
+SERVER_FIELDS = ('id', 'ip', 'name', 'config', 'start_at', 'end_at', 'valid_to', 'status', 'username', 'os_type', 'token',
+                 'resume_available', 'suspend_available', 'uptime', 'remaining', 'progress', 'boot_status', 'code', 'os',
+                 'server_alias', 'description', 'nomenclature_id', 'period_count', 'nomenclature_ids', 'free_time')
+"""Keys of a /servers record, in the positional order of the Server constructor"""
+
+_get_server_fields = itemgetter(*SERVER_FIELDS)
+
+
+def decode_servers(servers_dict: List[dict], http_client, server_class: type = Server,
+                   service: 'ServersService' = None) -> List[Server]:
+    """Decode a /servers response into server objects in a single pass
+
+    :param servers_dict: decoded server list
+    :type servers_dict: List[dict]
+    :param http_client: http client the servers use for their actions
+    :type http_client: HTTPClient
+    :param server_class: class to build, defaults to Server
+    :type server_class: type, optional
+    :param service: servers service the servers refresh through, defaults to None
+    :type service: ServersService, optional
+    :return: list of server details objects
+    :rtype: List[Server]
+    """
+    return [server_class(*fields, http_client, service) for fields in map(_get_server_fields, servers_dict)]
+
+
+def filter_params(status=None, id=None, name=None) -> dict:
+    """Build the /servers query parameters of a server filter
+
+    Several statuses or ids are sent comma separated.
+
+    :param status: a status or a collection of statuses, defaults to None
+    :type status: Union[str, Iterable[str]], optional
+    :param id: a server id or a collection of ids, defaults to None
+    :type id: Union[int, Iterable[int]], optional
+    :param name: server name, defaults to None
+    :type name: str, optional
+    :return: query parameters
+    :rtype: dict
+    """
+    params = {}
+    for key, value in (('status', status), ('id', id), ('name', name)):
+        if value is not None:
+            params[key] = value if isinstance(value, (str, int)) else ','.join(map(str, value))
+    return params
+
+
+def server_matcher(status=None, id=None, name=None) -> Callable[[Server], bool]:
+    """Build a predicate matching the servers of a server filter
+
+    The filter is applied to the response as well, so the result is the same
+    whether or not the API honours the query parameters.
+
+    :return: the predicate, None if nothing is filtered
+    :rtype: Callable[[Server], bool]
+    """
+    checks = [(slot, frozenset((value,)) if isinstance(value, (str, int)) else frozenset(value))
+              for slot, value in (('_status', status), ('_id', id), ('_name', name)) if value is not None]
+    if not checks:
+        return None
+    return lambda server: all(getattr(server, slot) in values for slot, values in checks)
+
+
 class ServersService:
     """A service for interacting with the servers endpoint"""
 
+    _server_class = Server
+
+    lookup_ttl: float = 1.0
+    """Seconds the id-indexed server snapshot used by get_by_id and Server.refresh is reused"""
+
+    page_param: str = 'page'
+    """Query parameter carrying the page number, counted from 1"""
+
+    limit_param: str = 'limit'
+    """Query parameter carrying the page size"""
+
     def __init__(self, http_client) -> None:
         """Initialize the servers service object
 
@@ -212,55 +356,216 @@ class ServersService:
         :type http_client: HTTPClient
         """
         self._http_client = http_client
+        self._last_build = (None, [])
+        self._watcher = None
+        self._snapshot = None
+        self._index = (0.0, {})
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    def get(self, force_refresh: bool = False, status=None, id=None, name=None,
+            timeout: float = None) -> List[Server]:
+        """Get all of the client's non-deleted servers, or servers with specific status, id or name
+
+        The filters are sent as query parameters, so the API only returns the
+        matching servers.
+
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :param status: a status or a collection of statuses, defaults to None
+        :type status: Union[str, Iterable[str]], optional
+        :param id: a server id or a collection of ids, defaults to None
+        :type id: Union[int, Iterable[int]], optional
+        :param name: server name, defaults to None
+        :type name: str, optional
+        :param timeout: seconds to wait for the API, or a (connect, read) tuple, defaults to None
+        :type timeout: float, optional
+        :return: list of server details objects
+        :rtype: List[Server]
+        """
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        servers_dict = self._http_client.get_json("/servers", filter_params(status, id, name) or None,
+                                                  force_refresh=force_refresh, **kwargs)
+        servers = self._build_servers(servers_dict)
+        match = server_matcher(status, id, name)
+        return servers if match is None else list(filter(match, servers))
+
+    def paginate(self, limit: int = 100, status=None, id=None, name=None, force_refresh: bool = False,
+                 timeout: float = None) -> Iterator[Server]:
+        """Iterate over the client's servers, fetching limit servers per request
+
+        Pages are requested until one comes back short. An API that ignores the
+        page parameters returns every server on the first page, which ends the
+        iteration as well; a server is never yielded twice.
+
+        :param limit: servers per page, defaults to 100
+        :type limit: int, optional
+        :param status: a status or a collection of statuses, defaults to None
+        :type status: Union[str, Iterable[str]], optional
+        :param id: a server id or a collection of ids, defaults to None
+        :type id: Union[int, Iterable[int]], optional
+        :param name: server name, defaults to None
+        :type name: str, optional
+        :param force_refresh: bypass the response cache, defaults to False
+        :type force_refresh: bool, optional
+        :param timeout: seconds to wait for the API per page, or a (connect, read) tuple, defaults to None
+        :type timeout: float, optional
+        :return: iterator over server details objects
+        :rtype: Iterator[Server]
+        """
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+        params = filter_params(status, id, name)
+        match = server_matcher(status, id, name)
+        seen = set()
+        page = 1
+        while True:
+            params.update({self.page_param: page, self.limit_param: limit})
+            servers_dict = self._http_client.get_json("/servers", dict(params), force_refresh=force_refresh, **kwargs)
+            servers = self._unseen(servers_dict, seen)
+            yield from servers if match is None else filter(match, servers)
+            if len(servers_dict) != limit or not servers:
+                return
+            page += 1
+
+    def _unseen(self, servers_dict: List[dict], seen: set) -> List[Server]:
+        """Build the servers of a page that were not seen on an earlier page
+
+        :param servers_dict: decoded page
+        :type servers_dict: List[dict]
+        :param seen: ids of the servers seen so far, updated in place
+        :type seen: set
+        :return: the unseen servers
+        :rtype: List[Server]
+        """
+        servers = [server for server in decode_servers(servers_dict, self._http_client, self._server_class, self)
+                   if server._id not in seen]
+        seen.update(server._id for server in servers)
+        return servers
+
+    def iter(self) -> Iterator[Server]:
+        """Iterate over the client's non-deleted servers while the response is still downloading
 
-    def get(self) -> List[Server]:
-        """Get all of the client's non-deleted servers, or servers with specific status
+        The response is parsed incrementally, neither the full body nor the full
+        list of servers is held in memory.
 
+        :return: iterator over server details objects
+        :rtype: Iterator[Server]
+        """
+        for fields in map(_get_server_fields, self._http_client.iter_json("/servers")):
+            yield self._server_class(*fields, self._http_client, self)
+
+    def _build_servers(self, servers_dict: List[dict]) -> List[Server]:
+        """Build server objects from the decoded /servers response
+
+        If the http client returned the same decoded list as last time (cached or
+        not modified), the previously built objects are reused.
+
+        :param servers_dict: decoded server list
+        :type servers_dict: List[dict]
         :return: list of server details objects
         :rtype: List[Server]
         """
-        servers_dict = self._http_client.get("/servers").json()
-        servers = list(map(lambda servers_dict: Server(
-            id=servers_dict['id'],
-            ip=servers_dict['ip'],
-            name=servers_dict['name'],
-            config=servers_dict['config'],
-            start_at=servers_dict['start_at'],
-            end_at=servers_dict['end_at'],
-            valid_to=servers_dict['valid_to'],
-            status=servers_dict['status'],
-            username=servers_dict['username'],
-            os_type=servers_dict['os_type'],
-            token=servers_dict['token'],
-            resume_available=servers_dict['resume_available'],
-            suspend_available=servers_dict['suspend_available'],
-            uptime=servers_dict['uptime'],
-            remaining=servers_dict['remaining'],
-            progress=servers_dict['progress'],
-            boot_status=servers_dict['boot_status'],
-            code=servers_dict['code'],
-            os=servers_dict['os'],
-            server_alias=servers_dict['server_alias'],
-            description=servers_dict['description'],
-            nomenclature_id=servers_dict['nomenclature_id'],
-            period_count=servers_dict['period_count'],
-            nomenclature_ids=servers_dict['nomenclature_ids'],
-            free_time=servers_dict['free_time'],
-            http_client=self._http_client
-        ), servers_dict))
-        return servers
+        last_payload, last_servers = self._last_build
+        if servers_dict is last_payload:
+            return list(last_servers)
+
+        servers = decode_servers(servers_dict, self._http_client, self._server_class, self)
+        self._last_build = (servers_dict, servers)
+        return list(servers)
+
+    def changes(self, force_refresh: bool = True) -> 'ServersDiff':
+        """Get the servers added, removed and changed since the previous call
+
+        The first call reports every server as added.
+
+        :param force_refresh: bypass the response cache, defaults to True
+        :type force_refresh: bool, optional
+        :return: added and removed servers, and the changed fields of the other servers
+        :rtype: ServersDiff
+        """
+        return self._get_snapshot().update(self.get(force_refresh=force_refresh))
+
+    def _get_snapshot(self) -> 'ServerSnapshot':
+        with self._lock:
+            if self._snapshot is None:
+                from leadergpu.servers.diff import ServerSnapshot
+
+                self._snapshot = ServerSnapshot()
+            return self._snapshot
+
+    def watcher(self, **kwargs) -> 'ServerWatcher':
+        """Get the shared server watcher
 
-    def get_by_id(self, id: int) -> Server:
+        All callers share one watcher and therefore one poller. The keyword
+        arguments configure the watcher when it is created by the first call.
+
+        :return: the server watcher of this service
+        :rtype: ServerWatcher
+        """
+        with self._lock:
+            if self._watcher is None:
+                from leadergpu.servers.watcher import ServerWatcher
+
+                self._watcher = ServerWatcher(self, **kwargs)
+            return self._watcher
+
+    def wait_until(self, id: int, status, timeout: float = None) -> Server:
+        """Block until a server reaches a status, using the shared server watcher
+
+        :param id: server id
+        :type id: int
+        :param status: expected status, a collection of accepted statuses or a predicate
+        :type status: Union[str, Iterable[str], Callable[[Server], bool]]
+        :param timeout: maximum seconds to wait, defaults to None (wait forever)
+        :type timeout: float, optional
+        :raises TimeoutError: if the server did not reach the status in time
+        :return: the server in the expected status
+        :rtype: Server
+        """
+        return self.watcher().wait_until(id, status, timeout)
+
+    def get_by_id(self, id: int, force_refresh: bool = False) -> Server:
         """Get a server with specified id
 
+        The API has no single server endpoint, the server is looked up in an
+        id-indexed snapshot of the server list. The snapshot is reused for
+        lookup_ttl seconds, so many lookups in a short time cost one request.
+        Concurrent lookups wait for a single fetch.
+
         :param id: server id
         :type id: int
+        :param force_refresh: fetch a fresh snapshot even if the current one did not expire, defaults to False
+        :type force_refresh: bool, optional
+        :raises ServerNotFoundException: if there is no server with the id
         :return: server details object
         :rtype: Server
         """
-        return [server for server in self.get() if server.id == id][0]
+        snapshot = self._index
+        if force_refresh or time.monotonic() >= snapshot[0]:
+            with self._index_lock:
+                if force_refresh or self._index is snapshot:
+                    self._index = self._build_index(self.get(force_refresh=True))
+                snapshot = self._index
+        return self._find(snapshot[1], id)
+
+    def _build_index(self, servers: List[Server]) -> tuple:
+        """Build the id-indexed snapshot used by get_by_id
+
+        :param servers: the current servers
+        :type servers: List[Server]
+        :return: expiry time and the servers keyed by id
+        :rtype: tuple
+        """
+        return time.monotonic() + self.lookup_ttl, {server._id: server for server in servers}
 
-    def order(self, nomenclature_id: int, os: str, period_count: int) -> dict:
+    @staticmethod
+    def _find(index: Dict[int, Server], id: int) -> Server:
+        server = index.get(id)
+        if server is None:
+            raise ServerNotFoundException(id)
+        return server
+
+    def order(self, nomenclature_id: int, os: str, period_count: int, idempotency_key: str = None) -> dict:
         """Creates a new server instance
 
         :param nomenclature_id: product id returned in products list call
@@ -269,38 +574,140 @@ class ServersService:
         :type os: str
         :param period_count: order period
         :type period_count: int
+        :param idempotency_key: client generated token sent in the Idempotency-Key header, defaults to None
+        :type idempotency_key: str, optional
+        """
+        payload = order_payload(OrderSpec(nomenclature_id, os, period_count))
+        headers = {IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None
+        return self._http_client.post("/servers/order", json=payload, headers=headers).json()
+
+    def order_many(self,
+                   specs: Iterable[OrderSpec],
+                   max_workers: int = 4,
+                   retries: int = 1,
+                   wait: bool = False,
+                   timeout: float = 600,
+                   poll_interval: float = 5.0) -> List[OrderResult]:
+        """Places several orders concurrently
+
+        Every order carries its own idempotency key, which is sent again when the
+        order is retried. An order that failed without a definite answer from the
+        API (a timeout, a dropped connection or a 5xx status) is only retried if
+        the server list shows no new server for it, so an order that went through
+        is not placed twice.
+
+        :param specs: the orders to place, OrderSpec objects or tuples of their fields
+        :type specs: Iterable[OrderSpec]
+        :param max_workers: maximum number of concurrent orders, defaults to 4
+        :type max_workers: int, optional
+        :param retries: how many times an ambiguous failure is retried, defaults to 1
+        :type retries: int, optional
+        :param wait: wait until the new servers show up in the server list, defaults to False
+        :type wait: bool, optional
+        :param timeout: maximum seconds to wait for the new servers, defaults to 600
+        :type timeout: float, optional
+        :param poll_interval: seconds between server list polls while waiting, defaults to 5
+        :type poll_interval: float, optional
+        :return: a result per spec, in the order of the specs
+        :rtype: List[OrderResult]
+        """
+        results = prepare_specs(specs)
+        if not results:
+            return results
+
+        tracker = OrderTracker(self.get(force_refresh=True))
+        map_concurrent(lambda result: self._order_one(result, tracker, retries), results, max_workers)
+
+        if wait:
+            deadline = time.monotonic() + timeout
+            while not tracker.assign(results, self.get(force_refresh=True)) and time.monotonic() < deadline:
+                time.sleep(min(poll_interval, max(0, deadline - time.monotonic())))
+
+        return results
+
+    def _order_one(self, result: OrderResult, tracker: OrderTracker, retries: int) -> None:
+        """Places a single order of order_many, checking the server list before retrying
+
+        :param result: the pending order result, updated in place
+        :type result: OrderResult
+        :param tracker: matches new servers to the orders of the batch
+        :type tracker: OrderTracker
+        :param retries: how many times an ambiguous failure is retried
+        :type retries: int
         """
-        payload = {
-            "nomenclature_id": nomenclature_id,
-            "os": os,
-            "period_count": period_count
-        }
-        return self._http_client.post("/servers/order", json=payload).json()
-
-    def action(self, id_list: Union[List[int], int], action: str) -> List[bool]:
+        spec = result.spec
+        for _ in range(retries + 1):
+            result.attempts += 1
+            try:
+                result.response = self.order(spec.nomenclature_id, spec.os, spec.period_count, result.idempotency_key)
+            except Exception as e:
+                result.error = e
+                if not is_ambiguous(e):
+                    return
+                try:
+                    if tracker.recover(result, self.get(force_refresh=True)):
+                        return
+                except Exception:
+                    return  # the outcome cannot be verified, retrying could order twice
+            else:
+                result.error = None
+                tracker.placed(spec)
+                return
+
+    def action(self, id_list: Union[List[int], int], action: str, max_workers: int = 8) -> Dict[int, Union[bool, Exception]]:
         """Performs an action on a list of servers / single server
 
+        The action endpoints only need the server id, so no server list is fetched.
+        The requests run concurrently on a bounded worker pool, a failing server
+        does not abort the rest of the batch.
+        Inside a deadline() block, the servers whose request did not start before
+        the deadline get DeadlineExceeded instead of a request.
+
         :param id_list: list of server ids, or a server id
         :type id_list: Union[List[int], int]
         :param action: the action to perform
         :type action: str
-        :return: action success status
-        :rtype: List[bool]
+        :param max_workers: maximum number of concurrent requests, defaults to 8
+        :type max_workers: int, optional
+        :raises ValueError: if the action is unknown
+        :return: action success status or the raised exception, keyed by server id
+        :rtype: Dict[int, Union[bool, Exception]]
         """
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown server action: {action}')
+
         if type(id_list) is int:
             id_list = [id_list]
 
-        status = []
-        for id in id_list:
-            server = self.get_by_id(id)
+        return dict(zip(id_list, map_concurrent(lambda id: self._action(id, action), id_list, max_workers)))
+
+    def map_concurrent(self, fn: Callable[[T], R], items: Iterable[T],
+                       max_workers: int = 8) -> List[Union[R, Exception]]:
+        """Call fn for every item concurrently, sharing this client between the threads
 
-            if action == Constants.Actions.START:
-                status.append(server.start())
-            elif action == Constants.Actions.RESUME:
-                status.append(server.resume())
-            elif action == Constants.Actions.SUSPEND:
-                status.append(server.suspend())
-            elif action == Constants.Actions.STOP:
-                status.append(server.stop())
+        A failing call does not abort the others, its exception takes the place of
+        the result.
 
-        return status
+        :param fn: function called with every item
+        :type fn: Callable[[T], R]
+        :param items: the items
+        :type items: Iterable[T]
+        :param max_workers: maximum number of concurrent calls, defaults to 8
+        :type max_workers: int, optional
+        :return: the result or the raised exception of every item, in the order of the items
+        :rtype: List[Union[R, Exception]]
+        """
+        return map_concurrent(fn, items, max_workers)
+
+    def _action(self, id: int, action: str) -> bool:
+        """Performs an action on a single server
+
+        :param id: server id
+        :type id: int
+        :param action: the action to perform
+        :type action: str
+        :return: action success status
+        :rtype: bool
+        """
+        result = self._http_client.post(f"/servers/{id}/{action}").json()
+        return result['success']
@@ -0,0 +1,291 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+TRANSITIONAL_STATUSES = frozenset(('booting', 'queued'))
+"""Statuses a server is expected to leave soon, the watcher polls fast while a server is in one"""
+
+
+class ServerEvent:
+    """A change of a watched server field observed by the watcher"""
+
+    def __init__(self, server_id: int, field: str, before: object, after: object, server=None) -> None:
+        """Initialize a server event
+
+        :param server_id: server id
+        :type server_id: int
+        :param field: changed field, 'status' or one of the other watched fields
+        :type field: str
+        :param before: previous value, None if the server just appeared
+        :type before: object
+        :param after: new value, None if the server disappeared
+        :type after: object
+        :param server: the server after the change, None if it disappeared
+        :type server: Server, optional
+        """
+        self.server_id = server_id
+        self.field = field
+        self.before = before
+        self.after = after
+        self.server = server
+
+    def __repr__(self) -> str:
+        return f'ServerEvent(server_id={self.server_id}, field={self.field!r}, before={self.before!r}, after={self.after!r})'
+
+
+class ServerWatcher:
+    """Watches server state transitions with one shared poller.
+
+    A single background thread polls /servers and every waiter and subscriber
+    is served from the same snapshot, so adding waiters does not add API calls.
+    The poll interval adapts: fast while a server is booting or queued, or
+    while someone waits for a change; slow otherwise.
+    Failed polls back off towards the slow interval. Intervals are jittered so
+    several processes do not poll in lockstep.
+    """
+
+    def __init__(self,
+                 servers_service,
+                 fast_interval: float = 2.0,
+                 slow_interval: float = 30.0,
+                 jitter: float = 0.1,
+                 fields: Iterable[str] = ('status',)) -> None:
+        """Initialize the watcher
+
+        :param servers_service: servers service to poll
+        :type servers_service: ServersService
+        :param fast_interval: seconds between polls while a transition is expected, defaults to 2
+        :type fast_interval: float, optional
+        :param slow_interval: seconds between polls while all servers are idle, defaults to 30
+        :type slow_interval: float, optional
+        :param jitter: relative random deviation of each interval, defaults to 0.1
+        :type jitter: float, optional
+        :param fields: server fields whose changes are reported as events, defaults to ('status',)
+        :type fields: Iterable[str], optional
+        """
+        self._servers_service = servers_service
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.jitter = jitter
+        self._fields = tuple(fields)
+        self._snapshot: Dict[int, object] = {}
+        self._polled = False
+        self._condition = threading.Condition()
+        self._waiters = 0
+        self._subscribers: List[Callable[[ServerEvent], None]] = []
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.polls = 0
+        """Number of /servers polls made"""
+        self.last_error: Exception = None
+        """The exception raised by the last failed poll, None after a successful one"""
+        self._failures = 0
+
+    @property
+    def running(self) -> bool:
+        """Check if the poller is running
+
+        :return: True if the poller thread is alive
+        :rtype: bool
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'ServerWatcher':
+        """Start the poller thread, if it is not running yet
+
+        :return: the watcher
+        :rtype: ServerWatcher
+        """
+        with self._condition:
+            if not self.running:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='leadergpu-server-watcher', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        """Stop the poller thread
+
+        :param timeout: seconds to wait for the thread to finish, defaults to None (wait until it finished)
+        :type timeout: float, optional
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def __enter__(self) -> 'ServerWatcher':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def snapshot(self) -> Dict[int, object]:
+        """Get the servers seen by the last poll
+
+        :return: servers keyed by id
+        :rtype: Dict[int, Server]
+        """
+        with self._condition:
+            return dict(self._snapshot)
+
+    def subscribe(self, callback: Callable[[ServerEvent], None]) -> Callable[[], None]:
+        """Call callback for every change of a watched field, from the poller thread
+
+        Exceptions raised by the callback are logged and do not affect other subscribers.
+
+        :param callback: function receiving a ServerEvent
+        :type callback: Callable[[ServerEvent], None]
+        :return: function that removes the subscription
+        :rtype: Callable[[], None]
+        """
+        with self._condition:
+            self._subscribers.append(callback)
+        self.start()
+
+        def unsubscribe() -> None:
+            with self._condition:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def wait_until(self,
+                   server_id: int,
+                   status: Union[str, Iterable[str], Callable[[object], bool]],
+                   timeout: float = None):
+        """Block until a server reaches a status
+
+        :param server_id: server id
+        :type server_id: int
+        :param status: expected status, a collection of accepted statuses or a predicate
+                       that receives the server
+        :type status: Union[str, Iterable[str], Callable[[Server], bool]]
+        :param timeout: maximum seconds to wait, defaults to None (wait forever)
+        :type timeout: float, optional
+        :raises TimeoutError: if the server did not reach the status in time
+        :return: the server in the expected status
+        :rtype: Server
+        """
+        matches = _matcher(status)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self.start()
+        with self._condition:
+            self._waiters += 1
+            self._wakeup.set()
+            try:
+                while True:
+                    server = self._snapshot.get(server_id)
+                    if self._polled and server is not None and matches(server):
+                        return server
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f'Server {server_id} did not reach status {status!r} within {timeout}s')
+                    self._condition.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def poll(self) -> List[ServerEvent]:
+        """Poll /servers once, update the snapshot and notify waiters and subscribers
+
+        :return: the observed changes
+        :rtype: List[ServerEvent]
+        """
+        events, subscribers = self._update(self._servers_service.get(force_refresh=True))
+        _notify(events, subscribers)
+        return events
+
+    def _update(self, server_list: Iterable[object]) -> Tuple[List[ServerEvent], List[Callable]]:
+        """Replace the snapshot with a polled server list and wake the waiters
+
+        :param server_list: the polled servers
+        :type server_list: Iterable[Server]
+        :return: the observed changes and the subscribers to notify of them
+        :rtype: Tuple[List[ServerEvent], List[Callable]]
+        """
+        servers = {server.id: server for server in server_list}
+        events = []
+        with self._condition:
+            previous = self._snapshot
+            for id, server in servers.items():
+                before = previous.get(id)
+                for field in self._fields:
+                    old = _field(before, field) if before is not None else None
+                    new = _field(server, field)
+                    if before is None or old != new:
+                        events.append(ServerEvent(id, field, old, new, server))
+            for id in previous.keys() - servers.keys():
+                for field in self._fields:
+                    events.append(ServerEvent(id, field, _field(previous[id], field), None))
+            self._snapshot = servers
+            self._polled = True
+            self.polls += 1
+            subscribers = list(self._subscribers)
+            self._condition.notify_all()
+        return events, subscribers
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            polled_at = time.monotonic()
+            try:
+                self.poll()
+                self.last_error = None
+                self._failures = 0
+            except Exception as error:
+                self.last_error = error
+                self._failures += 1
+            interval = self._next_interval()
+            # A new waiter only shortens the sleep to the fast interval since this
+            # poll, so staggered waiters do not trigger one poll each.
+            while not self._stopped.is_set() and self._wakeup.wait(polled_at + interval - time.monotonic()):
+                self._wakeup.clear()
+                interval = min(interval, self._next_interval())
+
+    def _next_interval(self) -> float:
+        """Get the seconds until the next poll
+
+        Fast while a transition is expected, slow otherwise. After failed polls
+        the interval doubles per failure, up to the slow interval.
+        """
+        with self._condition:
+            busy = self._waiters > 0 or any(_transitional(server) for server in self._snapshot.values())
+        interval = self.fast_interval if busy else self.slow_interval
+        if self._failures:
+            interval = max(interval, min(self.slow_interval, self.fast_interval * 2 ** min(self._failures, 16)))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def _notify(events: List[ServerEvent], subscribers: List[Callable[[ServerEvent], None]]) -> None:
+    # A failing subscriber must not keep the others from seeing the event or stop the poller.
+    for event in events:
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception('Server watcher subscriber %r failed on %r', callback, event)
+
+
+def _field(server, field: str) -> object:
+    return getattr(server, '_' + field, None)
+
+
+def _transitional(server) -> bool:
+    # Progress below 100 only means provisioning while booting or queued, idle
+    # servers may report any progress.
+    return _field(server, 'status') in TRANSITIONAL_STATUSES
+
+
+def _matcher(status) -> Callable[[object], bool]:
+    if callable(status):
+        return status
+    if isinstance(status, str):
+        return lambda server: server.status == status
+    statuses = frozenset(status)
+    return lambda server: server.status in statuses
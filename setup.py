@@ -16,10 +16,13 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://www.leadergpu.com/",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
     install_requires=['requests>=2.25.1,<3'],
     extras_require={
         'dev': [''],
+        'async': ['aiohttp>=3.7,<4'],
+        'numpy': ['numpy>=1.19'],
+        'otel': ['opentelemetry-api>=1.0'],
         'test': ['pytest>=6.2.1,<7',
                  'pytest-cov>=2.10.1,<3',
                  'pytest-responses>=0.4.0,<1',
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.mock_server import MockLeaderGPUAPI
+
+
+@pytest.fixture
+def mock_api():
+    """Start local API stubs, the keyword arguments are passed to MockLeaderGPUAPI"""
+    started = []
+
+    def start(**kwargs) -> MockLeaderGPUAPI:
+        api = MockLeaderGPUAPI(**kwargs).start()
+        started.append(api)
+        return api
+
+    yield start
+    for api in started:
+        api.stop()
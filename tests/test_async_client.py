@@ -0,0 +1,15 @@
+import asyncio
+
+from leadergpu import AsyncLeaderGPUClient
+
+
+def test_async_client_built_outside_the_loop(mock_api):
+    api = mock_api()
+    client = AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url, max_concurrency=2, coalesce=False)
+
+    async def run():
+        async with client:
+            return await asyncio.gather(*(client.servers.get(force_refresh=True) for _ in range(8)))
+
+    for _ in range(2):
+        assert [len(servers) for servers in asyncio.run(run())] == [10] * 8
@@ -0,0 +1,56 @@
+import time
+
+from benchmarks.outage import hammer, reached
+from leadergpu import LeaderGPUClient
+from leadergpu.http_client.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from leadergpu.http_client.retry import RetryPolicy
+
+THREADS = 4
+OPEN_TIMEOUT = 0.2
+
+
+def test_circuit_opens_during_an_outage_and_closes_after_it(mock_api):
+    api = mock_api(servers=10)
+    breaker = CircuitBreaker(window=10, minimum_calls=5, open_timeout=OPEN_TIMEOUT,
+                             slow_call_duration=0.1, slow_call_rate=0.5)
+    transitions = []
+    breaker.add_listener(lambda group, before, after: transitions.append((group, before, after)))
+    # Without coalescing every thread's request is a call of its own, the window fills in a short phase.
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=THREADS, coalesce=False,
+                             retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=breaker)
+
+    def phase(seconds: float) -> dict:
+        api.reset_counters()
+        result = hammer(client, THREADS, seconds)
+        result['reached_api'] = reached(api)
+        result['state'] = breaker.state('list')
+        return result
+
+    try:
+        healthy = phase(0.3)
+        assert healthy['failed'] == healthy['rejected'] == 0
+        assert healthy['state'] == CLOSED
+
+        api.error_rate = 1.0
+        outage = phase(OPEN_TIMEOUT * 4)
+        assert outage['state'] != CLOSED
+        assert outage['rejected'] > outage['failed']
+        # The window, the requests in flight when it opened and one probe per open timeout.
+        assert outage['reached_api'] <= breaker.window + THREADS + 5
+
+        api.error_rate = 0.0
+        api.latency = 0.2
+        breaker.reset()
+        slow = phase(OPEN_TIMEOUT * 4)
+        assert slow['state'] != CLOSED
+        assert slow['rejected'] > 0
+
+        api.latency = 0.0
+        time.sleep(OPEN_TIMEOUT)
+        recovered = phase(0.3)
+        assert recovered['state'] == CLOSED
+        assert recovered['ok'] > 0 and recovered['failed'] == 0
+    finally:
+        client.close()
+
+    assert ('list', CLOSED, OPEN) in transitions
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+from leadergpu import AsyncLeaderGPUClient, LeaderGPUClient, deadline
+from leadergpu.exceptions import DeadlineExceeded
+from leadergpu.http_client.rate_limit import RateLimiter
+
+
+def test_rate_limiter_does_not_sleep_past_the_deadline():
+    limiter = RateLimiter({'list': (1, 1)})
+    limiter.acquire('GET', '/servers')
+    start = time.monotonic()
+    with deadline(0.2):
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire('GET', '/servers')
+    assert time.monotonic() - start < 0.1
+    # The failed acquire took no token, the next one is still due in about a second.
+    assert 0.5 < limiter.reserve('GET', '/servers') <= 1
+
+
+def test_rate_limited_request_fails_fast(mock_api):
+    api = mock_api()
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, rate_limiter=RateLimiter({'list': (1, 1)}))
+    try:
+        client.servers.get()
+        start = time.monotonic()
+        with deadline(0.2):
+            with pytest.raises(DeadlineExceeded):
+                client.servers.get(force_refresh=True)
+        assert time.monotonic() - start < 0.1
+        assert api.calls['/servers'] == 1
+    finally:
+        client.close()
+
+
+def test_async_rate_limited_request_fails_fast(mock_api):
+    api = mock_api()
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url,
+                                        rate_limiter=RateLimiter({'list': (1, 1)})) as client:
+            await client.servers.get()
+            start = time.monotonic()
+            with deadline(0.2):
+                with pytest.raises(DeadlineExceeded):
+                    await client.servers.get(force_refresh=True)
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.1
+    assert api.calls['/servers'] == 1
+
+
+def test_async_wait_for_a_concurrency_slot_is_bounded(mock_api):
+    api = mock_api()
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url, max_concurrency=1,
+                                        coalesce=False) as client:
+            await client.servers.get()
+            api.latency = 0.5
+            busy = asyncio.ensure_future(client.servers.get(force_refresh=True))
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            with deadline(0.1):
+                with pytest.raises(DeadlineExceeded):
+                    await client.products.get()
+            waited = time.monotonic() - start
+            await busy
+            return waited
+
+    assert asyncio.run(run()) < 0.3
+    assert '/servers/products' not in api.calls
@@ -0,0 +1,23 @@
+import threading
+
+from leadergpu import LeaderGPUClient
+
+
+def test_streamed_request_releases_the_rejected_connection(mock_api):
+    api = mock_api(products=20)
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=1, pool_block=True)
+    client.products.get()
+    counts = []
+
+    def run() -> None:
+        for _ in range(3):
+            api.rotate_token()
+            counts.append(len(list(client.products.iter())))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(5)
+    client.close()
+    # A leaked connection blocks the next request on the single connection pool.
+    assert counts == [20, 20, 20]
+    assert api.rejected == 3
@@ -0,0 +1,54 @@
+from benchmarks.mock_server import make_product
+from leadergpu.products.catalog import ProductCatalog
+from leadergpu.products.columnar import ProductsTable
+from leadergpu.products.products import decode_product, decode_products, iter_products
+
+
+def test_decode_converts_numeric_fields():
+    product = decode_product(make_product(3))
+    assert product.id == '3'
+    assert product.period_count == 1
+    assert product.price == 1.6
+    assert product.weight == 3
+
+
+def test_decode_keeps_null_fields():
+    record = dict(make_product(1), period_count=None, price=None, weight=None)
+    for product in (decode_products([record])[0], next(iter_products([record]))):
+        assert product.period_count is None
+        assert product.price is None
+        assert product.weight is None
+
+
+def test_catalog_sorts_products_without_price_last():
+    records = [make_product(id) for id in range(1, 5)]
+    records[0]['price'] = None
+    catalog = ProductCatalog(decode_products(records))
+    assert [product.id for product in catalog.query()][-1] == '1'
+    assert '1' not in [product.id for product in catalog.query(max_price=100)]
+
+
+def test_catalog_price_bounds_with_int_ids():
+    records = [dict(make_product(id), id=id) for id in range(1, 21)]
+    catalog = ProductCatalog(decode_products(records))
+    prices = sorted(float(record['price']) for record in records)
+    low, high = prices[5], prices[14]
+
+    found = catalog.query(min_price=low, max_price=high)
+    assert [product.price for product in found] == prices[5:15]
+    assert all(isinstance(product.id, int) for product in found)
+    assert catalog.cheapest(max_price=prices[0]).price == prices[0]
+
+    records[0]['price'] = str(high + 100)
+    catalog.refresh(decode_products(records))
+    assert 1 not in [product.id for product in catalog.query(max_price=high)]
+
+
+def test_table_cheapest_matches_rows_without_price():
+    records = [make_product(id) for id in range(2, 8)]
+    for record in records:
+        if record['currency'] == 'USD':
+            record['price'] = None
+    table = ProductsTable(decode_products(records))
+    assert table.cheapest(currency='USD').currency == 'USD'
+    assert table.cheapest(currency='GBP') is None
@@ -0,0 +1,18 @@
+import pytest
+
+from leadergpu.http_client import rate_limit
+from leadergpu.http_client.rate_limit import FileTokenBucket, RateLimiter
+
+
+def test_file_buckets_share_the_budget(tmp_path):
+    first = RateLimiter({'list': (1, 2)}, path=str(tmp_path / 'bucket'))
+    second = RateLimiter({'list': (1, 2)}, path=str(tmp_path / 'bucket'))
+    assert first.reserve('GET', '/servers') == 0
+    assert second.reserve('GET', '/servers') == 0
+    assert 0.5 < first.reserve('GET', '/servers') <= 1
+
+
+def test_file_bucket_needs_file_locking(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'fcntl', None)
+    with pytest.raises(RuntimeError):
+        FileTokenBucket(str(tmp_path / 'bucket'), 1)
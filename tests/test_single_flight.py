@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from leadergpu.deadlines import deadline, request_timeout
+from leadergpu.exceptions import DeadlineExceeded
+from leadergpu.http_client.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def slow_call(seconds: float):
+    """A call that needs seconds and honours the deadline of its caller, like an API request"""
+    def call():
+        timeout = request_timeout(seconds)
+        if timeout < seconds:
+            time.sleep(timeout)
+            raise DeadlineExceeded()
+        time.sleep(seconds)
+        return 'result'
+    return call
+
+
+def run_thread(fn) -> dict:
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn()
+        except Exception as error:
+            outcome['error'] = error
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    outcome['thread'] = thread
+    return outcome
+
+
+def test_follower_waits_within_its_own_deadline():
+    flight = SingleFlight()
+    leader = run_thread(lambda: flight.do('key', slow_call(0.5)))
+    time.sleep(0.05)
+    start = time.monotonic()
+    with deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            flight.do('key', slow_call(0.5))
+    assert time.monotonic() - start < 0.3
+    leader['thread'].join()
+    assert leader['result'] == 'result'
+
+
+def test_follower_does_not_share_the_deadline_of_the_leader():
+    flight = SingleFlight()
+
+    def short_leader():
+        with deadline(0.1):
+            return flight.do('key', slow_call(0.3))
+
+    leader = run_thread(short_leader)
+    time.sleep(0.05)
+    assert flight.do('key', slow_call(0.3)) == 'result'
+    leader['thread'].join()
+    assert isinstance(leader['error'], DeadlineExceeded)
+    assert flight.stats() == {'calls': 2, 'deduplicated': 1}
+
+
+def async_slow_call(seconds: float):
+    async def call():
+        timeout = request_timeout(seconds)
+        if timeout < seconds:
+            await asyncio.sleep(timeout)
+            raise DeadlineExceeded()
+        await asyncio.sleep(seconds)
+        return 'result'
+    return call
+
+
+def test_async_follower_waits_within_its_own_deadline():
+    flight = AsyncSingleFlight()
+
+    async def follower():
+        await asyncio.sleep(0.05)
+        with deadline(0.1):
+            start = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await flight.do('key', async_slow_call(0.5))
+            return time.monotonic() - start
+
+    async def run():
+        return await asyncio.gather(flight.do('key', async_slow_call(0.5)), follower())
+
+    result, waited = asyncio.run(run())
+    assert result == 'result'
+    assert waited < 0.3
+
+
+def test_async_follower_does_not_share_the_deadline_of_the_leader():
+    flight = AsyncSingleFlight()
+
+    async def leader():
+        with deadline(0.1):
+            return await flight.do('key', async_slow_call(0.3))
+
+    async def follower():
+        await asyncio.sleep(0.05)
+        return await flight.do('key', async_slow_call(0.3))
+
+    async def run():
+        return await asyncio.gather(leader(), follower(), return_exceptions=True)
+
+    leader_outcome, follower_outcome = asyncio.run(run())
+    assert isinstance(leader_outcome, DeadlineExceeded)
+    assert follower_outcome == 'result'
+    assert flight.stats() == {'calls': 2, 'deduplicated': 1}
+
+
+def test_async_timeout_of_the_call_is_shared():
+    flight = AsyncSingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        raise asyncio.TimeoutError()
+
+    async def run():
+        return await asyncio.gather(flight.do('key', call), flight.do('key', call), return_exceptions=True)
+
+    outcomes = asyncio.run(run())
+    assert all(type(outcome) is asyncio.TimeoutError for outcome in outcomes)
@@ -0,0 +1,62 @@
+import asyncio
+
+from leadergpu import AsyncLeaderGPUClient
+from leadergpu.http_client.instrumentation import Instrumentation
+from leadergpu.http_client.rate_limit import RateLimiter
+from leadergpu.http_client.retry import RetryPolicy
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__({'list': (1000, 1000)})
+        self.reserved = 0
+
+    def reserve(self, method: str, url: str, max_delay: float = None) -> float:
+        self.reserved += 1
+        return super().reserve(method, url, max_delay)
+
+
+def test_async_iter_json_retries_and_is_instrumented(mock_api):
+    api = mock_api(products=50)
+
+    def recover(attempt) -> None:
+        api.error_rate = 0.0
+
+    instrumentation = Instrumentation()
+    records = []
+    instrumentation.add_hook(after=records.append)
+    rate_limiter = CountingRateLimiter()
+    retry_policy = RetryPolicy(max_attempts=3, backoff_base=0.01, on_attempt=recover)
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url, retry_policy=retry_policy,
+                                        rate_limiter=rate_limiter, instrumentation=instrumentation) as client:
+            await client.servers.get()
+            api.rotate_token()
+            records.clear()
+            rate_limiter.reserved = 0
+            api.error_rate = 1.0
+            return [product.id async for product in client.products.iter()]
+
+    ids = asyncio.run(run())
+    assert ids == [str(id) for id in range(1, 51)]
+    assert api.calls['/signin'] == 2
+    assert api.errors == 1
+    # The rejected token, the 503 and the successful attempt.
+    [record] = [record for record in records if record.endpoint == '/servers/products']
+    assert (record.endpoint, record.status, record.attempts) == ('/servers/products', 200, 3)
+    assert rate_limiter.reserved == 3
+
+
+def test_async_iter_json_stops_early(mock_api):
+    api = mock_api(products=500)
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url, max_concurrency=1) as client:
+            async for product in client.products.iter():
+                break
+            return product, len(await client.products.get())
+
+    product, count = asyncio.run(run())
+    assert product.id == '1'
+    assert count == 500
@@ -0,0 +1,53 @@
+import threading
+
+from benchmarks.stress import worker
+from leadergpu import LeaderGPUClient
+
+
+def test_shared_client_survives_token_rotation(mock_api):
+    api = mock_api(servers=20, products=100)
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url, pool_maxsize=16)
+    rotations = 3
+    errors = []
+    done = threading.Event()
+
+    def rotate() -> None:
+        for _ in range(rotations):
+            if done.wait(0.2):
+                return
+            api.rotate_token()
+
+    threads = [threading.Thread(target=worker, args=(client, api, 30, seed, errors)) for seed in range(16)]
+    rotator = threading.Thread(target=rotate)
+    rotator.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    rotator.join()
+    client.close()
+
+    assert errors == []
+    # One sign in per token, concurrent refreshes of an expired token collapse into one.
+    assert api.calls['/signin'] <= rotations + 1
+
+
+def test_services_are_created_once(mock_api):
+    api = mock_api()
+    for _ in range(20):
+        client = LeaderGPUClient('user@mail.org', 'secret', api.base_url)
+        barrier = threading.Barrier(8)
+        seen = []
+
+        def access() -> None:
+            barrier.wait()
+            seen.append((client.servers, client.products))
+
+        threads = [threading.Thread(target=access) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(servers) for servers, _ in seen}) == 1
+        assert len({id(products) for _, products in seen}) == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+from leadergpu import AsyncLeaderGPUClient, LeaderGPUClient
+
+
+def test_not_modified_reuses_stored_response(mock_api):
+    api = mock_api(servers=3, etags=True)
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url)
+    try:
+        first = client.servers.get()
+        second = client.servers.get()
+        assert api.calls['/servers'] == 2
+        assert api.not_modified == 1
+        assert [server.id for server in second] == [1, 2, 3]
+        assert all(old is new for old, new in zip(first, second))
+
+        api.servers[1]['status'] = 'STOPPED'
+        third = client.servers.get()
+        assert api.not_modified == 1
+        assert third[0].status == 'STOPPED'
+        assert third[0] is not first[0]
+    finally:
+        client.close()
+
+
+def test_not_modified_reuses_stored_response_async(mock_api):
+    api = mock_api(servers=3, etags=True)
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url) as client:
+            first = await client.servers.get()
+            second = await client.servers.get()
+            api.servers[1]['status'] = 'STOPPED'
+            third = await client.servers.get()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert api.calls['/servers'] == 3
+    assert api.not_modified == 1
+    assert all(old is new for old, new in zip(first, second))
+    assert third[0].status == 'STOPPED'
+
+
+def test_not_modified_products(mock_api):
+    api = mock_api(products=5, etags=True)
+    client = LeaderGPUClient('user@mail.org', 'secret', api.base_url)
+    try:
+        first = client.products.get()
+        second = client.products.get()
+        assert api.not_modified == 1
+        assert [product.id for product in second] == [product.id for product in first]
+    finally:
+        client.close()
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from leadergpu import AsyncLeaderGPUClient, LeaderGPUClient
+from leadergpu.http_client.retry import RetryPolicy
+from leadergpu.servers.watcher import ServerWatcher
+
+
+def make_client(api) -> LeaderGPUClient:
+    return LeaderGPUClient('user@mail.org', 'secret', api.base_url, retry_policy=RetryPolicy(max_attempts=1))
+
+
+def test_interval_is_fast_while_provisioning(mock_api):
+    api = mock_api(servers=2)
+    client = make_client(api)
+    watcher = ServerWatcher(client.servers, fast_interval=1, slow_interval=30, jitter=0)
+    watcher.poll()
+    assert watcher._next_interval() == 30
+
+    # An idle server reporting no provisioning progress is not transitional.
+    api.servers[2]['progress'] = 0
+    watcher.poll()
+    assert watcher._next_interval() == 30
+
+    api.servers[2]['status'] = 'booting'
+    watcher.poll()
+    assert watcher._next_interval() == 1
+
+    api.servers[2]['status'] = api.servers[1]['status']
+    api.servers[1]['status'] = 'queued'
+    watcher.poll()
+    assert watcher._next_interval() == 1
+    client.close()
+
+
+def test_failed_polls_back_off(mock_api):
+    api = mock_api(servers=1)
+    api.servers[1]['status'] = 'booting'
+    client = make_client(api)
+    watcher = ServerWatcher(client.servers, fast_interval=0.05, slow_interval=5, jitter=0)
+    watcher.poll()
+    api.error_rate = 1.0
+    with watcher:
+        time.sleep(0.7)
+    # Polls at 0, 0.1, 0.3 and 0.7s instead of every 0.05s.
+    assert 3 <= api.errors <= 5
+    assert watcher.last_error is not None
+    assert watcher.polls == 1
+    client.close()
+
+
+def test_refresh_does_not_change_the_watched_server(mock_api):
+    api = mock_api(servers=1)
+    api.servers[1]['status'] = 'booting'
+    client = make_client(api)
+    watcher = ServerWatcher(client.servers)
+    watcher.poll()
+    server = watcher.snapshot()[1]
+
+    api.servers[1]['status'] = 'UP'
+    assert server.refresh(force_refresh=True).status == 'UP'
+    assert server.status == 'booting'
+    assert [(event.before, event.after) for event in watcher.poll()] == [('booting', 'UP')]
+    client.close()
+
+
+def test_failing_subscriber_does_not_stop_the_others(mock_api, caplog):
+    api = mock_api(servers=2)
+    client = make_client(api)
+    watcher = ServerWatcher(client.servers)
+    events = []
+
+    def fail(event) -> None:
+        raise ValueError(event)
+
+    watcher.subscribe(fail)
+    watcher.subscribe(events.append)
+    watcher.stop()
+    events.clear()
+    caplog.clear()
+    for server in api.servers.values():
+        server['status'] = 'STOPPED'
+    watcher.poll()
+    assert [event.server_id for event in events] == [1, 2]
+    assert len([record for record in caplog.records if record.exc_info]) == 2
+    client.close()
+
+
+def test_staggered_waiters_do_not_force_polls(mock_api):
+    api = mock_api(servers=1)
+    client = make_client(api)
+    servers = []
+    with ServerWatcher(client.servers, fast_interval=0.5, slow_interval=30, jitter=0) as watcher:
+        waiters = [threading.Thread(target=lambda: servers.append(watcher.wait_until(1, 'STOPPED', timeout=5)))
+                   for _ in range(20)]
+        for waiter in waiters:
+            waiter.start()
+            time.sleep(0.05)
+        api.servers[1]['status'] = 'STOPPED'
+        for waiter in waiters:
+            waiter.join()
+    # One poll per fast interval while waiting instead of one per new waiter.
+    assert [server.status for server in servers] == ['STOPPED'] * 20
+    assert watcher.polls <= 5
+    client.close()
+
+
+def test_async_waiters_share_one_poller(mock_api):
+    api = mock_api(servers=3)
+    for server in api.servers.values():
+        server['status'] = 'booting'
+
+    async def boot() -> None:
+        await asyncio.sleep(0.2)
+        for server in api.servers.values():
+            server['status'] = 'UP'
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url) as client:
+            watcher = client.servers.watcher(fast_interval=0.05, jitter=0)
+            events = []
+            watcher.subscribe(events.append)
+            waiters = [client.servers.wait_until(id, 'UP', timeout=5) for id in api.servers for _ in range(10)]
+            servers = await asyncio.gather(*waiters, boot())
+            watcher.stop()
+            return watcher, servers[:-1], events
+
+    watcher, servers, events = asyncio.run(run())
+    assert [server.status for server in servers] == ['UP'] * 30
+    assert api.calls['/servers'] == watcher.polls
+    assert watcher.polls < 15
+    assert [(event.server_id, event.after) for event in events if event.before == 'booting'] == \
+        [(1, 'UP'), (2, 'UP'), (3, 'UP')]
+
+
+def test_async_wait_until_times_out(mock_api):
+    api = mock_api(servers=1)
+
+    async def run():
+        async with AsyncLeaderGPUClient('user@mail.org', 'secret', api.base_url) as client:
+            async with client.servers.watcher(fast_interval=0.05) as watcher:
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.servers.wait_until(1, 'STOPPED', timeout=0.3)
+                assert watcher.running
+            assert not watcher.running
+            return watcher.polls
+
+    assert 3 <= asyncio.run(run()) <= 10